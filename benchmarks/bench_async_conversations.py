@@ -0,0 +1,106 @@
+"""
+Benchmark de las rutas de conversaciones: servicio síncrono llamado dentro de un `async def`
+(bloquea el event loop) contra AsyncConversationService, en peticiones por segundo según
+la concurrencia de clientes. Cada sentencia paga una latencia simulada, como el viaje de
+red a un Postgres remoto.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_async_conversations [--latencia-ms 5] [--mensajes 50]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from src.core.database import Base
+from src.services.asyncConversationService import AsyncConversationService
+from src.services.conversationService import ConversationService
+
+
+def servicios_temporales(path) -> tuple[ConversationService, AsyncConversationService]:
+    """Servicio síncrono y asíncrono sobre la misma base SQLite temporal."""
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    return (
+        ConversationService(session_factory=sessionmaker(bind=engine, autoflush=False, autocommit=False)),
+        AsyncConversationService(session_factory=async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)),
+    )
+
+
+async def medir_throughput(app: FastAPI, url: str, concurrencia: int, peticiones: int = 200) -> float:
+    """Peticiones por segundo con `concurrencia` clientes simultáneos."""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        pendientes = iter(range(peticiones))
+
+        async def cliente():
+            for _ in pendientes:
+                (await client.get(url)).raise_for_status()
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*[cliente() for _ in range(concurrencia)])
+        return peticiones / (time.perf_counter() - inicio)
+
+
+def simular_latencia(engine, latencia_ms: float):
+    """
+    Añade `latencia_ms` a cada sentencia, en el hilo que la ejecuta, como el viaje de
+    red a un Postgres remoto. El motor asíncrono la paga en el hilo de aiosqlite.
+    """
+    def espera(_sentencia):
+        time.sleep(latencia_ms / 1000)
+
+    @event.listens_for(engine.sync_engine if hasattr(engine, "sync_engine") else engine, "connect")
+    def registrar(dbapi_connection, _record):
+        if hasattr(dbapi_connection, "driver_connection"):
+            dbapi_connection.await_(dbapi_connection.driver_connection.set_trace_callback(espera))
+        else:
+            dbapi_connection.set_trace_callback(espera)
+
+    # Las conexiones ya abiertas no pasan por el evento "connect"
+    if not hasattr(engine, "sync_engine"):
+        engine.dispose()
+
+
+async def benchmark(path, mensajes: int = 50, latencia_ms: float = 5, concurrencias=(1, 8, 32)):
+    """Compara la ruta anterior (servicio síncrono dentro de async def) con la asíncrona."""
+    service, async_service = servicios_temporales(path)
+    simular_latencia(service.session_factory.kw["bind"], latencia_ms)
+    simular_latencia(async_service.session_factory.kw["bind"], latencia_ms)
+    conv_id = service.iniciar_conversacion(["hola"] * mensajes)
+
+    # Ruta anterior: async def que llama al servicio síncrono y bloquea el event loop
+    bloqueante = FastAPI()
+
+    @bloqueante.get("/historial")
+    async def historial_bloqueante():
+        return service.get_conversation_history(conv_id)
+
+    asincrona = FastAPI()
+
+    @asincrona.get("/historial")
+    async def historial_asincrono():
+        return await async_service.get_conversation_history(conv_id)
+
+    for nombre, app in [("síncrona", bloqueante), ("asíncrona", asincrona)]:
+        for concurrencia in concurrencias:
+            rps = await medir_throughput(app, "/historial", concurrencia)
+            print(f"{nombre:10s} concurrencia={concurrencia:3d}  {rps:8.1f} req/s")
+
+    await async_service.session_factory.kw["bind"].dispose()
+    service.session_factory.kw["bind"].dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mensajes", type=int, default=50)
+    parser.add_argument("--latencia-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(benchmark(Path(tmp) / "bench.db", args.mensajes, args.latencia_ms))
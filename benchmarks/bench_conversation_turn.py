@@ -0,0 +1,79 @@
+"""
+Benchmark del guardado de un turno de chat: el guardado anterior (un commit por mensaje)
+contra ConversationService.registrar_turno (un commit por turno) con hilos concurrentes.
+Reporta commits por turno y latencia p50 / p99 del turno.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_conversation_turn [--hilos 8] [--turnos 50]
+"""
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from src.core.database import Base
+from src.services.conversationService import ConversationService
+
+
+def servicio_temporal(path) -> tuple[ConversationService, list]:
+    """ConversationService sobre una base SQLite temporal; retorna también un contador de commits."""
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    return ConversationService(session_factory=sessionmaker(bind=engine, autoflush=False, autocommit=False)), commits
+
+
+def benchmark(path, hilos: int = 8, turnos: int = 50) -> dict:
+    """Compara el guardado anterior (un commit por mensaje) con registrar_turno bajo carga concurrente."""
+    service, commits = servicio_temporal(path)
+    resultados = {}
+
+    def turno_anterior(conv_id):
+        service.get_conversation(conv_id)
+        service.save_message(conv_id, "user", "salud")
+        service.save_message(conv_id, "bot", "¿virtual o presencial?")
+
+    def turno_nuevo(conv_id):
+        service.registrar_turno(conv_id, [("user", "salud"), ("bot", "¿virtual o presencial?")])
+
+    for nombre, turno in [("anterior", turno_anterior), ("registrar_turno", turno_nuevo)]:
+        ids = [service.iniciar_conversacion(["hola"]) for _ in range(hilos)]
+        latencias, lock = [], threading.Lock()
+        commits.clear()
+
+        def trabajador(conv_id):
+            for _ in range(turnos):
+                inicio = time.perf_counter()
+                turno(conv_id)
+                with lock:
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+
+        threads = [threading.Thread(target=trabajador, args=(i,)) for i in ids]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        latencias.sort()
+        resultados[nombre] = {
+            "commits_por_turno": len(commits) / len(latencias),
+            "p50_ms": statistics.median(latencias),
+            "p99_ms": latencias[int(len(latencias) * 0.99) - 1],
+        }
+    return resultados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--turnos", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for nombre, r in benchmark(Path(tmp) / "bench.db", args.hilos, args.turnos).items():
+            print(f"{nombre:16s} commits/turno={r['commits_por_turno']:.1f}  "
+                  f"p50={r['p50_ms']:.2f} ms  p99={r['p99_ms']:.2f} ms")
@@ -0,0 +1,60 @@
+"""
+Benchmark de escrituras concurrentes en SQLite: la configuración anterior (journal de
+rollback, synchronous=FULL, pool por defecto) contra crear_motor (WAL, pragmas y pool
+dimensionado), en turnos guardados por segundo con 1, 8 y 64 sesiones a la vez.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_database_pragmas [--turnos 20]
+"""
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from src.core.database import Base, crear_motor
+from src.services.conversationService import ConversationService
+
+
+def escrituras_concurrentes(engine, sesiones: int, turnos: int = 20) -> dict:
+    """`sesiones` hilos guardando turnos de chat a la vez. Retorna escrituras/s y errores."""
+    Base.metadata.create_all(bind=engine)
+    service = ConversationService(session_factory=sessionmaker(bind=engine, autoflush=False, autocommit=False))
+    ids = [service.iniciar_conversacion(["hola"]) for _ in range(sesiones)]
+    errores = []
+
+    def sesion(conv_id):
+        for _ in range(turnos):
+            try:
+                service.registrar_turno(conv_id, [("user", "salud"), ("bot", "¿virtual o presencial?")])
+            except OperationalError as e:
+                errores.append(e)
+
+    threads = [threading.Thread(target=sesion, args=(i,)) for i in ids]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    segundos = time.perf_counter() - inicio
+
+    return {"escrituras_s": (sesiones * turnos - len(errores)) / segundos, "errores": len(errores)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turnos", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for sesiones in [1, 8, 64]:
+            anterior = create_engine(f"sqlite:///{Path(tmp) / f'anterior_{sesiones}.db'}",
+                                     connect_args={"check_same_thread": False})
+            ajustado = crear_motor(f"sqlite:///{Path(tmp) / f'ajustado_{sesiones}.db'}")
+
+            for nombre, engine in [("anterior", anterior), ("WAL", ajustado)]:
+                r = escrituras_concurrentes(engine, sesiones, args.turnos)
+                print(f"{nombre:9s} sesiones={sesiones:3d}  {r['escrituras_s']:8.1f} turnos/s  errores={r['errores']}")
+                engine.dispose()
@@ -1,8 +1,11 @@
 # api/chat_router.py
+import json
 import logging
-from fastapi import APIRouter
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
 from src.services.chatbotLogicService import chatbot_logic_service
+from src.services.asyncConversationService import async_conversation_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -14,14 +17,73 @@ class ChatMessage(BaseModel):
     id_conversation: str | None = None
 
 @router.post("/message")
-def chatbot_message(msg: ChatMessage):
-    response = chatbot_service.procesar_mensaje(
+async def chatbot_message(msg: ChatMessage):
+    # Estado y base de datos en el threadpool; la recomendación (paso 3) en su pool dedicado
+    response = await chatbot_service.procesar_mensaje_async(
         user_message=msg.message,
         id_conversation=msg.id_conversation
     )
     return response
 
+@router.post("/message/stream")
+async def chatbot_message_stream(msg: ChatMessage):
+    """
+    Respuesta por Server-Sent Events: el acuse y cada línea de recomendación se envían
+    en cuanto están listos (eventos inicio / texto / fin, con JSON en `data`).
+    """
+    async def eventos():
+        try:
+            async for evento in chatbot_service.procesar_mensaje_stream(msg.message, msg.id_conversation):
+                yield f"event: {evento['evento']}\ndata: {json.dumps(evento, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            logger.error(f"Error en el stream del chatbot: {e}", exc_info=True)
+            yield f"event: error\ndata: {json.dumps({'evento': 'error', 'detalle': str(e)})}\n\n"
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/ws")
+async def chatbot_websocket(websocket: WebSocket):
+    """
+    Canal persistente por usuario: cada mensaje JSON {"message", "id_conversation"}
+    recibe los mismos eventos que el stream SSE, sin abrir una petición HTTP por turno.
+    """
+    await websocket.accept()
+    try:
+        while True:
+            try:
+                msg = ChatMessage.model_validate(await websocket.receive_json())
+            except (ValidationError, ValueError) as e:
+                await websocket.send_json({"evento": "error", "detalle": str(e)})
+                continue
+            try:
+                async for evento in chatbot_service.procesar_mensaje_stream(msg.message, msg.id_conversation):
+                    await websocket.send_json(evento)
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                logger.error(f"Error en el WebSocket del chatbot: {e}", exc_info=True)
+                await websocket.send_json({"evento": "error", "detalle": str(e)})
+    except WebSocketDisconnect:
+        logger.info("WebSocket del chatbot cerrado por el cliente")
+
 @router.get("/message/{id_conversation}")
-def get_conversation_messages(id_conversation: str):
-    messages = chatbot_service.conversation_service.get_messages(int(id_conversation))
-    return {"messages": messages}
\ No newline at end of file
+async def get_conversation_messages(id_conversation: str, response: Response,
+                                    limit: int | None = Query(None, ge=1, le=1000), cursor: str | None = None):
+    if limit is None and cursor is None:
+        messages = await async_conversation_service.get_messages(int(id_conversation))
+        return {"messages": messages}
+
+    # Página del historial; el cursor de la siguiente va en X-Next-Cursor
+    try:
+        pagina, next_cursor = await async_conversation_service.historial_pagina(
+            int(id_conversation), limit=limit or 100, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return {"messages": [{"sender": m["sender"], "text": m["content"], "created_at": m["created_at"]} for m in pagina]}
\ No newline at end of file
@@ -1,36 +1,55 @@
 # api/conversations_router.py
 import logging
-from fastapi import APIRouter, HTTPException
-from src.services.conversationService import ConversationService
+from fastapi import APIRouter, HTTPException, Query, Response
+from src.services.asyncConversationService import async_conversation_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-conversation_service = ConversationService()
+conversation_service = async_conversation_service
+
+# Tamaño de página del historial cuando se pide por cursor sin `limit`
+HISTORY_PAGE_SIZE = 100
 
 @router.get("")
 
-async def list_conversations(limit: int = 20):
+async def list_conversations(response: Response, limit: int = Query(20, ge=1, le=200), cursor: str | None = None):
     """
     Lista las conversaciones más recientes.
+    Paginación por cursor: el de la página siguiente llega en la cabecera X-Next-Cursor.
     """
     try:
-        conversations = conversation_service.list_conversations(limit=limit)
+        conversations, next_cursor = await conversation_service.conversaciones_pagina(limit=limit, cursor=cursor)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return conversations
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"--- Error listando conversaciones: {e}")
         raise HTTPException(status_code=500, detail="Error listando conversaciones")
 
 @router.get("/{id_conversation}")
-async def get_conversation_history(id_conversation: int):
+async def get_conversation_history(id_conversation: int, response: Response,
+                                   limit: int | None = Query(None, ge=1, le=1000), cursor: str | None = None):
     """
     Obtiene el historial completo de una conversación.
+    Con `limit` y/o `cursor` devuelve una página; el cursor siguiente va en X-Next-Cursor.
     """
     try:
-        history = conversation_service.get_conversation_history(id_conversation)
+        if limit is None and cursor is None:
+            return await conversation_service.get_conversation_history(id_conversation)
+
+        history, next_cursor = await conversation_service.historial_pagina(
+            id_conversation, limit=limit or HISTORY_PAGE_SIZE, cursor=cursor
+        )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return history
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"--- Error recuperando historial: {e}")
         raise HTTPException(status_code=500, detail="Error recuperando historial")
@@ -41,7 +60,7 @@ async def delete_conversation(id_conversation: int):
     Elimina una conversación (modo debug o limpieza).
     """
     try:
-        deleted = conversation_service.delete_conversation(id_conversation)
+        deleted = await conversation_service.delete_conversation(id_conversation)
         if not deleted:
             raise HTTPException(status_code=404, detail="Conversación no encontrada")
         logger.warning(f"Conversación {id_conversation} eliminada.")
@@ -1,8 +1,16 @@
 # api/models_router.py
 import logging
 from fastapi import APIRouter, Form, UploadFile, HTTPException
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from src.core.config import EMBEDDING_RERANK
 from src.services.modelService import models_service 
 from src.services.modelService import ModelService
+from src.services.recommendationCacheService import recommendation_cache
+from src.services.queryEncoderService import query_encoder_service
+from src.services.recommenderService import recommendation_coalescer
+from src.services.recommendationPoolService import recommendation_executor, recommendation_process_pool
+from src.services.recommendationPipelineService import recommendation_stage_stats
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -20,13 +28,57 @@ async def upload_model(file: UploadFile, tipo: str = Form(...)):
 
 @router.post("/{tipo}/load")
 async def load_model(tipo: str):
-    """Carga un archivo en memoria según su tipo."""
-    return ModelService.load(tipo)
+    """
+    Carga un archivo en memoria según su tipo.
+    El nuevo snapshot se construye en un hilo y se publica al terminar;
+    las peticiones en curso siguen con el anterior.
+    """
+    return await run_in_threadpool(ModelService.load, tipo)
 
 @router.get("/status")
 async def model_status():
-    """Verifica qué modelos están cargados en memoria."""
-    return ModelService.is_ready()
+    """
+    Verifica qué modelos están cargados en memoria y cuánta memoria residente / mapeada usan,
+    junto con los contadores de la cache de recomendaciones, el estado del codificador de consultas
+    y las métricas del agrupador, de los pools y de cada etapa del ranking de recomendaciones.
+    """
+    return {
+        **ModelService.is_ready(),
+        "memoria": ModelService.memory_report(),
+        "cache_recomendaciones": recommendation_cache.estadisticas(),
+        "codificador_consultas": query_encoder_service.estado(),
+        "agrupador_recomendaciones": recommendation_coalescer.estadisticas(),
+        "pool_recomendaciones": {
+            "hilos": recommendation_executor.estadisticas(),
+            "procesos": recommendation_process_pool.estadisticas(),
+        },
+        "etapas_recomendacion": recommendation_stage_stats.estadisticas(),
+    }
+
+@router.get("/ready")
+async def model_readiness():
+    """Indica si el servicio está listo (modelos requeridos cargados); 503 mientras no lo esté."""
+    estado = ModelService.readiness()
+    return JSONResponse(status_code=200 if estado["ready"] else 503, content=estado)
+
+@router.get("/embeddings/index")
+def vector_index_report(backend: str | None = None, k: int = 10, consultas: int = 100):
+    """Reporta recall@k y latencia del índice vectorial (activo o el indicado) contra búsqueda exacta."""
+    return ModelService.evaluar_indice_vectorial(backend=backend, k=k, n_consultas=consultas)
+
+@router.get("/embeddings/quantization")
+def embedding_quantization_report(modos: str | None = None, k: int = 10, consultas: int = 100,
+                                  rerank: int = EMBEDDING_RERANK):
+    """
+    Reporta recall@k, latencia y memoria por modo de cuantización de los embeddings
+    (`modos` separados por coma; por defecto float32, float16, int8 y pq).
+    """
+    return ModelService.evaluar_cuantizacion_embeddings(
+        modos=modos.split(",") if modos else None,
+        k=k,
+        n_consultas=consultas,
+        rerank=rerank
+    )
 
 @router.get("/{tipo}/download")
 def download_model(tipo: str):
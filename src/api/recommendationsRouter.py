@@ -0,0 +1,43 @@
+# api/recommendations_router.py
+import logging
+from fastapi import APIRouter, Query
+from fastapi.concurrency import run_in_threadpool
+from src.schemas.recommendationSchema import BatchRecommendationRequest, BatchRecommendationResponse, SimilarCoursesResponse
+from src.services.recommenderService import recommender_service
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.post("/batch", response_model=BatchRecommendationResponse)
+async def batch_recommendations(req: BatchRecommendationRequest):
+    """
+    Recomienda cursos para muchas consultas a la vez (evaluación offline, precalentar caches).
+    El cálculo se hace por bloques de matrices en un hilo, sin bloquear el event loop.
+    """
+    resultados = await run_in_threadpool(
+        recommender_service.obtener_recomendaciones_lote,
+        req.queries,
+        num_recomendaciones=req.k,
+        peso_embed=req.peso_embed,
+        peso_tfidf=req.peso_tfidf,
+        modalidad=req.modalidad,
+        duracion=req.duracion
+    )
+    logger.info(f"Lote de {len(req.queries)} consultas recomendado")
+    return {
+        "resultados": [
+            {"query": query, "recomendaciones": recomendaciones}
+            for query, recomendaciones in zip(req.queries, resultados)
+        ]
+    }
+
+
+@router.get("/similares/{indice_curso}", response_model=SimilarCoursesResponse)
+async def similar_courses(indice_curso: int, k: int = Query(5, ge=1, le=100)):
+    """
+    "Más como este": los k cursos más parecidos a un curso del catálogo (su fila en cursos_info),
+    leídos de los vecinos top-k precalculados de la matriz de similitud.
+    """
+    similares = recommender_service.obtener_cursos_similares(indice_curso, k)
+    return {"indice_curso": indice_curso, "similares": similares}
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 #  Raíz del proyecto
@@ -6,14 +7,136 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 # Base de datos
 DB_DIR = BASE_DIR / "db"
 DATABASE_DIR = DB_DIR / "db-conversaciones.db"
-DATABASE_URL = f"sqlite:///{DATABASE_DIR}"
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DATABASE_DIR}")
+
+# Misma base con driver asíncrono (aiosqlite en local, asyncpg en Postgres)
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+_DB_SCHEME, _DB_RESTO = DATABASE_URL.split("://", 1)
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    f"{ASYNC_DRIVERS.get(_DB_SCHEME.split('+')[0], _DB_SCHEME)}://{_DB_RESTO}"
+)
+
+# SQLite: WAL permite lectores concurrentes con un escritor; synchronous=NORMAL es
+# seguro en WAL (solo se pierde el último commit ante un corte de energía)
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+
+# Pool de conexiones (SQLite y Postgres)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
+# Escritura diferida de mensajes: un hilo los guarda por lotes (cada N mensajes o T ms)
+CHAT_WRITE_BEHIND = os.getenv("CHAT_WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_FLUSH_MS = int(os.getenv("WRITE_BEHIND_FLUSH_MS", "50"))
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "100000"))
+
+# Estado del diálogo (paso, tema, modalidad...): "memory" (LRU por proceso),
+# "database" (tabla conversation_states) o "redis" (compartido entre workers y nodos)
+CONVERSATION_STATE_BACKEND = os.getenv("CONVERSATION_STATE_BACKEND", "memory")
+CONVERSATION_STATE_TTL_S = int(os.getenv("CONVERSATION_STATE_TTL_S", "3600"))
+CONVERSATION_STATE_MAX_ENTRIES = int(os.getenv("CONVERSATION_STATE_MAX_ENTRIES", "10000"))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
 #  Configuraciones de archivos de modelos
 FILES_DIR = BASE_DIR / "files"
 VALID_MODEL_TYPES = ["autoencoder", "embeddings", "matriz", "cursos", "cursos_info"]
 
+# Artefactos que el chatbot necesita para estar listo y los que se cargan solo al usarse
+REQUIRED_MODEL_TYPES = ["embeddings", "cursos_info"]
+LAZY_MODEL_TYPES = ["autoencoder"]
+
 AUTOENCODER_DIR = FILES_DIR / "autoencoder_model.keras"
 EMBEDDINGS_DIR = FILES_DIR / "embeddings.npy"
 MATRIZ_DIR = FILES_DIR / "matriz_de_similitud.npy"
 CURSOS_DIR = FILES_DIR / "cursos.npy"
 CURSOS_INFO_DIR = FILES_DIR / "cursos_info.csv"
+
+# Manifiesto de versiones de los artefactos subidos
+MANIFEST_DIR = FILES_DIR / "manifest.json"
+
+# Subidas por bloques y columnas mínimas del catálogo
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+CURSOS_INFO_COLUMNS = ["NOMBRE_OFERTA", "MODALIDAD", "TIPO_OFERTA"]
+
+# Catálogo compilado en columnas (se genera al subir cursos_info.csv y se carga con mmap)
+CURSOS_CATALOG_DIR = FILES_DIR / "cursos_info.catalog"
+
+# Embeddings con filas normalizadas en float32 (se generan al subir embeddings.npy y se cargan con mmap)
+EMBEDDINGS_NORM_DIR = FILES_DIR / "embeddings_normalizados.npy"
+
+# Formato compacto de la matriz de similitud: k vecinos por curso
+MATRIZ_TOPK_DIR = FILES_DIR / "matriz_topk.npz"
+MATRIZ_TOPK_K = int(os.getenv("MATRIZ_TOPK_K", "50"))
+
+# Carga de artefactos .npy mapeados en memoria (solo lectura, compartidos entre workers)
+MODEL_LOAD_MMAP = os.getenv("MODEL_LOAD_MMAP", "1") == "1"
+
+# Índice vectorial de embeddings: "flat" (exacto) o "ivf" (aproximado)
+VECTOR_INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "flat")
+VECTOR_INDEX_DIR = FILES_DIR / "embeddings_ivf.npz"
+VECTOR_INDEX_NPROBE = int(os.getenv("VECTOR_INDEX_NPROBE", "32"))
+VECTOR_INDEX_CANDIDATOS = int(os.getenv("VECTOR_INDEX_CANDIDATOS", "200"))
+
+# Cuantización de los embeddings normalizados: "float32" (sin cuantizar), "float16", "int8" (escala por fila)
+# o "pq" (product quantization: EMBEDDING_PQ_SUBVECTORS bytes por curso, puntuados con tablas de distancias).
+# Con cuantización, los EMBEDDING_RERANK mejores candidatos de cada consulta se vuelven a puntuar con los
+# embeddings originales (0 lo desactiva); con VECTOR_INDEX_BACKEND="ivf" el índice conserva sus listas en float32
+EMBEDDING_QUANTIZATION = os.getenv("EMBEDDING_QUANTIZATION", "float32")
+EMBEDDING_PQ_SUBVECTORS = int(os.getenv("EMBEDDING_PQ_SUBVECTORS", "16"))
+EMBEDDING_PQ_DIR = FILES_DIR / "embeddings_pq.npz"
+EMBEDDING_RERANK = int(os.getenv("EMBEDDING_RERANK", "100"))
+
+# Análisis de texto del índice TF-IDF: "espanol" (sin tildes ni palabras vacías, stemming ligero y
+# n-gramas de TEXT_CHAR_NGRAMS caracteres; 0 los desactiva) o "simple" (tokenización por defecto de scikit-learn)
+TEXT_ANALYZER = os.getenv("TEXT_ANALYZER", "espanol")
+TEXT_CHAR_NGRAMS = int(os.getenv("TEXT_CHAR_NGRAMS", "3"))
+# Los n-gramas presentes en más de esta fracción de cursos se descartan (casi no distinguen cursos
+# y sus postings serían los más largos del índice invertido)
+TEXT_NGRAM_MAX_DF = float(os.getenv("TEXT_NGRAM_MAX_DF", "0.05"))
+
+# Cache de recomendaciones (LRU) por consulta normalizada, filtros, k y versión del snapshot; 0 la desactiva
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "1024"))
+
+# Ranking híbrido: pesos de la similitud de embeddings y de la TF-IDF (valores por defecto de las consultas)
+RECOMMENDATION_PESO_EMBED = float(os.getenv("RECOMMENDATION_PESO_EMBED", "0.6"))
+RECOMMENDATION_PESO_TFIDF = float(os.getenv("RECOMMENDATION_PESO_TFIDF", "0.4"))
+# RECOMMENDATION_PIPELINE: "dos_etapas" (candidatos del índice invertido / vectorial y reranking solo de
+# esos RECOMMENDATION_CANDIDATES cursos) o "exhaustivo" (se puntúa todo el catálogo filtrado)
+RECOMMENDATION_PIPELINE = os.getenv("RECOMMENDATION_PIPELINE", "dos_etapas")
+RECOMMENDATION_CANDIDATES = int(os.getenv("RECOMMENDATION_CANDIDATES", "300"))
+
+# Recomendaciones por lotes: memoria máxima de las matrices de similitud de cada bloque de consultas
+RECOMMENDATION_BATCH_MEMORY_MB = int(os.getenv("RECOMMENDATION_BATCH_MEMORY_MB", "64"))
+RECOMMENDATION_BATCH_MAX_QUERIES = int(os.getenv("RECOMMENDATION_BATCH_MAX_QUERIES", "10000"))
+
+# Codificador de consultas: el texto se lleva al espacio de `cursos` y pasa por el encoder del autoencoder.
+# Es opcional (desactivado por defecto): el paso texto → `cursos` es una regresión ridge ajustada sobre el
+# catálogo, una aproximación del pipeline original que no forma parte del servicio.
+# QUERY_ENCODER_RUNTIME: "auto" (NumPy si el encoder se puede exportar, si no Keras), "numpy" o "keras"
+QUERY_ENCODER_ENABLED = os.getenv("QUERY_ENCODER_ENABLED", "0") == "1"
+QUERY_ENCODER_RUNTIME = os.getenv("QUERY_ENCODER_RUNTIME", "auto")
+QUERY_ENCODER_DIR = FILES_DIR / "query_encoder.npz"
+QUERY_ENCODER_WORKERS = int(os.getenv("QUERY_ENCODER_WORKERS", "2"))
+QUERY_ENCODER_MAX_BATCH = int(os.getenv("QUERY_ENCODER_MAX_BATCH", "32"))
+QUERY_ENCODER_MAX_WAIT_MS = float(os.getenv("QUERY_ENCODER_MAX_WAIT_MS", "2"))
+QUERY_ENCODER_RIDGE_ALPHA = float(os.getenv("QUERY_ENCODER_RIDGE_ALPHA", "1.0"))
+
+# Agrupador de recomendaciones: las consultas que llegan dentro de la ventana (o hasta juntar
+# el lote máximo) se puntúan juntas con un producto de matrices
+RECOMMENDATION_COALESCE = os.getenv("RECOMMENDATION_COALESCE", "0") == "1"
+RECOMMENDATION_COALESCE_WINDOW_MS = float(os.getenv("RECOMMENDATION_COALESCE_WINDOW_MS", "2"))
+RECOMMENDATION_COALESCE_MAX_BATCH = int(os.getenv("RECOMMENDATION_COALESCE_MAX_BATCH", "64"))
+
+# Etapa de recomendación fuera del event loop y del threadpool por defecto: hilos dedicados y,
+# con RECOMMENDATION_PROCESS_WORKERS > 0, el cálculo numérico en procesos que comparten el
+# catálogo y los embeddings por memoria compartida
+RECOMMENDATION_WORKERS = int(os.getenv("RECOMMENDATION_WORKERS", "4"))
+RECOMMENDATION_PROCESS_WORKERS = int(os.getenv("RECOMMENDATION_PROCESS_WORKERS", "0"))
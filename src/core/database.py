@@ -1,13 +1,88 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from src.core.config import DATABASE_URL
+from src.core.config import (
+    ASYNC_DATABASE_URL, DATABASE_URL, DB_DIR,
+    SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_BUSY_TIMEOUT_MS, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE_KB,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+)
 
 
-# Configurar motor SQLAlchemy 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}
-)
+# ============================================================
+# CONFIGURACIÓN DEL MOTOR
+# ============================================================
+def sqlite_en_memoria(url: str) -> bool:
+    """URL de una base SQLite en memoria (`sqlite://`, `:memory:` o `mode=memory`)."""
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
+
+def opciones_motor(url: str) -> dict:
+    """
+    Argumentos de create_engine/create_async_engine según el backend de la URL.
+    SQLite en memoria usa SingletonThreadPool / StaticPool, que no aceptan el tamaño del pool.
+    """
+    opciones = {} if sqlite_en_memoria(url) else {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+    if url.startswith("sqlite"):
+        # SQLite no permite por defecto usar una conexión desde otro hilo
+        opciones["connect_args"] = {"check_same_thread": False}
+    else:
+        # Servidores remotos: reciclar conexiones viejas y descartar las caídas
+        opciones["pool_recycle"] = DB_POOL_RECYCLE
+        opciones["pool_pre_ping"] = DB_POOL_PRE_PING
+    return opciones
+
+
+def pragmas_sqlite(journal_mode: str = SQLITE_JOURNAL_MODE, synchronous: str = SQLITE_SYNCHRONOUS,
+                   busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS, mmap_size: int = SQLITE_MMAP_SIZE,
+                   cache_size_kb: int = SQLITE_CACHE_SIZE_KB) -> list[str]:
+    return [
+        f"PRAGMA journal_mode={journal_mode}",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA busy_timeout={busy_timeout_ms}",
+        f"PRAGMA mmap_size={mmap_size}",
+        f"PRAGMA cache_size=-{cache_size_kb}",
+    ]
+
+
+def configurar_sqlite(engine, pragmas: list[str] | None = None):
+    """Aplica los PRAGMA a cada conexión nueva del motor (síncrono o asíncrono)."""
+    pragmas = pragmas_sqlite() if pragmas is None else pragmas
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "connect")
+    def aplicar_pragmas(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return engine
+
+
+def crear_motor(url: str = DATABASE_URL, pragmas: list[str] | None = None):
+    engine = create_engine(url, **opciones_motor(url))
+    return configurar_sqlite(engine, pragmas) if url.startswith("sqlite") else engine
+
+
+def crear_motor_async(url: str = ASYNC_DATABASE_URL, pragmas: list[str] | None = None):
+    engine = create_async_engine(url, **opciones_motor(url))
+    return configurar_sqlite(engine, pragmas) if url.startswith("sqlite") else engine
+
+
+# Configurar motor SQLAlchemy (la carpeta de SQLite debe existir)
+DB_DIR.mkdir(parents=True, exist_ok=True)
+engine = crear_motor()
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
+
+# Motor asíncrono para las rutas `async def` (no bloquea el event loop)
+async_engine = crear_motor_async()
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
@@ -0,0 +1,26 @@
+import logging
+from sqlalchemy import inspect
+from src.core.database import Base
+import src.models.conversationModel  # noqa: F401  (registra las tablas en Base.metadata)
+
+logger = logging.getLogger(__name__)
+
+
+def crear_indices_faltantes(engine) -> list[str]:
+    """
+    `create_all` solo crea índices junto con tablas nuevas: en una base existente
+    los índices declarados después en los modelos hay que crearlos aparte.
+    Retorna los nombres de los índices creados.
+    """
+    inspector = inspect(engine)
+    creados = []
+    for tabla in Base.metadata.sorted_tables:
+        if not inspector.has_table(tabla.name):
+            continue
+        existentes = {i["name"] for i in inspector.get_indexes(tabla.name)}
+        for indice in tabla.indexes:
+            if indice.name not in existentes:
+                logger.info(f"Creando índice {indice.name} en {tabla.name}...")
+                indice.create(bind=engine)
+                creados.append(indice.name)
+    return creados
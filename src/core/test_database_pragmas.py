@@ -0,0 +1,59 @@
+import asyncio
+import threading
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from src.core.database import Base, crear_motor, crear_motor_async
+from src.services.conversationService import ConversationService
+
+
+def errores_concurrentes(engine, sesiones: int, turnos: int = 20) -> int:
+    """
+    `sesiones` hilos guardando turnos de chat a la vez. Retorna cuántos fallaron
+    (el rendimiento se mide en benchmarks/bench_database_pragmas.py).
+    """
+    Base.metadata.create_all(bind=engine)
+    service = ConversationService(session_factory=sessionmaker(bind=engine, autoflush=False, autocommit=False))
+    ids = [service.iniciar_conversacion(["hola"]) for _ in range(sesiones)]
+    errores = []
+
+    def sesion(conv_id):
+        for _ in range(turnos):
+            try:
+                service.registrar_turno(conv_id, [("user", "salud"), ("bot", "¿virtual o presencial?")])
+            except OperationalError as e:
+                errores.append(e)
+
+    threads = [threading.Thread(target=sesion, args=(i,)) for i in ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return len(errores)
+
+
+def test_pragmas_aplicados(tmp_path):
+    engine = crear_motor(f"sqlite:///{tmp_path / 'chat.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() > 0
+
+    assert errores_concurrentes(engine, sesiones=16, turnos=10) == 0
+
+
+def test_motor_sqlite_en_memoria():
+    for url in ["sqlite://", "sqlite:///:memory:", "sqlite:///file:chat?mode=memory&uri=true"]:
+        engine = crear_motor(url)
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+        engine.dispose()
+
+    async def consultar():
+        async_engine = crear_motor_async("sqlite+aiosqlite://")
+        async with async_engine.connect() as conn:
+            resultado = (await conn.execute(text("SELECT 1"))).scalar()
+        await async_engine.dispose()
+        return resultado
+
+    assert asyncio.run(consultar()) == 1
@@ -5,8 +5,14 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
 # --- importaciones del backend ---
-from src.services import modelService
+from src.services.modelService import ModelService
+from src.services.messageLogService import message_log
+from src.services.chatbotLogicService import chatbot_logic_service
+from src.services.queryEncoderService import query_encoder_service
+from src.services.recommenderService import recommendation_coalescer
+from src.services.recommendationPoolService import recommendation_executor, recommendation_process_pool
 from src.core.database import Base, engine
+from src.core.migrations import crear_indices_faltantes
 from src.api.apiRouter import router as api_router
 
 
@@ -15,8 +21,9 @@ from src.api.apiRouter import router as api_router
 # ============================================================
 app = FastAPI(title="Chatbot con Clustering y Feedback")
 
-# Crear las tablas si no existen
+# Crear las tablas si no existen (y los índices nuevos en bases ya creadas)
 Base.metadata.create_all(bind=engine)
+crear_indices_faltantes(engine)
 
 # Incluir rutas de la API
 app.include_router(api_router)
@@ -29,10 +36,23 @@ app.include_router(api_router)
 async def startup_event():
     logging.info("🚀 Iniciando sistema...")
     try:
-        # Aquí podrías cargar tus modelos si lo deseas
-        logging.info("--- Modelos cargados correctamente al inicio.")
+        # Los modelos se cargan en segundo plano: la API acepta peticiones de inmediato
+        # y /api/models/ready indica cuándo están disponibles.
+        ModelService.start_background_loading()
+        logging.info("--- Carga de modelos iniciada en segundo plano.")
     except Exception as e:
-        logging.error(f"--- Error cargando modelos al inicio: {e}")
+        logging.error(f"--- Error iniciando la carga de modelos: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Guardar los turnos respondidos por streaming y los mensajes de la cola de escritura diferida
+    await chatbot_logic_service.esperar_guardados()
+    message_log.detener()
+    recommendation_coalescer.detener()
+    recommendation_executor.detener()
+    recommendation_process_pool.detener()
+    query_encoder_service.detener()
 
 
 # ============================================================
@@ -1,11 +1,15 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, Index, JSON
 from sqlalchemy.orm import relationship
 from src.core.database import Base
 
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Listado por fecha de inicio con paginación por cursor (start_time, id)
+        Index("ix_conversations_start_time_id", "start_time", "id_conversation"),
+    )
 
     id_conversation = Column(Integer, primary_key=True, index=True)
     start_time = Column(DateTime, default=datetime.utcnow)
@@ -21,6 +25,10 @@ class Conversation(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Historial de una conversación en orden cronológico, paginado por (created_at, id)
+        Index("ix_messages_conversation_created_id", "id_conversation", "created_at", "id_message"),
+    )
 
     id_message = Column(Integer, primary_key=True, index=True)
     id_conversation = Column(Integer, ForeignKey("conversations.id_conversation", ondelete="CASCADE"))
@@ -35,6 +43,15 @@ class Message(Base):
     conversation = relationship("Conversation", back_populates="messages")
 
 
+class ConversationState(Base):
+    """Estado del diálogo de una conversación (backend "database" de conversationStateService)."""
+    __tablename__ = "conversation_states"
+
+    id_conversation = Column(Integer, primary_key=True)
+    state = Column(JSON, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+
 # if __name__ == "__main__":
 #     from src.core.database import engine
 #     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,48 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from src.core.config import RECOMMENDATION_BATCH_MAX_QUERIES, RECOMMENDATION_PESO_EMBED, RECOMMENDATION_PESO_TFIDF
+
+
+class BatchRecommendationRequest(BaseModel):
+    """Modelo de entrada para recomendar cursos a muchas consultas en una sola llamada."""
+    queries: list[str] = Field(
+        ...,
+        min_length=1,
+        max_length=RECOMMENDATION_BATCH_MAX_QUERIES,
+        description="Textos de consulta (temas de interés)."
+    )
+    k: int = Field(5, ge=1, le=100, description="Número de recomendaciones por consulta.")
+    modalidad: Optional[str] = Field(
+        None, description="Filtro de modalidad común a todas las consultas: palabras de MODALIDAD (p. ej. 'Virtual')."
+    )
+    duracion: Optional[str] = Field(
+        None, description="Filtro de tipo de oferta común a todas las consultas: palabras de TIPO_OFERTA (p. ej. 'Corto')."
+    )
+    peso_embed: float = Field(RECOMMENDATION_PESO_EMBED, ge=0.0, description="Peso de la similitud de embeddings.")
+    peso_tfidf: float = Field(RECOMMENDATION_PESO_TFIDF, ge=0.0, description="Peso de la similitud TF-IDF.")
+
+
+class BatchRecommendationItem(BaseModel):
+    """Recomendaciones de una consulta del lote."""
+    query: str
+    recomendaciones: list[dict]
+
+
+class BatchRecommendationResponse(BaseModel):
+    """Modelo de salida: un elemento por consulta, en el mismo orden."""
+    resultados: list[BatchRecommendationItem]
+
+
+class SimilarCourse(BaseModel):
+    """Un curso parecido al consultado, con su similitud en la matriz precalculada."""
+    indice: int
+    NOMBRE_OFERTA: str
+    MODALIDAD: Optional[str] = None
+    TIPO_OFERTA: Optional[str] = None
+    SIMILITUD: float
+
+
+class SimilarCoursesResponse(BaseModel):
+    """Modelo de salida de "más como este": los vecinos del curso, de mayor a menor similitud."""
+    indice_curso: int
+    similares: list[SimilarCourse]
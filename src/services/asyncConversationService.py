@@ -0,0 +1,158 @@
+import base64
+import logging
+from datetime import datetime
+from sqlalchemy import delete, select, tuple_
+from src.core.config import CHAT_WRITE_BEHIND
+from src.core.database import AsyncSessionLocal
+from src.models.conversationModel import Conversation, Message
+from src.services.messageLogService import MessageLog, message_log as default_message_log
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# CURSORES DE PAGINACIÓN (keyset)
+# ============================================================
+def codificar_cursor(fecha: datetime, id_: int) -> str:
+    """Cursor opaco con la clave (fecha, id) del último elemento de la página."""
+    return base64.urlsafe_b64encode(f"{fecha.isoformat()}|{id_}".encode()).decode()
+
+
+def decodificar_cursor(cursor: str) -> tuple[datetime, int]:
+    """Inverso de codificar_cursor. Lanza ValueError si el cursor no es válido."""
+    try:
+        fecha, id_ = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(fecha), int(id_)
+    except Exception as e:
+        raise ValueError(f"Cursor no válido: {cursor}") from e
+
+
+class AsyncConversationService:
+    """
+    Variante asíncrona de ConversationService para las rutas `async def`.
+    Usa el motor asyncio de SQLAlchemy: las consultas no bloquean el event loop.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, message_log=None):
+        self.session_factory = session_factory
+        # Mensajes aún en la cola de escritura diferida (ver MessageLog)
+        self.message_log = message_log
+
+    # ------------------------------------------------------------
+    # Recuperar historial
+    # ------------------------------------------------------------
+    async def _historial(self, id_conversation: int) -> list[dict]:
+        # Los pendientes se toman antes de leer la base (ver MessageLog.combinar)
+        pendientes = self.message_log.pendientes(id_conversation) if self.message_log is not None else []
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(Message)
+                .where(Message.id_conversation == id_conversation)
+                .order_by(Message.created_at.asc())
+            )
+            guardados = [
+                {"sender": m.sender, "content": m.content, "created_at": m.created_at}
+                for m in result.scalars().all()
+            ]
+        historial = MessageLog.combinar(guardados, pendientes)
+        if not historial:
+            logger.warning(f"No se encontraron mensajes para la conversación {id_conversation}")
+        return historial
+
+    async def get_messages(self, id_conversation: int) -> list[dict]:
+        return [
+            {"sender": m["sender"], "text": m["content"], "created_at": m["created_at"]}
+            for m in await self._historial(id_conversation)
+        ]
+
+    async def get_conversation_history(self, id_conversation: int) -> list[dict]:
+        """Recupera los mensajes de una conversación en orden cronológico."""
+        return await self._historial(id_conversation)
+
+    async def historial_pagina(self, id_conversation: int, limit: int,
+                               cursor: str | None = None) -> tuple[list[dict], str | None]:
+        """
+        Una página del historial en orden cronológico, a partir del cursor.
+        Usa el índice (id_conversation, created_at, id_message): cada página cuesta lo
+        mismo sin importar cuántos mensajes haya antes. Retorna (mensajes, siguiente cursor).
+        Los mensajes aún sin guardar (write-behind) se añaden a la última página.
+        """
+        pendientes = self.message_log.pendientes(id_conversation) if self.message_log is not None else []
+        query = select(Message).where(Message.id_conversation == id_conversation)
+        if cursor:
+            fecha, id_message = decodificar_cursor(cursor)
+            query = query.where(tuple_(Message.created_at, Message.id_message) > tuple_(fecha, id_message))
+
+        async with self.session_factory() as db:
+            result = await db.execute(
+                query.order_by(Message.created_at.asc(), Message.id_message.asc()).limit(limit + 1)
+            )
+            messages = result.scalars().all()
+
+        pagina = [
+            {"sender": m.sender, "content": m.content, "created_at": m.created_at}
+            for m in messages[:limit]
+        ]
+        if len(messages) > limit:
+            ultimo = messages[limit - 1]
+            return pagina, codificar_cursor(ultimo.created_at, ultimo.id_message)
+        return MessageLog.combinar(pagina, pendientes), None
+
+    # ------------------------------------------------------------
+    # Listar conversaciones
+    # ------------------------------------------------------------
+    async def list_conversations(self, limit: int = 20) -> list[Conversation]:
+        """Lista las conversaciones más recientes."""
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(Conversation)
+                .order_by(Conversation.start_time.desc())
+                .limit(limit)
+            )
+            return result.scalars().all()
+
+    async def conversaciones_pagina(self, limit: int = 20,
+                                    cursor: str | None = None) -> tuple[list[Conversation], str | None]:
+        """
+        Conversaciones más recientes primero, paginadas por (start_time, id_conversation)
+        con el índice ix_conversations_start_time_id. Retorna (conversaciones, siguiente cursor).
+        """
+        query = select(Conversation)
+        if cursor:
+            fecha, id_conversation = decodificar_cursor(cursor)
+            query = query.where(tuple_(Conversation.start_time, Conversation.id_conversation) < tuple_(fecha, id_conversation))
+
+        async with self.session_factory() as db:
+            result = await db.execute(
+                query.order_by(Conversation.start_time.desc(), Conversation.id_conversation.desc()).limit(limit + 1)
+            )
+            conversations = result.scalars().all()
+
+        if len(conversations) > limit:
+            ultima = conversations[limit - 1]
+            return conversations[:limit], codificar_cursor(ultima.start_time, ultima.id_conversation)
+        return conversations, None
+
+    # ------------------------------------------------------------
+    # Eliminar conversación
+    # ------------------------------------------------------------
+    async def delete_conversation(self, id_conversation: int) -> dict:
+        """Elimina una conversación y sus mensajes."""
+        async with self.session_factory() as db:
+            convo = await db.get(Conversation, id_conversation)
+            if not convo:
+                logger.warning(f"Intento de eliminar conversación inexistente: {id_conversation}")
+                return {"status": "error", "message": "Conversación no encontrada"}
+
+            # Borrado masivo de los mensajes: evita cargarlos uno a uno para la cascada del ORM
+            await db.execute(delete(Message).where(Message.id_conversation == id_conversation))
+            await db.delete(convo)
+            await db.commit()
+            logger.info(f"Conversación {id_conversation} eliminada correctamente")
+            return {"status": "ok", "message": f"Conversación {id_conversation} eliminada"}
+
+
+# ============================================================
+# SINGLETON INSTANCE
+async_conversation_service = AsyncConversationService(message_log=default_message_log if CHAT_WRITE_BEHIND else None)
+# ============================================================
@@ -0,0 +1,185 @@
+import json
+import logging
+import struct
+from pathlib import Path
+import numpy as np
+from src.core.config import CURSOS_INFO_COLUMNS
+from src.services.modelRegistryService import escribir_atomico
+
+logger = logging.getLogger(__name__)
+
+# Cabecera del archivo: firma, longitud del JSON descriptivo y el JSON; los arreglos van alineados a 64 bytes
+FIRMA_CATALOGO = b"CATALOG1"
+ALINEACION = 64
+
+
+def _alinear(n: int) -> int:
+    return -(-n // ALINEACION) * ALINEACION
+
+
+# ============================================================
+# CATÁLOGO COLUMNAR — CourseCatalog
+# ============================================================
+class CourseCatalog:
+    """
+    Catálogo de cursos compilado en columnas, en lugar del DataFrame del CSV:
+    - NOMBRE_OFERTA: un único buffer UTF-8 con los nombres concatenados más sus offsets (n + 1).
+    - MODALIDAD y TIPO_OFERTA: un código int32 por fila y la lista de categorías (-1 = nulo).
+    - `claves`: NOMBRE_OFERTA factorizado, la clave con la que se quitan los cursos repetidos.
+
+    Se compila una vez al subir el CSV y se guarda en un archivo que se carga con mmap,
+    sin parsear filas: los workers del mismo host comparten sus páginas. Leer una fila es
+    O(1) y solo crea los valores que se devuelven (sin objetos por fila de pandas).
+    """
+
+    columnas_categoricas = ("MODALIDAD", "TIPO_OFERTA")
+
+    def __init__(self, nombres_datos: np.ndarray, nombres_offsets: np.ndarray, claves: np.ndarray,
+                 codigos: dict, categorias: dict, mapeado: bool = False):
+        self.nombres_datos = nombres_datos
+        self.nombres_offsets = nombres_offsets
+        self.claves = claves
+        self.codigos = codigos
+        self.categorias = categorias
+        self.mapeado = mapeado
+        self.n_docs = len(claves)
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.nombres_datos.nbytes + self.nombres_offsets.nbytes + self.claves.nbytes
+                   + sum(c.nbytes for c in self.codigos.values()))
+
+    # --------------------------------------------------------
+    # Compilación
+    # --------------------------------------------------------
+    @classmethod
+    def desde_dataframe(cls, df_cursos) -> "CourseCatalog":
+        """Compila el catálogo a partir del DataFrame del CSV (al subirlo o para un DataFrame externo)."""
+        import pandas as pd
+
+        faltantes = [c for c in CURSOS_INFO_COLUMNS if c not in df_cursos.columns]
+        if faltantes:
+            raise ValueError(f"faltan columnas {faltantes}")
+
+        nombres = df_cursos["NOMBRE_OFERTA"]
+        claves, _ = pd.factorize(nombres, use_na_sentinel=True)
+        codificados = [str(n).encode("utf-8") if c >= 0 else b"" for n, c in zip(nombres.tolist(), claves)]
+        offsets = np.zeros(len(codificados) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in codificados], out=offsets[1:])
+
+        codigos, categorias = {}, {}
+        for columna in cls.columnas_categoricas:
+            c, cats = pd.factorize(df_cursos[columna], use_na_sentinel=True)
+            codigos[columna] = c.astype(np.int32)
+            categorias[columna] = [str(x) for x in cats]
+
+        return cls(np.frombuffer(b"".join(codificados), dtype=np.uint8), offsets, claves.astype(np.int32),
+                   codigos, categorias)
+
+    @classmethod
+    def desde_csv(cls, path) -> "CourseCatalog":
+        import pandas as pd
+        return cls.desde_dataframe(pd.read_csv(path))
+
+    # --------------------------------------------------------
+    # Archivo compilado
+    # --------------------------------------------------------
+    def _arreglos(self) -> dict:
+        return {
+            "nombres_datos": self.nombres_datos,
+            "nombres_offsets": self.nombres_offsets,
+            "claves": self.claves,
+            **{f"codigos_{c}": self.codigos[c] for c in self.columnas_categoricas},
+        }
+
+    def guardar(self, path):
+        """Escribe el catálogo compilado (cabecera JSON + arreglos alineados) de forma atómica."""
+        arreglos = {nombre: np.ascontiguousarray(a) for nombre, a in self._arreglos().items()}
+        descriptor = {"n_docs": self.n_docs, "categorias": self.categorias, "arreglos": {}}
+
+        # La cabecera se reserva con margen para los offsets, que aún no se conocen
+        encabezado = json.dumps({**descriptor, "arreglos": {n: [0, a.dtype.str, a.shape] for n, a in arreglos.items()}})
+        offset = _alinear(len(FIRMA_CATALOGO) + 8 + len(encabezado.encode("utf-8")) + 32 * len(arreglos))
+        for nombre, arreglo in arreglos.items():
+            descriptor["arreglos"][nombre] = [offset, arreglo.dtype.str, list(arreglo.shape)]
+            offset = _alinear(offset + arreglo.nbytes)
+
+        encabezado = json.dumps(descriptor).encode("utf-8")
+        partes = [FIRMA_CATALOGO, struct.pack("<Q", len(encabezado)), encabezado]
+        posicion = sum(len(p) for p in partes)
+        for nombre, arreglo in arreglos.items():
+            inicio = descriptor["arreglos"][nombre][0]
+            partes.append(b"\0" * (inicio - posicion))
+            partes.append(arreglo.tobytes())
+            posicion = inicio + arreglo.nbytes
+        escribir_atomico(Path(path), b"".join(partes))
+        logger.info(f"Catálogo compilado guardado en {path} ({self.n_docs} cursos, {posicion} bytes)")
+
+    @classmethod
+    def cargar(cls, path, mmap: bool = True) -> "CourseCatalog":
+        """Carga el archivo compilado: con `mmap` los arreglos son vistas del archivo mapeado, sin copiarlo."""
+        with open(path, "rb") as f:
+            if f.read(len(FIRMA_CATALOGO)) != FIRMA_CATALOGO:
+                raise ValueError(f"{path} no es un catálogo compilado")
+            (largo,) = struct.unpack("<Q", f.read(8))
+            descriptor = json.loads(f.read(largo))
+
+        datos = np.memmap(path, dtype=np.uint8, mode="r") if mmap else np.fromfile(path, dtype=np.uint8)
+        arreglos = {}
+        for nombre, (offset, dtype, forma) in descriptor["arreglos"].items():
+            dtype = np.dtype(dtype)
+            nbytes = int(np.prod(forma)) * dtype.itemsize
+            if offset + nbytes > len(datos):
+                raise ValueError(f"{path} truncado: falta el arreglo '{nombre}'")
+            arreglos[nombre] = datos[offset:offset + nbytes].view(dtype).reshape(forma)
+
+        catalogo = cls(
+            arreglos["nombres_datos"], arreglos["nombres_offsets"], arreglos["claves"],
+            {c: arreglos[f"codigos_{c}"] for c in cls.columnas_categoricas},
+            descriptor["categorias"], mapeado=mmap
+        )
+        if len(catalogo.nombres_offsets) != catalogo.n_docs + 1 or catalogo.n_docs != descriptor["n_docs"]:
+            raise ValueError(f"{path} inconsistente: {descriptor['n_docs']} cursos declarados")
+        return catalogo
+
+    # --------------------------------------------------------
+    # Acceso por fila
+    # --------------------------------------------------------
+    def nombre(self, i: int) -> str | None:
+        if self.claves[i] < 0:
+            return None
+        return self.nombres_datos[self.nombres_offsets[i]:self.nombres_offsets[i + 1]].tobytes().decode("utf-8")
+
+    def valor(self, columna: str, i: int) -> str | None:
+        codigo = self.codigos[columna][i]
+        return self.categorias[columna][codigo] if codigo >= 0 else None
+
+    def fila(self, i: int) -> dict:
+        """NOMBRE_OFERTA, MODALIDAD y TIPO_OFERTA de la fila i."""
+        return {
+            "NOMBRE_OFERTA": self.nombre(i),
+            "MODALIDAD": self.valor("MODALIDAD", i),
+            "TIPO_OFERTA": self.valor("TIPO_OFERTA", i),
+        }
+
+    def registros(self, indices) -> list[dict]:
+        """Una fila por índice, con su posición en el catálogo en "indice"."""
+        return [{"indice": int(i), **self.fila(i)} for i in indices]
+
+    def primeros_por_nombre(self, indices: np.ndarray, n: int | None = None) -> np.ndarray:
+        """
+        Posiciones (dentro de `indices`) de la primera aparición de cada nombre, en orden,
+        como drop_duplicates(subset='NOMBRE_OFERTA'); con `n`, solo las n primeras.
+        """
+        _, primeros = np.unique(self.claves[indices], return_index=True)
+        return np.sort(primeros)[:n]
+
+    def columna(self, columna: str) -> list:
+        """Columna completa como lista (para construir índices al cargar, no en el camino de cada consulta)."""
+        if columna == "NOMBRE_OFERTA":
+            return [self.nombre(i) for i in range(self.n_docs)]
+        categorias = self.categorias[columna] + [None]
+        return [categorias[c] for c in self.codigos[columna].tolist()]
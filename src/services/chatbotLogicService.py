@@ -1,16 +1,18 @@
+import asyncio
 from datetime import datetime
 import logging
 from src.services.recommenderService import recommender_service
 from src.services.conversationService import conversation_service
 from src.services.modelService import models_service
-
-
-# Estado de conversaciones (memoria temporal)
-conversation_state = {}  
+from src.services.conversationStateService import conversation_state_store
+from fastapi.concurrency import run_in_threadpool
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+ENCABEZADO_RECOMENDACION = "✨ Basado en lo que me contaste, podrían interesarte:\n\n"
+CIERRE_RECOMENDACION = "\n¿Quieres que te explique más sobre alguno?"
+
 
 class ChatbotLogicService:
     """
@@ -18,16 +20,102 @@ class ChatbotLogicService:
     Gestiona el flujo de diálogo y persistencia.
     """
 
-    def __init__(self, df_final=None, X_embeddings=None):
+    def __init__(self, df_final=None, X_embeddings=None, state_store=None):
         self.conversation_service = conversation_service
-        self.df_final = df_final
-        self.X_embeddings = X_embeddings
+        # Estado del diálogo (paso, tema, filtros): en memoria, base de datos o Redis
+        self.state_store = state_store or conversation_state_store
+        self._df_final = df_final
+        self._X_embeddings = X_embeddings
+        # Turnos del paso 3 que se están guardando después de responder por streaming (conv_id -> tarea)
+        self._guardados_pendientes = {}
+
+    def _modelos(self):
+        """
+        Catálogo, embeddings y snapshot a usar en este mensaje.
+        Si no se inyectaron, se toman del snapshot vigente una sola vez por mensaje:
+        una recarga concurrente no mezcla catálogo y embeddings de versiones distintas.
+        """
+        snapshot = models_service.snapshot()
+        df_final = self._df_final if self._df_final is not None else snapshot.models["cursos_info"]
+        X_embeddings = self._X_embeddings if self._X_embeddings is not None else snapshot.models["embeddings"]
+        return df_final, X_embeddings, snapshot
 
     def procesar_mensaje(self, user_message: str, id_conversation: str | None = None):
+        respuesta, pendiente = self._avanzar_dialogo(user_message, id_conversation)
+        if pendiente is None:
+            return respuesta
+        return self._cerrar_recomendacion(pendiente, self._recomendar(pendiente))
+
+    async def procesar_mensaje_async(self, user_message: str, id_conversation: str | None = None):
+        """
+        Igual que procesar_mensaje, sin bloquear el event loop: el estado y la base de datos
+        van al threadpool por defecto y la recomendación (paso 3) al pool dedicado, así que
+        los turnos de los pasos 1 y 2 no esperan detrás de un cálculo de recomendación
+        (ver RecommenderService.recomendar_cursos_async).
+        """
+        respuesta, pendiente = await run_in_threadpool(self._avanzar_dialogo, user_message, id_conversation)
+        if pendiente is None:
+            return respuesta
+        lineas = await self._lineas_recomendacion_async(pendiente)
+        reply = ENCABEZADO_RECOMENDACION + "".join(lineas) + CIERRE_RECOMENDACION
+        return await run_in_threadpool(self._cerrar_recomendacion, pendiente, reply)
+
+    async def procesar_mensaje_stream(self, user_message: str, id_conversation: str | None = None):
+        """
+        Versión incremental de procesar_mensaje_async para SSE / WebSocket. Genera eventos:
+        - {"evento": "inicio", "id_conversation"}: turno aceptado.
+        - {"evento": "texto", "texto"}: fragmento de la respuesta (el acuse del paso 3
+          sale antes de calcular las recomendaciones, luego una línea por curso).
+        - {"evento": "fin", "id_conversation", "reply"}: respuesta completa.
+        En el paso 3 el estado se resetea antes de "fin" y el turno se guarda en segundo plano;
+        el siguiente mensaje de la misma conversación espera a ese guardado para no desordenar el historial.
+        """
+        guardado = self._guardados_pendientes.get(str(id_conversation)) if id_conversation else None
+        if guardado is not None:
+            await asyncio.wait({guardado})
+
+        respuesta, pendiente = await run_in_threadpool(self._avanzar_dialogo, user_message, id_conversation)
+        if pendiente is None:
+            yield {"evento": "inicio", "id_conversation": respuesta["id_conversation"]}
+            yield {"evento": "texto", "texto": respuesta["reply"]}
+            yield {"evento": "fin", **respuesta}
+            return
+
+        conv_id = pendiente["conv_id"]
+        yield {"evento": "inicio", "id_conversation": conv_id}
+        yield {"evento": "texto", "texto": ENCABEZADO_RECOMENDACION}
+        lineas = await self._lineas_recomendacion_async(pendiente)
+        for linea in lineas:
+            yield {"evento": "texto", "texto": linea}
+        yield {"evento": "texto", "texto": CIERRE_RECOMENDACION}
+
+        reply = ENCABEZADO_RECOMENDACION + "".join(lineas) + CIERRE_RECOMENDACION
+        await run_in_threadpool(self.state_store.eliminar, conv_id)
+        tarea = asyncio.create_task(run_in_threadpool(
+            self.conversation_service.registrar_turno, conv_id, [("user", pendiente["user_message"]), ("bot", reply)]
+        ))
+        self._guardados_pendientes[str(conv_id)] = tarea
+        tarea.add_done_callback(lambda t: self._guardado_terminado(str(conv_id), t))
+        yield {"evento": "fin", "id_conversation": conv_id, "reply": reply}
+
+    def _guardado_terminado(self, conv_id: str, tarea: asyncio.Task):
+        if self._guardados_pendientes.get(conv_id) is tarea:
+            del self._guardados_pendientes[conv_id]
+        if not tarea.cancelled() and tarea.exception() is not None:
+            logger.error(f"Error guardando el turno {conv_id} en segundo plano: {tarea.exception()}")
+
+    async def esperar_guardados(self):
+        """Espera los guardados en segundo plano pendientes (apagado de la app, pruebas)."""
+        if self._guardados_pendientes:
+            await asyncio.gather(*list(self._guardados_pendientes.values()), return_exceptions=True)
+
+    def _avanzar_dialogo(self, user_message: str, id_conversation: str | None) -> tuple[dict | None, dict | None]:
+        """
+        Atiende el turno hasta donde no hace falta recomendar.
+        Retorna (respuesta, None) si el turno quedó resuelto y guardado, o
+        (None, pendiente) cuando toca recomendar (paso 3).
+        """
         if id_conversation is None:
-            conversation = self.conversation_service.create_conversation()
-            conv_id = conversation.id_conversation
-
             # Mensajes de bienvenida
             welcome_messages = [
                 "🤖 ¡Hola! Soy tu asistente de recomendación de cursos.",
@@ -35,42 +123,34 @@ class ChatbotLogicService:
                 "Cuéntame primero ¿En qué tema estás interesado? (Ej: salud, programación, liderazgo...)"
             ]
 
-            # Guardar y devolver el último mensaje como respuesta inicial
-            for msg in welcome_messages[:-1]:
-                self.conversation_service.save_message(conv_id, "bot", msg)
-
+            # Crear la conversación con todos los mensajes en una transacción
+            # y devolver el último mensaje como respuesta inicial
+            conv_id = self.conversation_service.iniciar_conversacion(welcome_messages)
             reply = welcome_messages[-1]
-            self.conversation_service.save_message(conv_id, "bot", reply)
 
-            return {"reply": reply, "id_conversation": conv_id}
+            return {"reply": reply, "id_conversation": conv_id}, None
 
         # Validar que los modelos estén cargados
-        if self.df_final is None or self.X_embeddings is None:
+        df_final, X_embeddings, snapshot = self._modelos()
+        if df_final is None or X_embeddings is None:
+            conv_id = int(id_conversation)
             reply = "⚠️ Aún no tengo cursos cargados. Pídele a un administrador que suba los modelos."
-            self.conversation_service.save_message(conv_id, "bot", reply)
-            return {"reply": reply, "id_conversation": conv_id}
+            self.conversation_service.registrar_turno(conv_id, [("bot", reply)])
+            return {"reply": reply, "id_conversation": conv_id}, None
         
         # Validar que el mensaje no esté vacío
         user_message = user_message.lower().strip()
         if not user_message:
-            return {"reply": "⚠️ Por favor, ingresa un mensaje válido.", "id_conversation": id_conversation}
+            return {"reply": "⚠️ Por favor, ingresa un mensaje válido.", "id_conversation": id_conversation}, None
 
-        # Recuperar o crear conversación
+        # Recuperar o crear conversación (el mensaje del usuario se guarda junto con la respuesta)
         if id_conversation:
-            conversation = self.conversation_service.get_conversation(int(id_conversation))
+            conv_id = int(id_conversation)
         else:
-            conversation = self.conversation_service.create_conversation()
+            conv_id = self.conversation_service.create_conversation().id_conversation
 
-        conv_id = conversation.id_conversation
-
-        # Guardar mensaje del usuario
-        self.conversation_service.save_message(conv_id, "user", user_message)
-
-         # Estado conversacional
-        if conv_id not in conversation_state:
-            conversation_state[conv_id] = {"step": 1, "tema": None, "modalidad": None, "duracion": None}
-
-        state = conversation_state[conv_id]
+        # Estado conversacional
+        state = self.state_store.obtener(conv_id) or {"step": 1, "tema": None, "modalidad": None, "duracion": None}
 
 
         # ======================
@@ -79,6 +159,7 @@ class ChatbotLogicService:
         if state["step"] == 1:
             state["tema"] = user_message
             state["step"] = 2
+            self.state_store.guardar(conv_id, state)
             reply = "Perfecto 👍 ¿Prefieres cursos virtuales o presenciales?"
 
         # ======================
@@ -90,49 +171,82 @@ class ChatbotLogicService:
             else:
                 state["modalidad"] = "Presencial"
             state["step"] = 3
+            self.state_store.guardar(conv_id, state)
             reply = "¿Buscas algo corto o un programa/diplomado más completo?"
 
         # ======================
-        # PASO 3 → Duración
+        # PASO 3 → Duración (la recomendación se calcula aparte)
         # ======================
-        elif state["step"] == 3:
+        else:
             if "corto" in user_message:
                 state["duracion"] = "Corto"
             else:
                 state["duracion"] = "Programa"
-
-            # Ahora sí recomendar
-            resultados = recommender_service.obtener_recomendaciones_inteligentes(
-                texto_usuario=state["tema"],
-                df_final=self.df_final,
-                X_embeddings=self.X_embeddings,
-                num_recomendaciones=6
-            )
-
-            # Filtrar por modalidad y duración
-            filtro = (
-                self.df_final['MODALIDAD'].str.contains(state["modalidad"], case=False, na=False)
-                & self.df_final['TIPO_OFERTA'].str.contains(state["duracion"], case=False, na=False)
-            )
-
-            filtrados = resultados[resultados['NOMBRE_OFERTA'].isin(self.df_final[filtro]['NOMBRE_OFERTA'])]
-
-            if filtrados.empty:
-                filtrados = resultados
-
-            reply = "✨ Basado en lo que me contaste, podrían interesarte:\n\n"
-            for i, row in enumerate(filtrados.itertuples(), 1):
-                reply += f"{i}. {row.NOMBRE_OFERTA} ({row.MODALIDAD}, {row.TIPO_OFERTA})\n"
-
-            reply += "\n¿Quieres que te explique más sobre alguno?"
-
-            # Resetear flujo
-            conversation_state.pop(conv_id, None)
-
-        # Guardar respuesta del bot
-        self.conversation_service.save_message(conv_id, "bot", reply)
+            return None, {
+                "conv_id": conv_id,
+                "user_message": user_message,
+                "state": state,
+                "df_final": df_final,
+                "X_embeddings": X_embeddings,
+                "snapshot": snapshot,
+            }
+
+        # Guardar mensaje del usuario, respuesta del bot y end_time en una sola transacción
+        self.conversation_service.registrar_turno(conv_id, [("user", user_message), ("bot", reply)])
 
         # Devolver resultado al frontend
+        return {"reply": reply, "id_conversation": conv_id}, None
+
+    def _recomendar(self, pendiente: dict) -> str:
+        """Paso 3: respuesta completa con las recomendaciones (trabajo de CPU, sin base de datos)."""
+        return ENCABEZADO_RECOMENDACION + "".join(self._lineas_recomendacion(pendiente)) + CIERRE_RECOMENDACION
+
+    @staticmethod
+    def _consulta(pendiente: dict, filtrar: bool = True) -> dict:
+        """Argumentos de recomendar_cursos con el tema y, si `filtrar`, los filtros del diálogo."""
+        state = pendiente["state"]
+        return {
+            "texto_usuario": state["tema"],
+            "df_final": pendiente["df_final"],
+            "X_embeddings": pendiente["X_embeddings"],
+            "num_recomendaciones": 6,
+            "modalidad": state["modalidad"] if filtrar else None,
+            "duracion": state["duracion"] if filtrar else None,
+            "snapshot": pendiente["snapshot"],
+        }
+
+    def _lineas_recomendacion(self, pendiente: dict) -> list[str]:
+        """Una línea por curso recomendado con el tema y los filtros del diálogo."""
+        # Ahora sí recomendar (el filtro de modalidad y duración se aplica antes de rankear)
+        filtrados = recommender_service.recomendar_cursos(**self._consulta(pendiente))
+
+        # Ningún curso cumple el filtro: recomendar sin filtrar
+        if not filtrados:
+            filtrados = recommender_service.recomendar_cursos(**self._consulta(pendiente, filtrar=False))
+        return self._formatear(filtrados)
+
+    async def _lineas_recomendacion_async(self, pendiente: dict) -> list[str]:
+        """Igual que _lineas_recomendacion, esperando el cálculo sin bloquear el event loop."""
+        filtrados = await recommender_service.recomendar_cursos_async(**self._consulta(pendiente))
+        if not filtrados:
+            filtrados = await recommender_service.recomendar_cursos_async(**self._consulta(pendiente, filtrar=False))
+        return self._formatear(filtrados)
+
+    @staticmethod
+    def _formatear(filtrados: list[dict]) -> list[str]:
+        # El tema no tiene palabras del catálogo: no hay con qué recomendar
+        if not filtrados:
+            return ["No encontré cursos sobre ese tema. Prueba a describirlo con otras palabras.\n"]
+        return [
+            f"{i}. {curso['NOMBRE_OFERTA']} ({curso['MODALIDAD']}, {curso['TIPO_OFERTA']})\n"
+            for i, curso in enumerate(filtrados, 1)
+        ]
+
+    def _cerrar_recomendacion(self, pendiente: dict, reply: str) -> dict:
+        """Resetea el flujo y guarda el turno del paso 3."""
+        conv_id = pendiente["conv_id"]
+        self.state_store.eliminar(conv_id)
+        self.conversation_service.registrar_turno(conv_id, [("user", pendiente["user_message"]), ("bot", reply)])
         return {"reply": reply, "id_conversation": conv_id}
     
     def get_messages(self, id_conversation: int):
@@ -141,11 +255,7 @@ class ChatbotLogicService:
         
 
 
-# Extraer los modelos cargados en memoria
-df_final = models_service._models_cache["cursos_info"]
-X_embeddings = models_service._models_cache["embeddings"]
-
 # ============================================================
 # SINGLETON INSTANCE
-chatbot_logic_service = ChatbotLogicService(df_final, X_embeddings)
+chatbot_logic_service = ChatbotLogicService()
 # ============================================================
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from src.api import conversationsRouter
+from src.api.modelsRouter import router as models_router
+from src.core.database import Base
+from src.services import modelService
+from src.services.asyncConversationService import AsyncConversationService
+from src.services.catalogStoreService import CourseCatalog
+from src.services.conversationService import ConversationService
+from src.services.indexService import CourseEmbeddingIndex, CourseFilterIndex, CourseTextIndex
+from src.services.modelRegistryService import ModelRegistry, ModelSnapshot
+from src.services.modelService import ModelService
+
+
+# ============================================================
+# DATOS SINTÉTICOS
+# ============================================================
+# Los tamaños se eligen con parametrización indirecta, p. ej.
+#   @pytest.mark.parametrize("catalogo_sintetico", [{"n_cursos": 600}], indirect=True)
+def crear_catalogo(n_cursos: int = 100_000, dim: int = 64, seed: int = 7) -> tuple[pd.DataFrame, np.ndarray]:
+    """Catálogo aleatorio con nombres de 3 a 6 palabras y embeddings float64."""
+    rng = np.random.default_rng(seed)
+    vocabulario = np.array([f"tema{i}" for i in range(3000)] + ["salud", "programacion", "liderazgo"])
+    nombres = [" ".join(rng.choice(vocabulario, rng.integers(3, 7))) for _ in range(n_cursos)]
+    df = pd.DataFrame({
+        "NOMBRE_OFERTA": nombres,
+        "MODALIDAD": rng.choice(["Virtual", "Presencial"], n_cursos),
+        "TIPO_OFERTA": rng.choice(["Curso corto", "Programa", "Diplomado"], n_cursos),
+    })
+    X_embeddings = rng.normal(size=(n_cursos, dim))
+    return df, X_embeddings
+
+
+def crear_snapshot(n_cursos: int = 2000, version: int = 1000) -> ModelSnapshot:
+    """Snapshot con el catálogo compilado y los índices que arma ModelService al cargar."""
+    df, X_embeddings = crear_catalogo(n_cursos=n_cursos)
+    catalogo = CourseCatalog.desde_dataframe(df)
+    return ModelSnapshot(
+        version=version,
+        models={"cursos_info": catalogo, "embeddings": X_embeddings},
+        indexes={"tfidf": CourseTextIndex(catalogo), "embeddings": CourseEmbeddingIndex(X_embeddings),
+                 "filtros": CourseFilterIndex(catalogo)}
+    )
+
+
+@pytest.fixture
+def catalogo_sintetico(request) -> tuple[pd.DataFrame, np.ndarray]:
+    """(df, X_embeddings) de crear_catalogo; argumentos por parametrización indirecta."""
+    return crear_catalogo(**getattr(request, "param", {}))
+
+
+@pytest.fixture
+def snapshot_sintetico(request) -> ModelSnapshot:
+    """Snapshot de crear_snapshot; argumentos (n_cursos, version) por parametrización indirecta."""
+    return crear_snapshot(**getattr(request, "param", {}))
+
+
+@pytest.fixture
+def snapshots_sinteticos():
+    """Fábrica de snapshots, para los tests que necesitan varios distintos."""
+    return crear_snapshot
+
+
+@pytest.fixture
+def consultas(request) -> list[str]:
+    """
+    Consultas de 1 a 3 palabras del vocabulario del catálogo sintético (algunas sin coincidencias).
+    Cantidad por parametrización indirecta (por defecto 40).
+    """
+    rng = np.random.default_rng(3)
+    vocabulario = [f"tema{i}" for i in range(3000)] + ["salud", "programacion", "liderazgo", "sin", "coincidencias"]
+    return [" ".join(rng.choice(vocabulario, rng.integers(1, 4))) for _ in range(getattr(request, "param", 40))]
+
+
+# ============================================================
+# BASES TEMPORALES
+# ============================================================
+@pytest.fixture
+def session_factory(tmp_path) -> sessionmaker:
+    """Fábrica de sesiones sobre una base SQLite temporal con el esquema creado."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    engine.dispose()
+
+
+@pytest.fixture
+def servicio_temporal(tmp_path) -> tuple[ConversationService, list]:
+    """ConversationService sobre una base SQLite temporal, con un contador de commits."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    yield ConversationService(session_factory=sessionmaker(bind=engine, autoflush=False, autocommit=False)), commits
+    engine.dispose()
+
+
+@pytest.fixture
+def servicios_temporales(tmp_path) -> tuple[ConversationService, AsyncConversationService]:
+    """Servicio síncrono y asíncrono sobre la misma base SQLite temporal."""
+    path = tmp_path / "chat.db"
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    yield (
+        ConversationService(session_factory=sessionmaker(bind=engine, autoflush=False, autocommit=False)),
+        AsyncConversationService(session_factory=async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)),
+    )
+    engine.dispose()
+
+
+@pytest.fixture
+def cliente_conversaciones(servicios_temporales, monkeypatch) -> TestClient:
+    """Cliente del router de conversaciones servido por el servicio asíncrono de `servicios_temporales`."""
+    monkeypatch.setattr(conversationsRouter, "conversation_service", servicios_temporales[1])
+    app = FastAPI()
+    app.include_router(conversationsRouter.router, prefix="/api/conversations")
+    with TestClient(app) as client:
+        yield client
+
+
+# ============================================================
+# API DE MODELOS
+# ============================================================
+@pytest.fixture
+def cliente(tmp_path, monkeypatch) -> TestClient:
+    """Cliente del router de modelos con los artefactos redirigidos a un directorio temporal."""
+    monkeypatch.setattr(ModelService, "_path_map", {tipo: tmp_path / path.name for tipo, path in ModelService._path_map.items()})
+    monkeypatch.setattr(ModelService, "_registry", ModelRegistry(tmp_path / "manifest.json"))
+    monkeypatch.setattr(modelService, "MATRIZ_TOPK_DIR", tmp_path / "matriz_topk.npz")
+    monkeypatch.setattr(modelService, "CURSOS_CATALOG_DIR", tmp_path / "cursos_info.catalog")
+    monkeypatch.setattr(modelService, "EMBEDDINGS_NORM_DIR", tmp_path / "embeddings_normalizados.npy")
+    monkeypatch.setattr(modelService, "UPLOAD_CHUNK_SIZE", 4096)
+
+    app = FastAPI()
+    app.include_router(models_router, prefix="/api/models")
+    return TestClient(app)
@@ -1,8 +1,11 @@
 import logging
 from datetime import datetime
+from sqlalchemy import update
 from sqlalchemy.orm import Session
+from src.core.config import CHAT_WRITE_BEHIND
 from src.core.database import SessionLocal
 from src.models.conversationModel import Conversation, Message
+from src.services.messageLogService import MessageLog, message_log as default_message_log
 from contextlib import contextmanager
 from typing import Generator
 
@@ -11,14 +14,17 @@ logger = logging.getLogger(__name__)
 class ConversationService:
     """Servicio de gestión de conversaciones y mensajes."""
 
-    def __init__(self):
+    def __init__(self, session_factory=SessionLocal, message_log=None):
         self.model = Conversation
+        self.session_factory = session_factory
+        # Con un MessageLog los turnos se guardan en segundo plano (write-behind)
+        self.message_log = message_log
 
 
     @contextmanager
     def get_session(self) -> Generator[Session, None, None]:
         """Proporciona una sesión de base de datos."""
-        session = SessionLocal()
+        session = self.session_factory()
         try:
             yield session
         finally:
@@ -29,7 +35,7 @@ class ConversationService:
     # ------------------------------------------------------------
     def get_or_create_conversation(self, id_conversation: int | None) -> Conversation:
         """Retorna una conversación existente o crea una nueva si no existe."""
-        with SessionLocal() as db:
+        with self.session_factory() as db:
             if id_conversation:
                 conversation = db.query(Conversation).filter_by(id_conversation=id_conversation).first()
                 if conversation:
@@ -47,7 +53,7 @@ class ConversationService:
     # ------------------------------------------------------------
     def create_conversation(self ) -> Conversation:
         """Crea una nueva conversación."""
-        with SessionLocal() as db:
+        with self.session_factory() as db:
             new_conv = Conversation(start_time=datetime.utcnow())
             db.add(new_conv)
             db.commit()
@@ -60,7 +66,7 @@ class ConversationService:
     # ------------------------------------------------------------
     def get_conversation(self, id_conversation: int) -> Conversation | None:
         """Trae una conversación existente por su ID."""
-        with SessionLocal() as db:
+        with self.session_factory() as db:
             conversation = db.query(Conversation).filter_by(id_conversation=id_conversation).first()
             if conversation:
                 return conversation
@@ -68,19 +74,10 @@ class ConversationService:
             return None
         
     def get_messages(self, id_conversation: int) -> list[dict]:
-        with SessionLocal() as db:
-            messages = (
-                db.query(Message)
-                .filter(Message.id_conversation == id_conversation)
-                .order_by(Message.created_at.asc())
-                .all()
-            )
-            if not messages:
-                logger.warning(f"No se encontraron mensajes para la conversación {id_conversation}")
-            return [
-                {"sender": m.sender, "text": m.content, "created_at": m.created_at}
-                for m in messages
-            ]
+        return [
+            {"sender": m["sender"], "text": m["content"], "created_at": m["created_at"]}
+            for m in self._historial(id_conversation)
+        ]
     
     # ------------------------------------------------------------
     # Guardar un mensaje
@@ -94,7 +91,7 @@ class ConversationService:
         confidence_score: float | None = None
     ) -> Message:
         """Guarda un mensaje en la base de datos (crea conversación si no existe)."""
-        with SessionLocal() as db:
+        with self.session_factory() as db:
             if id_conversation is None:
                 conversation = Conversation(start_time=datetime.utcnow())
                 db.add(conversation)
@@ -128,31 +125,95 @@ class ConversationService:
             logger.info(f"Mensaje guardado → id_conv={id_conversation}, sender={sender}")
             return message
 
+    # ------------------------------------------------------------
+    # Unidad de trabajo de un turno de chat
+    # ------------------------------------------------------------
+    def iniciar_conversacion(self, mensajes_bot: list[str]) -> int:
+        """
+        Crea una conversación con sus mensajes de bienvenida en una sola transacción.
+        Retorna el id de la nueva conversación.
+        """
+        with self.session_factory() as db:
+            ahora = datetime.utcnow()
+            conversation = Conversation(start_time=ahora)
+            db.add(conversation)
+            db.flush()  # asigna id_conversation sin confirmar aún
+
+            db.add_all([
+                Message(id_conversation=conversation.id_conversation, sender="bot", content=texto, created_at=datetime.utcnow())
+                for texto in mensajes_bot
+            ])
+            db.commit()
+            logger.info(f"Nueva conversación creada con id={conversation.id_conversation} ({len(mensajes_bot)} mensajes)")
+            return conversation.id_conversation
+
+    def registrar_turno(self, id_conversation: int, mensajes: list[tuple[str, str]]) -> None:
+        """
+        Guarda los mensajes de un turno (p. ej. [("user", ...), ("bot", ...)]) y, si hay
+        mensaje del usuario, actualiza end_time; todo con un único commit y sin refresh.
+        Si la conversación no existe se crea con ese id, como hace save_message.
+        En modo write-behind solo se encola y el commit lo hace el escritor de fondo.
+        """
+        if self.message_log is not None:
+            self.message_log.encolar(id_conversation, mensajes)
+            return
+
+        with self.session_factory() as db:
+            ahora = datetime.utcnow()
+            valores = {"end_time": ahora} if any(sender == "user" for sender, _ in mensajes) else {}
+
+            if valores:
+                actualizadas = db.execute(
+                    update(Conversation)
+                    .where(Conversation.id_conversation == id_conversation)
+                    .values(**valores)
+                ).rowcount
+            else:
+                actualizadas = db.query(Conversation.id_conversation).filter_by(id_conversation=id_conversation).count()
+
+            if not actualizadas:
+                db.add(Conversation(id_conversation=id_conversation, start_time=ahora, **valores))
+                logger.warning(f"Conversación {id_conversation} no existía, creada nuevamente.")
+
+            db.add_all([
+                Message(id_conversation=id_conversation, sender=sender, content=content, created_at=datetime.utcnow())
+                for sender, content in mensajes
+            ])
+            db.commit()
+            logger.info(f"Turno guardado → id_conv={id_conversation}, mensajes={len(mensajes)}")
+
     # ------------------------------------------------------------
     # Recuperar historial
     # ------------------------------------------------------------
-    def get_conversation_history(self, id_conversation: int) -> list[dict]:
-        """Recupera los mensajes de una conversación en orden cronológico."""
-        with SessionLocal() as db:
+    def _historial(self, id_conversation: int) -> list[dict]:
+        # Los pendientes se toman antes de leer la base (ver MessageLog.combinar)
+        pendientes = self.message_log.pendientes(id_conversation) if self.message_log is not None else []
+        with self.session_factory() as db:
             messages = (
                 db.query(Message)
                 .filter(Message.id_conversation == id_conversation)
                 .order_by(Message.created_at.asc())
                 .all()
             )
-            if not messages:
-                logger.warning(f"No se encontraron mensajes para la conversación {id_conversation}")
-            return [
+            guardados = [
                 {"sender": m.sender, "content": m.content, "created_at": m.created_at}
                 for m in messages
             ]
+        historial = MessageLog.combinar(guardados, pendientes)
+        if not historial:
+            logger.warning(f"No se encontraron mensajes para la conversación {id_conversation}")
+        return historial
+
+    def get_conversation_history(self, id_conversation: int) -> list[dict]:
+        """Recupera los mensajes de una conversación en orden cronológico."""
+        return self._historial(id_conversation)
 
     # ------------------------------------------------------------
     # Listar conversaciones
     # ------------------------------------------------------------
     def list_conversations(self, limit: int = 20) -> list[Conversation]:
         """Lista las conversaciones más recientes."""
-        with SessionLocal() as db:
+        with self.session_factory() as db:
             return (
                 db.query(Conversation)
                 .order_by(Conversation.start_time.desc())
@@ -165,7 +226,7 @@ class ConversationService:
     # ------------------------------------------------------------
     def delete_conversation(self, id_conversation: int) -> dict:
         """Elimina una conversación y sus mensajes."""
-        with SessionLocal() as db:
+        with self.session_factory() as db:
             convo = db.query(Conversation).filter_by(id_conversation=id_conversation).first()
             if not convo:
                 logger.warning(f"Intento de eliminar conversación inexistente: {id_conversation}")
@@ -182,7 +243,7 @@ class ConversationService:
     # ============================================================
     def update_last_activity(self, id_conversation: int) -> None:
         """Actualiza la hora de la última actividad de la conversación."""
-        with SessionLocal() as db:
+        with self.session_factory() as db:
             conversation = db.query(Conversation).filter_by(id_conversation=id_conversation).first()
             if conversation:
                 conversation.last_activity = datetime.utcnow()
@@ -194,5 +255,5 @@ class ConversationService:
         
 # ============================================================
 # SINGLETON INSTANCE
-conversation_service = ConversationService()
+conversation_service = ConversationService(message_log=default_message_log if CHAT_WRITE_BEHIND else None)
 # ============================================================
\ No newline at end of file
@@ -0,0 +1,166 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from sqlalchemy import delete
+from src.core.config import CONVERSATION_STATE_BACKEND, CONVERSATION_STATE_TTL_S, CONVERSATION_STATE_MAX_ENTRIES, REDIS_URL
+from src.core.database import SessionLocal
+from src.models.conversationModel import ConversationState
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# BACKEND EN MEMORIA — MemoryStateStore
+# ============================================================
+class MemoryStateStore:
+    """
+    Estado por proceso: LRU acotado a `max_entries` con expiración por inactividad.
+    No se comparte entre workers; sirve para un solo proceso y para desarrollo.
+    """
+
+    nombre = "memory"
+
+    def __init__(self, ttl_s: int = CONVERSATION_STATE_TTL_S, max_entries: int = CONVERSATION_STATE_MAX_ENTRIES):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._estados = OrderedDict()  # id_conversation -> (expira, estado)
+        self._lock = threading.Lock()
+
+    def obtener(self, id_conversation: int) -> dict | None:
+        with self._lock:
+            entrada = self._estados.get(id_conversation)
+            if entrada is None:
+                return None
+            expira, estado = entrada
+            if expira < time.monotonic():
+                del self._estados[id_conversation]
+                return None
+            self._estados.move_to_end(id_conversation)
+            return dict(estado)
+
+    def guardar(self, id_conversation: int, estado: dict):
+        with self._lock:
+            self._estados[id_conversation] = (time.monotonic() + self.ttl_s, dict(estado))
+            self._estados.move_to_end(id_conversation)
+            while len(self._estados) > self.max_entries:
+                self._estados.popitem(last=False)
+
+    def eliminar(self, id_conversation: int):
+        with self._lock:
+            self._estados.pop(id_conversation, None)
+
+    def __len__(self):
+        return len(self._estados)
+
+
+# ============================================================
+# BACKEND COMPARTIDO EN BASE DE DATOS — DatabaseStateStore
+# ============================================================
+class DatabaseStateStore:
+    """
+    Estado en la tabla conversation_states (SQLite o Postgres): lo ven todos los
+    workers y sobrevive a reinicios. Los estados inactivos más de `ttl_s` se ignoran
+    y se purgan cada `purga_cada` escrituras.
+    """
+
+    nombre = "database"
+
+    def __init__(self, session_factory=SessionLocal, ttl_s: int = CONVERSATION_STATE_TTL_S, purga_cada: int = 1000):
+        self.session_factory = session_factory
+        self.ttl_s = ttl_s
+        self.purga_cada = purga_cada
+        self._escrituras = 0
+        self._lock = threading.Lock()
+
+    def _limite(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=self.ttl_s)
+
+    def obtener(self, id_conversation: int) -> dict | None:
+        with self.session_factory() as db:
+            fila = db.get(ConversationState, id_conversation)
+            if fila is None or fila.updated_at < self._limite():
+                return None
+            return dict(fila.state)
+
+    def guardar(self, id_conversation: int, estado: dict):
+        with self.session_factory() as db:
+            db.merge(ConversationState(id_conversation=id_conversation, state=dict(estado), updated_at=datetime.utcnow()))
+            db.commit()
+
+        with self._lock:
+            self._escrituras += 1
+            purgar = self._escrituras % self.purga_cada == 0
+        if purgar:
+            self.purgar()
+
+    def eliminar(self, id_conversation: int):
+        with self.session_factory() as db:
+            db.execute(delete(ConversationState).where(ConversationState.id_conversation == id_conversation))
+            db.commit()
+
+    def purgar(self) -> int:
+        """Elimina los estados expirados. Retorna cuántos se borraron."""
+        with self.session_factory() as db:
+            borrados = db.execute(delete(ConversationState).where(ConversationState.updated_at < self._limite())).rowcount
+            db.commit()
+        if borrados:
+            logger.info(f"Estados de conversación expirados eliminados: {borrados}")
+        return borrados
+
+
+# ============================================================
+# BACKEND COMPARTIDO EN REDIS — RedisStateStore
+# ============================================================
+class RedisStateStore:
+    """
+    Estado en Redis (o cualquier servidor compatible) con expiración nativa (EX).
+    Basta un cliente con get/set/delete: en pruebas se puede pasar uno falso.
+    """
+
+    nombre = "redis"
+
+    def __init__(self, client=None, ttl_s: int = CONVERSATION_STATE_TTL_S, url: str = REDIS_URL,
+                 prefijo: str = "chatbot:state:"):
+        if client is None:
+            import redis  # en requirements.txt; se importa aquí para no cargarlo con los otros backends
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl_s = ttl_s
+        self.prefijo = prefijo
+
+    def _clave(self, id_conversation: int) -> str:
+        return f"{self.prefijo}{id_conversation}"
+
+    def obtener(self, id_conversation: int) -> dict | None:
+        valor = self.client.get(self._clave(id_conversation))
+        return json.loads(valor) if valor is not None else None
+
+    def guardar(self, id_conversation: int, estado: dict):
+        self.client.set(self._clave(id_conversation), json.dumps(estado), ex=self.ttl_s)
+
+    def eliminar(self, id_conversation: int):
+        self.client.delete(self._clave(id_conversation))
+
+
+CONVERSATION_STATE_BACKENDS = {
+    MemoryStateStore.nombre: MemoryStateStore,
+    DatabaseStateStore.nombre: DatabaseStateStore,
+    RedisStateStore.nombre: RedisStateStore,
+}
+
+
+def crear_state_store(backend: str = CONVERSATION_STATE_BACKEND, **opciones):
+    """Instancia el backend de estado configurado."""
+    if backend not in CONVERSATION_STATE_BACKENDS:
+        raise ValueError(f"Backend de estado de conversación no válido: {backend}")
+    logger.info(f"Estado de conversaciones en backend '{backend}'")
+    return CONVERSATION_STATE_BACKENDS[backend](**opciones)
+
+
+# ============================================================
+# SINGLETON INSTANCE
+conversation_state_store = crear_state_store()
+# ============================================================
@@ -0,0 +1,328 @@
+import io
+import logging
+import time
+import numpy as np
+from pathlib import Path
+from src.services.indexService import normalizar_filas, top_k_indices
+from src.services.modelRegistryService import escribir_atomico
+
+logger = logging.getLogger(__name__)
+
+# Filas por bloque al cuantizar y al recorrer el catálogo: acota la copia float32 temporal
+BLOQUE_FILAS = 32768
+
+
+def firma_cuantizacion(X_embeddings: np.ndarray) -> np.ndarray:
+    """Huella barata (forma + suma de una muestra de filas normalizadas) para validar cuantizaciones guardadas."""
+    n_docs, dim = X_embeddings.shape
+    muestra = normalizar_filas(np.asarray(X_embeddings[::max(1, n_docs // 1024)]))
+    return np.array([n_docs, dim, float(muestra.sum(dtype=np.float64))])
+
+
+# ============================================================
+# BASE — QuantizedVectors
+# ============================================================
+class QuantizedVectors:
+    """
+    Embeddings normalizados guardados en un formato compacto. `similitudes` retorna
+    la similitud coseno (aproximada) con un vector unitario contra todo el catálogo,
+    por bloques de BLOQUE_FILAS, o contra `indices`.
+    """
+
+    nombre = None
+
+    def _preparar(self, q_unit: np.ndarray):
+        """Lo que se calcula una vez por consulta (la consulta misma o sus tablas)."""
+        return q_unit
+
+    def _puntuar(self, consulta, filas) -> np.ndarray:
+        raise NotImplementedError
+
+    def similitudes(self, q_unit: np.ndarray, indices: np.ndarray | None = None) -> np.ndarray:
+        consulta = self._preparar(q_unit)
+        if indices is not None:
+            return self._puntuar(consulta, indices)
+
+        sims = np.empty(self.n_docs, dtype=np.float32)
+        for inicio in range(0, self.n_docs, BLOQUE_FILAS):
+            sims[inicio:inicio + BLOQUE_FILAS] = self._puntuar(consulta, slice(inicio, inicio + BLOQUE_FILAS))
+        return sims
+
+    def guardar(self, path: Path):
+        """Los formatos escalares se recalculan al cargar en una pasada; no se persisten."""
+        return None
+
+
+# ============================================================
+# SIN CUANTIZAR — Float32Vectors
+# ============================================================
+class Float32Vectors(QuantizedVectors):
+    """Referencia: la copia float32 normalizada de siempre (4 bytes por dimensión)."""
+
+    nombre = "float32"
+
+    def __init__(self, normalizadas: np.ndarray):
+        self.codigos = normalizadas
+        self.n_docs, self.dim = normalizadas.shape
+
+    @classmethod
+    def desde_embeddings(cls, X_embeddings: np.ndarray) -> "Float32Vectors":
+        return cls(normalizar_filas(X_embeddings))
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codigos.nbytes)
+
+    def similitudes(self, q_unit: np.ndarray, indices: np.ndarray | None = None) -> np.ndarray:
+        return self.codigos @ q_unit if indices is None else self.codigos[indices] @ q_unit
+
+
+# ============================================================
+# MEDIA PRECISIÓN — Float16Vectors
+# ============================================================
+class Float16Vectors(QuantizedVectors):
+    """Embeddings normalizados en float16 (2 bytes por dimensión); se puntúan en float32 por bloques."""
+
+    nombre = "float16"
+
+    def __init__(self, codigos: np.ndarray):
+        self.codigos = codigos
+        self.n_docs, self.dim = codigos.shape
+
+    @classmethod
+    def desde_embeddings(cls, X_embeddings: np.ndarray) -> "Float16Vectors":
+        codigos = np.empty(X_embeddings.shape, dtype=np.float16)
+        for inicio in range(0, len(codigos), BLOQUE_FILAS):
+            codigos[inicio:inicio + BLOQUE_FILAS] = normalizar_filas(np.asarray(X_embeddings[inicio:inicio + BLOQUE_FILAS]))
+        return cls(codigos)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codigos.nbytes)
+
+    def _puntuar(self, q_unit: np.ndarray, filas) -> np.ndarray:
+        return self.codigos[filas].astype(np.float32) @ q_unit
+
+
+# ============================================================
+# ENTEROS DE 8 BITS — Int8Vectors
+# ============================================================
+class Int8Vectors(QuantizedVectors):
+    """
+    Cuantización escalar simétrica por fila: código int8 por dimensión y una escala
+    float32 por curso (máx |x| / 127), de modo que x ≈ código · escala.
+    """
+
+    nombre = "int8"
+
+    def __init__(self, codigos: np.ndarray, escalas: np.ndarray):
+        self.codigos = codigos
+        self.escalas = escalas
+        self.n_docs, self.dim = codigos.shape
+
+    @classmethod
+    def desde_embeddings(cls, X_embeddings: np.ndarray) -> "Int8Vectors":
+        codigos = np.empty(X_embeddings.shape, dtype=np.int8)
+        escalas = np.empty(len(codigos), dtype=np.float32)
+        for inicio in range(0, len(codigos), BLOQUE_FILAS):
+            bloque = normalizar_filas(np.asarray(X_embeddings[inicio:inicio + BLOQUE_FILAS]))
+            maximos = np.abs(bloque).max(axis=1) / 127
+            maximos[maximos == 0] = 1.0
+            codigos[inicio:inicio + len(bloque)] = np.rint(bloque / maximos[:, None])
+            escalas[inicio:inicio + len(bloque)] = maximos
+        return cls(codigos, escalas)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codigos.nbytes + self.escalas.nbytes)
+
+    def _puntuar(self, q_unit: np.ndarray, filas) -> np.ndarray:
+        return (self.codigos[filas].astype(np.float32) @ q_unit) * self.escalas[filas]
+
+
+# ============================================================
+# PRODUCT QUANTIZATION — PQVectors
+# ============================================================
+class PQVectors(QuantizedVectors):
+    """
+    Product quantization: cada embedding normalizado se parte en `m` subvectores y cada
+    subvector se reemplaza por el índice (1 byte) del más cercano de los 256 centroides
+    de su subespacio, entrenados con k-means sobre una muestra.
+
+    Una consulta calcula una vez la tabla (m, 256) de productos punto de sus subvectores
+    con los centroides; la similitud de cada curso es la suma de m entradas de la tabla
+    (distancia asimétrica: la consulta no se cuantiza).
+    """
+
+    nombre = "pq"
+
+    def __init__(self, centroides: np.ndarray, codigos: np.ndarray, dim: int, firma: np.ndarray | None = None):
+        self.centroides = np.ascontiguousarray(centroides, dtype=np.float32)  # (m, n_centroides, dsub)
+        self.codigos = codigos  # (m, n_docs) uint8: cada subespacio contiguo
+        self.m, self.n_centroides, self.dsub = self.centroides.shape
+        self.n_docs = codigos.shape[1]
+        self.dim = dim
+        self.firma = firma
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codigos.nbytes + self.centroides.nbytes)
+
+    def _subvectores(self, X: np.ndarray) -> np.ndarray:
+        """Filas normalizadas, completadas con ceros hasta m · dsub y partidas en (n, m, dsub)."""
+        relleno = np.zeros((len(X), self.m * self.dsub), dtype=np.float32)
+        relleno[:, :self.dim] = normalizar_filas(np.asarray(X))
+        return relleno.reshape(len(X), self.m, self.dsub)
+
+    # --------------------------------------------------------
+    # Entrenamiento
+    # --------------------------------------------------------
+    @staticmethod
+    def _asignar(X: np.ndarray, centroides: np.ndarray) -> np.ndarray:
+        """Centroide más cercano (distancia euclidiana) de cada fila."""
+        return np.argmin((centroides ** 2).sum(axis=1) - 2 * X @ centroides.T, axis=1)
+
+    @classmethod
+    def _kmeans(cls, X: np.ndarray, n_centroides: int, iteraciones: int, rng) -> np.ndarray:
+        from scipy import sparse
+
+        centroides = X[rng.choice(len(X), n_centroides, replace=False)].copy()
+        for _ in range(iteraciones):
+            asignacion = cls._asignar(X, centroides)
+            pertenencia = sparse.csr_matrix(
+                (np.ones(len(X), dtype=np.float32), (asignacion, np.arange(len(X)))), shape=(n_centroides, len(X))
+            )
+            conteos = np.bincount(asignacion, minlength=n_centroides)
+            sumas = np.asarray(pertenencia @ X)
+
+            # Centroides vacíos: se reinician con puntos aleatorios de la muestra
+            vacios = np.flatnonzero(conteos == 0)
+            sumas[vacios] = X[rng.choice(len(X), len(vacios), replace=False)]
+            conteos[vacios] = 1
+            centroides = sumas / conteos[:, None]
+        return centroides
+
+    @classmethod
+    def entrenar(cls, X_embeddings: np.ndarray, m: int = 16, n_centroides: int = 256,
+                 iteraciones: int = 15, seed: int = 0) -> "PQVectors":
+        """Entrena los centroides de cada subespacio sobre una muestra y codifica todo el catálogo por bloques."""
+        n_docs, dim = X_embeddings.shape
+        m = max(1, min(m, dim))
+        rng = np.random.default_rng(seed)
+        muestra = np.sort(rng.choice(n_docs, min(n_docs, max(n_centroides * 64, 20_000)), replace=False))
+        n_centroides = min(n_centroides, len(muestra))
+
+        pq = cls(np.zeros((m, n_centroides, -(-dim // m)), dtype=np.float32),
+                 np.empty((m, n_docs), dtype=np.uint8), dim, firma_cuantizacion(X_embeddings))
+        subvectores = pq._subvectores(X_embeddings[muestra])
+        for j in range(m):
+            pq.centroides[j] = cls._kmeans(subvectores[:, j], n_centroides, iteraciones, rng)
+
+        for inicio in range(0, n_docs, BLOQUE_FILAS):
+            bloque = pq._subvectores(X_embeddings[inicio:inicio + BLOQUE_FILAS])
+            for j in range(m):
+                pq.codigos[j, inicio:inicio + len(bloque)] = cls._asignar(bloque[:, j], pq.centroides[j])
+
+        logger.info(f"Product quantization entrenada: {n_docs} vectores, {m} subvectores × {n_centroides} centroides")
+        return pq
+
+    # --------------------------------------------------------
+    # Consulta
+    # --------------------------------------------------------
+    def _preparar(self, q_unit: np.ndarray) -> np.ndarray:
+        """Tabla (m, n_centroides): producto punto de cada subvector de la consulta con cada centroide."""
+        q = np.zeros(self.m * self.dsub, dtype=np.float32)
+        q[:self.dim] = q_unit
+        return np.einsum("jcd,jd->jc", self.centroides, q.reshape(self.m, self.dsub))
+
+    def _puntuar(self, tabla: np.ndarray, filas) -> np.ndarray:
+        codigos = self.codigos[:, filas]
+        sims = tabla[0][codigos[0]]
+        for j in range(1, self.m):
+            sims += tabla[j][codigos[j]]
+        return sims
+
+    # --------------------------------------------------------
+    # Persistencia
+    # --------------------------------------------------------
+    def guardar(self, path: Path):
+        """Guarda centroides y códigos para no reentrenar en cada carga."""
+        buffer = io.BytesIO()
+        np.savez(buffer, centroides=self.centroides, codigos=self.codigos, dim=self.dim, firma=self.firma)
+        escribir_atomico(path, buffer.getvalue())
+        logger.info(f"Product quantization guardada en {path}")
+
+    @classmethod
+    def cargar(cls, path: Path, X_embeddings: np.ndarray, m: int):
+        """Recupera la cuantización guardada; None si no corresponde a los embeddings o a `m` actuales."""
+        if not Path(path).exists():
+            return None
+        with np.load(path) as data:
+            if not np.array_equal(data["firma"], firma_cuantizacion(X_embeddings)) or data["centroides"].shape[0] != m:
+                logger.warning(f"Product quantization en {path} no corresponde a los embeddings actuales. Se reentrenará.")
+                return None
+            return cls(data["centroides"], data["codigos"], int(data["dim"]), data["firma"])
+
+
+EMBEDDING_QUANTIZERS = {
+    Float32Vectors.nombre: Float32Vectors,
+    Float16Vectors.nombre: Float16Vectors,
+    Int8Vectors.nombre: Int8Vectors,
+    PQVectors.nombre: PQVectors,
+}
+
+
+# ============================================================
+# CONSTRUCCIÓN Y EVALUACIÓN
+# ============================================================
+def cuantizar(modo: str, X_embeddings: np.ndarray, path: Path | None = None, subvectores: int = 16) -> QuantizedVectors:
+    """Cuantiza los embeddings en el modo indicado (la PQ se recupera de disco si está al día)."""
+    if modo not in EMBEDDING_QUANTIZERS:
+        raise ValueError(f"Modo de cuantización no válido: {modo}")
+
+    if modo != PQVectors.nombre:
+        return EMBEDDING_QUANTIZERS[modo].desde_embeddings(X_embeddings)
+
+    m = max(1, min(subvectores, X_embeddings.shape[1]))
+    vectores = PQVectors.cargar(path, X_embeddings, m) if path else None
+    if vectores is None:
+        vectores = PQVectors.entrenar(X_embeddings, m=m)
+        if path:
+            vectores.guardar(path)
+    return vectores
+
+
+def evaluar_cuantizacion(vectores: QuantizedVectors, referencia: np.ndarray, X_embeddings: np.ndarray,
+                         consultas: np.ndarray, k: int = 10, rerank: int = 0) -> dict:
+    """
+    Mide recall@k de la búsqueda sobre los embeddings cuantizados contra la exacta en float32
+    (`referencia`), su latencia por consulta y su memoria. Con `rerank`, los `rerank` mejores
+    se vuelven a puntuar con los embeddings originales antes de quedarse con k.
+    Las consultas deben venir normalizadas (una por fila).
+    """
+    aciertos = 0
+    latencias = []
+    for q_unit in consultas:
+        esperados = top_k_indices(referencia @ q_unit, k)
+        inicio = time.perf_counter()
+        obtenidos = top_k_indices(vectores.similitudes(q_unit), max(k, rerank))
+        if rerank:
+            obtenidos = np.sort(obtenidos)
+            exactas = normalizar_filas(np.asarray(X_embeddings[obtenidos])) @ q_unit
+            obtenidos = obtenidos[top_k_indices(exactas, k)]
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        aciertos += len(np.intersect1d(esperados, obtenidos[:k]))
+
+    return {
+        "modo": vectores.nombre,
+        "k": k,
+        "rerank": rerank,
+        "consultas": len(consultas),
+        "recall_at_k": aciertos / (k * len(consultas)) if len(consultas) else None,
+        "latencia_ms_p50": float(np.percentile(latencias, 50)) if latencias else None,
+        "latencia_ms_p99": float(np.percentile(latencias, 99)) if latencias else None,
+        "bytes": vectores.nbytes,
+        "bytes_por_curso": vectores.nbytes / max(1, vectores.n_docs),
+        "compresion_vs_float32": referencia.nbytes / vectores.nbytes,
+        "compresion_vs_original": X_embeddings.nbytes / vectores.nbytes,
+    }
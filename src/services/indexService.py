@@ -0,0 +1,445 @@
+import io
+import logging
+import re
+import numpy as np
+import pandas as pd
+from src.core.config import TEXT_ANALYZER, TEXT_CHAR_NGRAMS, TEXT_NGRAM_MAX_DF
+from src.services.catalogStoreService import CourseCatalog
+from src.services.modelRegistryService import escribir_atomico
+from src.services.textAnalysisService import AnalizadorEspanol, plegar_acentos
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# UTILIDADES
+# ============================================================
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Índices de los k puntajes más altos, en orden descendente.
+
+    Equivale a np.argsort(scores, kind="stable")[::-1][:k] (a igual puntaje
+    gana el índice mayor), pero en O(n) con partición en lugar de ordenar
+    todo el vector; solo se ordenan los k candidatos.
+    """
+    scores = np.asarray(scores)
+    n = scores.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    umbral = np.partition(scores, n - k)[n - k]
+    mayores = np.flatnonzero(scores > umbral)
+    empates = np.flatnonzero(scores == umbral)[::-1][:k - len(mayores)]
+    candidatos = np.concatenate([mayores, empates])
+
+    orden = np.lexsort((-candidatos, -scores[candidatos]))
+    return candidatos[orden]
+
+
+def top_k_filas(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    top_k_indices aplicado a cada fila de una matriz (m, n), con el mismo desempate.
+    Se resuelve con una sola partición vectorizada; solo las filas con empates en el
+    umbral que quedan fuera de los candidatos se recalculan una a una.
+    """
+    m, n = scores.shape
+    k = min(k, n)
+    if k <= 0:
+        return np.empty((m, 0), dtype=np.intp)
+
+    candidatos = np.argpartition(scores, n - k, axis=1)[:, n - k:]
+    valores = np.take_along_axis(scores, candidatos, axis=1)
+    umbral = valores.min(axis=1, keepdims=True)
+
+    orden = np.lexsort((-candidatos, -valores), axis=-1)
+    resultado = np.take_along_axis(candidatos, orden, axis=1)
+
+    ambiguas = np.flatnonzero((scores == umbral).sum(axis=1) != (valores == umbral).sum(axis=1))
+    for i in ambiguas:
+        resultado[i] = top_k_indices(scores[i], k)
+    return resultado
+
+
+def normalizar_filas(X: np.ndarray) -> np.ndarray:
+    """
+    Copia contigua float32 de X con filas de norma 1 (las filas nulas quedan en cero).
+    Si X ya es float32 contiguo y normalizado (p. ej. un .npy mapeado) se reutiliza sin copiar.
+    """
+    normas = np.linalg.norm(X, axis=1, keepdims=True)
+    if X.dtype == np.float32 and X.flags.c_contiguous and np.allclose(normas[normas > 0], 1.0, atol=1e-5):
+        return X
+
+    normas[normas == 0] = 1.0
+    return np.ascontiguousarray(X / normas, dtype=np.float32)
+
+
+# ============================================================
+# ÍNDICE TF-IDF — CourseTextIndex
+# ============================================================
+class CourseTextIndex:
+    """
+    Índice de texto de los cursos construido una sola vez por catálogo (CourseCatalog o DataFrame):
+    - Vocabulario TF-IDF ajustado sobre NOMBRE_OFERTA con el analizador de TEXT_ANALYZER
+      ("espanol": ver AnalizadorEspanol; "simple": tokenización por defecto, hasta `max_features` términos).
+    - Matriz dispersa (CSR) con filas normalizadas L2 y su transpuesta por términos (CSC),
+      que es el índice invertido: la columna de cada término lista sus cursos y pesos.
+      Los n-gramas de caracteres presentes en más de TEXT_NGRAM_MAX_DF de los cursos se quitan
+      del vocabulario (y las filas se renormalizan), así ningún posting recorre casi todo el catálogo.
+
+    Como las filas ya están normalizadas, la similitud coseno de una
+    consulta es un único producto disperso contra la matriz.
+    """
+
+    def __init__(self, df_cursos, max_features: int = 5000, analizador: str | None = None):
+        # scikit-learn se importa al construir el índice (en la carga de modelos), no al arrancar
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        if isinstance(df_cursos, CourseCatalog):
+            corpus = [nombre or '' for nombre in df_cursos.columna('NOMBRE_OFERTA')]
+        else:
+            corpus = df_cursos['NOMBRE_OFERTA'].fillna('').astype(str).tolist()
+
+        analizador = analizador or TEXT_ANALYZER
+        if analizador == "espanol":
+            self.vectorizer = TfidfVectorizer(analyzer=AnalizadorEspanol(TEXT_CHAR_NGRAMS))
+        elif analizador == "simple":
+            self.vectorizer = TfidfVectorizer(max_features=max_features)
+        else:
+            raise ValueError(f"Analizador de texto desconocido: {analizador}")
+        self.matrix = self.vectorizer.fit_transform(corpus).tocsr()
+        if analizador == "espanol":
+            self._podar_ngramas(TEXT_NGRAM_MAX_DF)
+        self.n_docs = self.matrix.shape[0]
+        self.df_cursos = df_cursos
+
+        # Acceso por columnas (término → cursos) para puntuar solo los términos de la consulta
+        self._matrix_csc = self.matrix.tocsc()
+        self._analyzer = self.vectorizer.build_analyzer()
+        self._vocabulary = self.vectorizer.vocabulary_
+        self._idf = self.vectorizer.idf_
+
+        logger.info(f"Índice TF-IDF construido: {self.n_docs} cursos, {len(self.vectorizer.vocabulary_)} términos")
+
+    def _podar_ngramas(self, max_df: float):
+        """Quita del vocabulario los n-gramas (términos "#...") con frecuencia documental mayor que `max_df`."""
+        from sklearn.base import clone
+        from sklearn.preprocessing import normalize
+
+        n_docs = self.matrix.shape[0]
+        frecuencias = np.bincount(self.matrix.indices, minlength=self.matrix.shape[1])
+        terminos = self.vectorizer.get_feature_names_out()
+        conservar = np.flatnonzero(~(np.char.startswith(terminos.astype(str), "#") & (frecuencias > max_df * n_docs)))
+        if len(conservar) == len(terminos):
+            return
+
+        # Vectorizador con el vocabulario podado; el idf de cada término no cambia
+        podado = clone(self.vectorizer).set_params(vocabulary=list(terminos[conservar]))
+        podado.idf_ = self.vectorizer.idf_[conservar]
+        self.vectorizer = podado
+        self.matrix = normalize(self.matrix[:, conservar]).tocsr()
+        logger.info(f"Índice TF-IDF: {len(terminos) - len(conservar)} n-gramas frecuentes descartados")
+
+    @classmethod
+    def desde_partes(cls, vectorizer, matrix, matrix_csc, df_cursos=None) -> "CourseTextIndex":
+        """Índice sobre un vectorizador ya ajustado y sus matrices (p. ej. en memoria compartida), sin reajustar."""
+        indice = cls.__new__(cls)
+        indice.vectorizer = vectorizer
+        indice.matrix = matrix
+        indice.n_docs = matrix.shape[0]
+        indice.df_cursos = df_cursos
+        indice._matrix_csc = matrix_csc
+        indice._analyzer = vectorizer.build_analyzer()
+        indice._vocabulary = vectorizer.vocabulary_
+        indice._idf = vectorizer.idf_
+        return indice
+
+    def transform(self, texto: str):
+        """Vectoriza el texto del usuario con el vocabulario ya ajustado."""
+        return self.vectorizer.transform([texto])
+
+    def _consulta(self, texto: str) -> tuple[np.ndarray, np.ndarray] | None:
+        """Términos del vocabulario presentes en el texto y su peso TF-IDF normalizado (None si no hay)."""
+        conteos = {}
+        for termino in self._analyzer(texto):
+            j = self._vocabulary.get(termino)
+            if j is not None:
+                conteos[j] = conteos.get(j, 0) + 1
+
+        if not conteos:
+            return None
+
+        columnas = np.fromiter(conteos.keys(), dtype=np.int64, count=len(conteos))
+        pesos = np.fromiter(conteos.values(), dtype=np.float64, count=len(conteos)) * self._idf[columnas]
+        pesos /= np.linalg.norm(pesos)
+        return columnas, pesos
+
+    def similitudes(self, texto: str) -> np.ndarray:
+        """
+        Similitud coseno entre el texto y todos los cursos del catálogo.
+        Equivale a cosine_similarity(transform(texto), matrix), pero solo
+        recorre las columnas de los términos presentes en la consulta.
+        """
+        consulta = self._consulta(texto)
+        if consulta is None:
+            return np.zeros(self.n_docs)
+
+        columnas, pesos = consulta
+        return self._matrix_csc[:, columnas] @ pesos
+
+    def candidatos(self, texto: str, k: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Cursos con algún término de la consulta y su similitud coseno, leídos del índice invertido:
+        el costo es proporcional a los postings de esos términos, no al tamaño del catálogo.
+        Con `k`, solo los k de mayor similitud (en orden descendente); sin él, todos, por índice.
+        """
+        consulta = self._consulta(texto)
+        if consulta is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        columnas, pesos = consulta
+        postings = self._matrix_csc[:, columnas]
+        aportes = postings.data * np.repeat(pesos, np.diff(postings.indptr))
+
+        filas, posicion = np.unique(postings.indices, return_inverse=True)
+        scores = np.bincount(posicion, weights=aportes, minlength=len(filas))
+        if k is not None:
+            top = top_k_indices(scores, k)
+            return filas[top], scores[top]
+        return filas.astype(np.int64), scores
+
+    def similitudes_lote(self, textos: list[str]):
+        """
+        Similitudes de varios textos a la vez: un solo producto disperso (m, n).
+        Retorna una matriz CSR con índices ordenados (solo los cursos con términos en común).
+        """
+        sims = (self.vectorizer.transform(textos) @ self._matrix_csc.T).tocsr()
+        sims.sort_indices()
+        return sims
+
+
+# ============================================================
+# ÍNDICE DE EMBEDDINGS — CourseEmbeddingIndex
+# ============================================================
+class CourseEmbeddingIndex:
+    """
+    Embeddings de los cursos preparados una sola vez por carga:
+    - Referencia a la matriz original (para promediar vecinos).
+    - Copia float32 contigua con filas normalizadas o, con `vectores`, los embeddings
+      normalizados cuantizados (ver embeddingQuantizationService) en lugar de esa copia.
+    - Índice vectorial opcional (ver vectorIndexService) para búsquedas aproximadas.
+
+    La similitud coseno contra todo el catálogo queda en un único
+    producto matriz-vector (o un recorrido por bloques de los códigos cuantizados).
+    """
+
+    def __init__(self, X_embeddings: np.ndarray, vectorial=None, vectores=None):
+        self.X_embeddings = X_embeddings
+        self.vectores = vectores
+        self.normalizadas = normalizar_filas(X_embeddings) if vectores is None else None
+        self.n_docs, self.dim = X_embeddings.shape
+        self.vectorial = vectorial
+
+        logger.info(f"Índice de embeddings construido: {self.n_docs} cursos, dimensión {self.dim}")
+
+    @classmethod
+    def desde_normalizadas(cls, X_embeddings: np.ndarray, normalizadas: np.ndarray) -> "CourseEmbeddingIndex":
+        """Índice sobre embeddings ya normalizados (p. ej. mapeados desde disco o en memoria compartida), sin copiarlos."""
+        indice = cls.__new__(cls)
+        indice.X_embeddings = X_embeddings
+        indice.normalizadas = normalizadas
+        indice.n_docs, indice.dim = normalizadas.shape
+        indice.vectorial = None
+        indice.vectores = None
+        return indice
+
+    @property
+    def cuantizacion(self) -> str:
+        return self.vectores.nombre if self.vectores is not None else "float32"
+
+    def normalizadas_exactas(self) -> np.ndarray:
+        """Embeddings normalizados en float32; con cuantización se calculan de nuevo (copia temporal)."""
+        return self.normalizadas if self.normalizadas is not None else normalizar_filas(self.X_embeddings)
+
+    @staticmethod
+    def unitario(q_vec: np.ndarray) -> np.ndarray:
+        """Vector de consulta float32 con norma 1 (o nulo si no tiene dirección)."""
+        q_vec = np.asarray(q_vec, dtype=np.float32).ravel()
+        norma = np.linalg.norm(q_vec)
+        return q_vec / norma if norma > 0 else q_vec
+
+    def similitudes(self, q_vec: np.ndarray, indices: np.ndarray | None = None) -> np.ndarray:
+        """Similitud coseno entre el vector de consulta y todos los cursos (o solo `indices`)."""
+        return self.puntuar(self.unitario(q_vec), indices)
+
+    def puntuar(self, q_unit: np.ndarray, indices: np.ndarray | None = None) -> np.ndarray:
+        """Como `similitudes`, con el vector ya unitario; aproximada si los embeddings están cuantizados."""
+        if self.vectores is not None:
+            return self.vectores.similitudes(q_unit, indices)
+        if indices is None:
+            return self.normalizadas @ q_unit
+        return self.normalizadas[indices] @ q_unit
+
+    def exactas(self, q_unit: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        """Similitud coseno exacta de `indices`, leyendo solo esas filas de los embeddings originales."""
+        return normalizar_filas(np.asarray(self.X_embeddings[indices])) @ q_unit
+
+
+# ============================================================
+# ÍNDICE DE METADATOS — CourseFilterIndex
+# ============================================================
+class CourseFilterIndex:
+    """
+    Índice categórico de MODALIDAD y TIPO_OFERTA construido al cargar el catálogo:
+    - Cada columna se codifica como un arreglo de enteros (un código por categoría).
+    - Un filtro se resuelve sobre las pocas categorías distintas y luego se
+      proyecta a las filas con una indexación vectorizada, sin recorrer strings.
+    - Las filas que cumplen cada filtro se memorizan, así que repetir un filtro es O(1).
+    - `nombres` codifica NOMBRE_OFERTA para quitar recomendaciones repetidas sin comparar strings.
+    Sobre un CourseCatalog reutiliza sus códigos y su clave de nombres, ya compilados.
+    """
+
+    columnas = ("MODALIDAD", "TIPO_OFERTA")
+
+    def __init__(self, df_cursos):
+        self.df_cursos = df_cursos
+        self.n_docs = len(df_cursos)
+        self._filas_cache = {}
+        if isinstance(df_cursos, CourseCatalog):
+            self.codigos = {c: df_cursos.codigos[c] for c in self.columnas}
+            self.categorias = {c: df_cursos.categorias[c] for c in self.columnas}
+            self.nombres = df_cursos.claves
+            return
+
+        self.codigos = {}
+        self.categorias = {}
+        for columna in self.columnas:
+            codigos, categorias = pd.factorize(df_cursos[columna], use_na_sentinel=True)
+            self.codigos[columna] = codigos
+            self.categorias[columna] = categorias.astype(str)
+        self.nombres, _ = pd.factorize(df_cursos['NOMBRE_OFERTA'])
+
+    @classmethod
+    def desde_codigos(cls, codigos: dict, categorias: dict, nombres: np.ndarray) -> "CourseFilterIndex":
+        """Índice sobre códigos ya calculados (p. ej. en memoria compartida), sin el DataFrame."""
+        indice = cls.__new__(cls)
+        indice.df_cursos = None
+        indice.n_docs = len(nombres)
+        indice.codigos = codigos
+        indice.categorias = categorias
+        indice.nombres = nombres
+        indice._filas_cache = {}
+        return indice
+
+    @staticmethod
+    def _coincide(valor: list[str], categoria: list[str]) -> bool:
+        """Cada palabra del valor es el comienzo de alguna palabra de la categoría."""
+        return bool(valor) and all(any(t.startswith(v) for t in categoria) for v in valor)
+
+    def _mascara(self, columna: str, valor: str) -> np.ndarray:
+        """
+        Filas cuya columna contiene las palabras de `valor` (sin distinguir mayúsculas ni tildes;
+        los nulos no coinciden). "Corto" selecciona "Curso corto" y "Cursos Cortos", "Programa"
+        selecciona "Programa de formación", pero "Virtual" no selecciona "Semivirtual".
+        Se evalúa una vez por categoría distinta, no por fila.
+        """
+        buscado = re.findall(r"\w+", plegar_acentos(valor))
+        coincide = np.array([self._coincide(buscado, re.findall(r"\w+", plegar_acentos(c)))
+                             for c in self.categorias[columna]] + [False])
+        # El código -1 (nulo) indexa la posición extra en False
+        return coincide[self.codigos[columna]]
+
+    def filas(self, modalidad: str | None = None, duracion: str | None = None) -> np.ndarray | None:
+        """
+        Índices (ordenados) de los cursos que cumplen el filtro.
+        Retorna None cuando no se pide ningún filtro.
+        """
+        if modalidad is None and duracion is None:
+            return None
+
+        clave = (modalidad, duracion)
+        filas = self._filas_cache.get(clave)
+        if filas is None:
+            mascara = np.ones(self.n_docs, dtype=bool)
+            if modalidad is not None:
+                mascara &= self._mascara("MODALIDAD", modalidad)
+            if duracion is not None:
+                mascara &= self._mascara("TIPO_OFERTA", duracion)
+            filas = np.flatnonzero(mascara)
+            if len(self._filas_cache) >= 64:
+                self._filas_cache.clear()
+            self._filas_cache[clave] = filas
+        return filas
+
+
+# ============================================================
+# VECINOS PRECALCULADOS — CourseNeighbors
+# ============================================================
+class CourseNeighbors:
+    """
+    Formato compacto de la matriz de similitud: los k cursos más similares de cada curso.
+    - indices: (n, k) int32, vecinos de cada fila ordenados de mayor a menor similitud.
+    - scores:  (n, k) float32, similitud correspondiente.
+
+    Ocupa O(n·k) en lugar de O(n²) y la consulta "cursos similares a i" es O(k).
+    """
+
+    def __init__(self, indices: np.ndarray, scores: np.ndarray):
+        if indices.shape != scores.shape or indices.ndim != 2:
+            raise ValueError(f"indices {indices.shape} y scores {scores.shape} deben ser (n, k)")
+        self.indices = np.ascontiguousarray(indices, dtype=np.int32)
+        self.scores = np.ascontiguousarray(scores, dtype=np.float32)
+        self.n_docs, self.k = self.indices.shape
+
+    @classmethod
+    def desde_densa(cls, matriz: np.ndarray, k: int, bloque: int = 1024):
+        """
+        Convierte una matriz densa n×n en vecinos top-k (sin el propio curso), por bloques de filas.
+        Mismo orden que un argsort estable de cada fila: en los empates va primero el menor índice.
+        """
+        n = matriz.shape[0]
+        k = min(k, n - 1)
+        indices = np.empty((n, k), dtype=np.int32)
+        scores = np.empty((n, k), dtype=np.float32)
+
+        for inicio in range(0, n, bloque):
+            filas = np.array(matriz[inicio:inicio + bloque], dtype=np.float32)
+            locales = np.arange(filas.shape[0])
+            filas[locales, inicio + locales] = -np.inf
+
+            if k > 0:
+                # Todo lo que alcanza el k-ésimo valor; si el empate en ese valor deja más de k,
+                # se descartan los empatados de mayor índice
+                kesimo = -np.partition(-filas, k - 1, axis=1)[:, k - 1:k]
+                mascara = filas >= kesimo
+                sobran = mascara.sum(axis=1) - k
+                for fila in np.flatnonzero(sobran):
+                    empatados = np.flatnonzero(filas[fila] == kesimo[fila])
+                    mascara[fila, empatados[len(empatados) - sobran[fila]:]] = False
+                top = np.nonzero(mascara)[1].reshape(len(filas), k)
+            else:
+                top = np.empty((len(filas), 0), dtype=np.intp)
+            top_scores = np.take_along_axis(filas, top, axis=1)
+            orden = np.argsort(-top_scores, axis=1, kind="stable")
+
+            indices[inicio:inicio + bloque] = np.take_along_axis(top, orden, axis=1)
+            scores[inicio:inicio + bloque] = np.take_along_axis(top_scores, orden, axis=1)
+
+        logger.info(f"Matriz de similitud {matriz.shape} convertida a top-{k} vecinos")
+        return cls(indices, scores)
+
+    def vecinos(self, i: int, k: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """(índices, similitudes) de los cursos más parecidos al curso i."""
+        k = self.k if k is None else min(k, self.k)
+        return self.indices[i, :k], self.scores[i, :k]
+
+    def guardar(self, path):
+        buffer = io.BytesIO()
+        np.savez(buffer, indices=self.indices, scores=self.scores)
+        escribir_atomico(path, buffer.getvalue())
+        logger.info(f"Vecinos top-{self.k} guardados en {path}")
+
+    @classmethod
+    def cargar(cls, path):
+        with np.load(path) as data:
+            return cls(data["indices"], data["scores"])
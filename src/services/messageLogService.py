@@ -0,0 +1,216 @@
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import bindparam, insert, select
+from src.core.config import WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_FLUSH_MS, WRITE_BEHIND_MAX_QUEUE
+from src.core.database import SessionLocal
+from src.models.conversationModel import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+
+class MessageLog:
+    """
+    Registro diferido (write-behind) de mensajes del chat.
+    - `encolar()` deja los mensajes de un turno en una cola en memoria y retorna de inmediato.
+    - Un hilo de fondo los guarda por lotes: cada `batch_size` mensajes o cada `flush_ms`,
+      con un único commit por lote (inserción masiva + actualización de end_time).
+    - Mientras no se guardan, `pendientes()` los expone para que el historial de una
+      conversación incluya sus propios mensajes.
+    - `detener()` vacía la cola antes de terminar.
+    """
+
+    def __init__(self, session_factory=SessionLocal, batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+                 flush_ms: int = WRITE_BEHIND_FLUSH_MS, max_queue: int = WRITE_BEHIND_MAX_QUEUE,
+                 max_intentos: int = 3):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_ms = flush_ms
+        self.max_intentos = max_intentos
+
+        self._cola = queue.Queue(maxsize=max_queue)
+        self._pendientes = {}  # id_conversation -> [mensaje, ...]
+        self._lock = threading.Lock()
+        self._hilo = None
+        self._metricas = {"mensajes_encolados": 0, "mensajes_guardados": 0, "lotes": 0, "errores": 0, "descartados": 0}
+
+    # ------------------------------------------------------------
+    # Productores (ruta de la petición)
+    # ------------------------------------------------------------
+    def encolar(self, id_conversation: int, mensajes: list[tuple[str, str]]):
+        """Encola los mensajes de un turno. Si la cola está llena espera (contrapresión)."""
+        self._asegurar_hilo()
+        filas = [
+            {"id_conversation": id_conversation, "sender": sender, "content": content, "created_at": datetime.utcnow()}
+            for sender, content in mensajes
+        ]
+        end_time = filas[-1]["created_at"] if any(sender == "user" for sender, _ in mensajes) else None
+
+        with self._lock:
+            self._pendientes.setdefault(id_conversation, []).extend(filas)
+            self._metricas["mensajes_encolados"] += len(filas)
+        self._cola.put((id_conversation, filas, end_time))
+
+    def pendientes(self, id_conversation: int) -> list[dict]:
+        """Mensajes de la conversación aún no guardados (copia)."""
+        with self._lock:
+            return list(self._pendientes.get(id_conversation, []))
+
+    @staticmethod
+    def combinar(guardados: list[dict], pendientes: list[dict]) -> list[dict]:
+        """
+        Une el historial leído de la base con los pendientes tomados ANTES de leerla.
+        Un mensaje que se guardó entre ambas lecturas aparece en las dos y se descarta
+        del lado de los pendientes (misma fecha, remitente y contenido).
+        """
+        vistos = {(m["sender"], m["content"], m["created_at"]) for m in guardados}
+        extra = [m for m in pendientes if (m["sender"], m["content"], m["created_at"]) not in vistos]
+        if not extra:
+            return guardados
+        return sorted(guardados + extra, key=lambda m: m["created_at"])
+
+    # ------------------------------------------------------------
+    # Escritor de fondo
+    # ------------------------------------------------------------
+    def _asegurar_hilo(self):
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._ejecutar, name="message-log-writer", daemon=True)
+                self._hilo.start()
+
+    def _ejecutar(self):
+        detener = False
+        while not detener:
+            try:
+                item = self._cola.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            lote, n_mensajes = [], 0
+            limite = time.monotonic() + self.flush_ms / 1000
+            while True:
+                if item is None:
+                    detener = True
+                else:
+                    lote.append(item)
+                    n_mensajes += len(item[1])
+
+                if detener or n_mensajes >= self.batch_size:
+                    break
+                try:
+                    item = self._cola.get(timeout=max(0.0, limite - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            if lote:
+                self._guardar_lote(lote)
+
+    def _guardar_lote(self, lote: list[tuple]):
+        """Guarda un lote completo con un único commit; reintenta ante errores transitorios."""
+        mensajes = [fila for _, filas, _ in lote for fila in filas]
+        end_times = {}
+        for id_conversation, _, end_time in lote:
+            end_times.setdefault(id_conversation, None)
+            if end_time is not None:
+                end_times[id_conversation] = max(end_time, end_times[id_conversation] or end_time)
+
+        guardado = False
+        for intento in range(1, self.max_intentos + 1):
+            try:
+                with self.session_factory() as db:
+                    existentes = set(db.scalars(
+                        select(Conversation.id_conversation).where(Conversation.id_conversation.in_(end_times))
+                    ))
+                    faltantes = [i for i in end_times if i not in existentes]
+                    if faltantes:
+                        db.execute(insert(Conversation), [
+                            {"id_conversation": i, "start_time": datetime.utcnow(), "end_time": end_times[i]}
+                            for i in faltantes
+                        ])
+                        logger.warning(f"Conversaciones {faltantes} no existían, creadas nuevamente.")
+
+                    actualizar = [{"_id": i, "_end": t} for i, t in end_times.items() if t is not None and i in existentes]
+                    if actualizar:
+                        tabla = Conversation.__table__
+                        db.execute(
+                            tabla.update()
+                            .where(tabla.c.id_conversation == bindparam("_id"))
+                            .values(end_time=bindparam("_end")),
+                            actualizar
+                        )
+
+                    db.execute(insert(Message), mensajes)
+                    db.commit()
+                guardado = True
+                break
+            except Exception as e:
+                with self._lock:
+                    self._metricas["errores"] += 1
+                    if intento == self.max_intentos:
+                        self._metricas["descartados"] += len(mensajes)
+                logger.error(f"--- Error guardando lote de {len(mensajes)} mensajes (intento {intento}): {e}")
+                if intento == self.max_intentos:
+                    break
+                time.sleep(0.1 * intento)
+
+        # Ya están en la base (o descartados): dejan de ser pendientes. Cada lista se
+        # reconstruye una vez (no un remove por fila, cuadrático en conversaciones largas)
+        procesadas = {id(fila) for fila in mensajes}
+        with self._lock:
+            for id_conversation in end_times:
+                restantes = [f for f in self._pendientes.get(id_conversation, []) if id(f) not in procesadas]
+                if restantes:
+                    self._pendientes[id_conversation] = restantes
+                else:
+                    self._pendientes.pop(id_conversation, None)
+            if guardado:
+                self._metricas["mensajes_guardados"] += len(mensajes)
+                self._metricas["lotes"] += 1
+
+    # ------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------
+    def vaciar(self, timeout: float | None = None):
+        """Espera a que todo lo encolado hasta ahora esté guardado."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not self._pendientes:
+                    return True
+            if limite is not None and time.monotonic() > limite:
+                return False
+            time.sleep(self.flush_ms / 4000)
+
+    def detener(self, timeout: float = 30):
+        """
+        Vacía la cola y termina el hilo escritor (apagado ordenado). Espera a lo sumo
+        `timeout` segundos, también si la cola está llena y el escritor no avanza.
+        """
+        if self._hilo is None or not self._hilo.is_alive():
+            return
+        limite = time.monotonic() + timeout
+        try:
+            self._cola.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning(f"Registro de mensajes: la cola sigue llena tras {timeout} s, no se espera al escritor.")
+            return
+        self._hilo.join(max(0.0, limite - time.monotonic()))
+        logger.info(f"Registro de mensajes detenido: {self.estado()}")
+
+    def estado(self) -> dict:
+        with self._lock:
+            return {
+                **self._metricas,
+                "mensajes_pendientes": sum(len(v) for v in self._pendientes.values()),
+                "activo": self._hilo is not None and self._hilo.is_alive(),
+            }
+
+
+# ============================================================
+# SINGLETON INSTANCE
+message_log = MessageLog()
+# ============================================================
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# AGRUPADOR DE PETICIONES — MicroBatcher
+# ============================================================
+class MicroBatcher:
+    """
+    Agrupa peticiones concurrentes en lotes para una función vectorizada:
+    - Un hilo recolector toma la primera petición y espera a lo sumo `max_espera_ms`
+      (o hasta juntar `max_lote`) antes de despachar el lote.
+    - `funcion(items)` recibe la lista del lote y retorna un resultado por item, en orden.
+    - Con `executor` el lote se ejecuta en ese pool (el recolector sigue juntando el
+      siguiente); sin él, en el propio hilo recolector.
+    Cada llamador recibe su resultado (o la excepción del lote) a través de un Future.
+    `estadisticas()` reporta lotes, tamaño medio y percentiles de espera en cola y de
+    ejecución sobre las últimas `muestras` peticiones / lotes.
+    """
+
+    def __init__(self, funcion, max_lote: int = 32, max_espera_ms: float = 2.0,
+                 executor: Executor | None = None, nombre: str = "micro-batch", muestras: int = 2048):
+        self.funcion = funcion
+        self.max_lote = max(1, max_lote)
+        self.max_espera_s = max_espera_ms / 1000
+        self.executor = executor
+        self.nombre = nombre
+        self._cola = queue.SimpleQueue()
+        self._hilo = None
+        self._lock = threading.Lock()
+        self._detenido = False
+        self._metricas = {"peticiones": 0, "lotes": 0, "errores": 0, "lote_max": 0}
+        self._esperas_ms = deque(maxlen=muestras)
+        self._ejecuciones_ms = deque(maxlen=muestras)
+        self._tamaños = deque(maxlen=muestras)
+
+    def _asegurar_hilo(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            with self._lock:
+                if self._hilo is None or not self._hilo.is_alive():
+                    self._hilo = threading.Thread(target=self._ejecutar, name=self.nombre, daemon=True)
+                    self._hilo.start()
+
+    def enviar(self, item) -> Future:
+        """Encola un item y retorna el Future con su resultado."""
+        if self._detenido:
+            raise RuntimeError(f"{self.nombre} detenido")
+        futuro = Future()
+        self._cola.put((item, futuro, time.monotonic()))
+        self._asegurar_hilo()
+        return futuro
+
+    def ejecutar(self, item):
+        """Resultado de un item (bloquea hasta que su lote termine)."""
+        return self.enviar(item).result()
+
+    async def ejecutar_async(self, item):
+        """Resultado de un item sin bloquear el event loop."""
+        return await asyncio.wrap_future(self.enviar(item))
+
+    def _recolectar(self) -> list:
+        """Primera petición (bloqueante) más las que lleguen dentro de la ventana."""
+        lote = [self._cola.get()]
+        limite = time.monotonic() + self.max_espera_s
+        while len(lote) < self.max_lote:
+            restante = limite - time.monotonic()
+            try:
+                lote.append(self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait())
+            except queue.Empty:
+                break
+        return [p for p in lote if p is not None]
+
+    def _procesar(self, lote: list):
+        inicio = time.monotonic()
+        pendientes = [(item, futuro) for item, futuro, _ in lote if futuro.set_running_or_notify_cancel()]
+        if not pendientes:
+            return
+        try:
+            resultados = self.funcion([item for item, _ in pendientes])
+        except BaseException as e:
+            self._registrar(lote, inicio, error=True)
+            for _, futuro in pendientes:
+                futuro.set_exception(e)
+            return
+        self._registrar(lote, inicio)
+        for (_, futuro), resultado in zip(pendientes, resultados):
+            futuro.set_result(resultado)
+
+    def _registrar(self, lote: list, inicio: float, error: bool = False):
+        fin = time.monotonic()
+        with self._lock:
+            self._metricas["peticiones"] += len(lote)
+            self._metricas["lotes"] += 1
+            self._metricas["errores"] += int(error)
+            self._metricas["lote_max"] = max(self._metricas["lote_max"], len(lote))
+            self._tamaños.append(len(lote))
+            self._ejecuciones_ms.append((fin - inicio) * 1000)
+            self._esperas_ms.extend((inicio - encolado) * 1000 for _, _, encolado in lote)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            esperas, ejecuciones, tamaños = list(self._esperas_ms), list(self._ejecuciones_ms), list(self._tamaños)
+            metricas = dict(self._metricas)
+
+        def percentil(valores, p):
+            return float(np.percentile(valores, p)) if valores else None
+
+        return {
+            **metricas,
+            "lote_medio": float(np.mean(tamaños)) if tamaños else None,
+            "espera_ms_p50": percentil(esperas, 50),
+            "espera_ms_p99": percentil(esperas, 99),
+            "ejecucion_ms_p50": percentil(ejecuciones, 50),
+            "ejecucion_ms_p99": percentil(ejecuciones, 99),
+            "pendientes": self._cola.qsize(),
+            "max_lote": self.max_lote,
+            "max_espera_ms": self.max_espera_s * 1000,
+        }
+
+    def _ejecutar(self):
+        while not self._detenido:
+            lote = self._recolectar()
+            if not lote:
+                continue
+            if self.executor is not None:
+                self.executor.submit(self._procesar, lote)
+            else:
+                self._procesar(lote)
+
+    def detener(self):
+        """Deja de aceptar peticiones; las ya encoladas se atienden antes de salir."""
+        self._detenido = True
+        self._cola.put(None)
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+        while True:
+            try:
+                pendiente = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if pendiente is not None:
+                self._procesar([pendiente])
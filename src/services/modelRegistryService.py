@@ -0,0 +1,169 @@
+import hashlib
+import json
+import logging
+import os
+import stat
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
+from src.core.config import VALID_MODEL_TYPES
+
+logger = logging.getLogger(__name__)
+
+# umask del proceso (os.umask solo se puede leer cambiándolo: una vez, al importar)
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+# ============================================================
+# ESCRITURA ATÓMICA
+# ============================================================
+class EscrituraAtomica:
+    """
+    Escribe un archivo por partes en un temporal del mismo directorio, calculando
+    su sha256 sobre la marcha. `terminar()` lo cierra para poder leerlo (y validarlo)
+    antes de publicarlo; `confirmar()` lo sincroniza a disco y lo renombra sobre el
+    destino; `descartar()` (o salir del `with` sin confirmar) lo elimina.
+    Quien lea el destino ve el archivo anterior o el nuevo completo, nunca uno a
+    medio escribir (y los mmap del anterior siguen siendo válidos).
+    El archivo publicado conserva los permisos del destino anterior o, si no existía,
+    los de un archivo nuevo (0o666 menos la umask), no los 0600 de mkstemp.
+    """
+
+    def __init__(self, dest: Path):
+        self.dest = Path(dest)
+        self.dest.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.dest.parent, prefix=f".{self.dest.name}.", suffix=".tmp")
+        self.tmp = Path(tmp)
+        self._file = os.fdopen(fd, "wb")
+        try:
+            modo = stat.S_IMODE(self.dest.stat().st_mode)
+        except FileNotFoundError:
+            modo = 0o666 & ~_UMASK
+        if hasattr(os, "fchmod"):
+            os.fchmod(fd, modo)
+        else:
+            os.chmod(self.tmp, modo)
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def escribir(self, chunk: bytes):
+        self._file.write(chunk)
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+    def write(self, chunk: bytes):
+        """Interfaz de archivo (p. ej. para `np.save`)."""
+        self.escribir(chunk)
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    def terminar(self):
+        """Vuelca el temporal a disco y lo cierra: `self.tmp` queda completo para leerlo."""
+        if not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def confirmar(self) -> tuple[str, int]:
+        """Publica el archivo en su destino. Retorna (sha256, tamaño en bytes)."""
+        self.terminar()
+        os.replace(self.tmp, self.dest)
+        return self.sha256, self.size
+
+    def descartar(self):
+        self._file.close()
+        self.tmp.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.tmp.exists():
+            self.descartar()
+        return False
+
+
+def escribir_atomico(dest: Path, contenido: bytes) -> tuple[str, int]:
+    """Escribe `contenido` completo en `dest` de forma atómica. Retorna (sha256, tamaño)."""
+    with EscrituraAtomica(dest) as escritura:
+        escritura.escribir(contenido)
+        return escritura.confirmar()
+
+
+# ============================================================
+# SNAPSHOT INMUTABLE — ModelSnapshot
+# ============================================================
+class ModelSnapshot:
+    """
+    Conjunto completo y consistente de artefactos cargados con sus índices derivados.
+    Nunca se modifica: una recarga construye un snapshot nuevo y lo publica con una
+    sola asignación, así las peticiones en curso terminan con el que ya tenían.
+    """
+
+    def __init__(self, version: int = 0, models: dict | None = None, indexes: dict | None = None,
+                 checksums: dict | None = None):
+        self.version = version
+        self.models = MappingProxyType({tipo: None for tipo in VALID_MODEL_TYPES} | (models or {}))
+        self.indexes = MappingProxyType({"tfidf": None, "embeddings": None, "filtros": None} | (indexes or {}))
+        self.checksums = MappingProxyType(dict(checksums or {}))
+        self.created_at = datetime.utcnow()
+
+    def derivar(self, models: dict, indexes: dict, checksums: dict) -> "ModelSnapshot":
+        """Nuevo snapshot con los artefactos/índices indicados reemplazados y el resto compartido."""
+        return ModelSnapshot(
+            version=self.version + 1,
+            models={**self.models, **models},
+            indexes={**self.indexes, **indexes},
+            checksums={**self.checksums, **checksums},
+        )
+
+    def describir(self) -> dict:
+        return {
+            "version": self.version,
+            "created_at": self.created_at.isoformat(),
+            "checksums": dict(self.checksums),
+        }
+
+
+# ============================================================
+# REGISTRO VERSIONADO — ModelRegistry
+# ============================================================
+class ModelRegistry:
+    """
+    Manifiesto de los artefactos subidos (files/manifest.json):
+    por tipo guarda versión, sha256, tamaño y fecha de la última subida.
+    """
+
+    def __init__(self, manifest_path: Path):
+        self.manifest_path = Path(manifest_path)
+        self._lock = threading.Lock()
+
+    def manifest(self) -> dict:
+        try:
+            return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def info(self, tipo: str) -> dict | None:
+        return self.manifest().get(tipo)
+
+    def registrar(self, tipo: str, path: Path, sha256: str, size: int) -> int:
+        """Registra una nueva versión del artefacto y retorna su número."""
+        with self._lock:
+            manifest = self.manifest()
+            version = manifest.get(tipo, {}).get("version", 0) + 1
+            manifest[tipo] = {
+                "version": version,
+                "path": str(path),
+                "sha256": sha256,
+                "size": size,
+                "uploaded_at": datetime.utcnow().isoformat(),
+            }
+            escribir_atomico(self.manifest_path, json.dumps(manifest, indent=2).encode("utf-8"))
+        logger.info(f"Artefacto '{tipo}' registrado: versión {version}, sha256={sha256[:12]}")
+        return version
@@ -1,15 +1,28 @@
+import csv
+import io
 import logging
-from turtle import pd
+import mmap
+import threading
+import time
+from typing import BinaryIO
 from src.core.logger import logger
 from src.core.config import AUTOENCODER_DIR, EMBEDDINGS_DIR, MATRIZ_DIR, CURSOS_DIR, CURSOS_INFO_DIR
 import numpy as np
 from fastapi import HTTPException, UploadFile
 from pathlib import Path
-from src.core.config import VALID_MODEL_TYPES
-import tensorflow as tf
-from keras.models import load_model
+from src.core.config import VALID_MODEL_TYPES, VECTOR_INDEX_BACKEND, VECTOR_INDEX_DIR, VECTOR_INDEX_NPROBE, MODEL_LOAD_MMAP
+from src.core.config import MATRIZ_TOPK_DIR, MATRIZ_TOPK_K, LAZY_MODEL_TYPES, REQUIRED_MODEL_TYPES, MANIFEST_DIR
+from src.core.config import UPLOAD_CHUNK_SIZE, CURSOS_INFO_COLUMNS, CURSOS_CATALOG_DIR, EMBEDDINGS_NORM_DIR
+from src.core.config import EMBEDDING_QUANTIZATION, EMBEDDING_PQ_DIR, EMBEDDING_PQ_SUBVECTORS, EMBEDDING_RERANK
+from fastapi.concurrency import run_in_threadpool
 import pandas as pd
 from fastapi.responses import FileResponse
+from src.services.catalogStoreService import CourseCatalog
+from src.services.indexService import CourseTextIndex, CourseEmbeddingIndex, CourseFilterIndex, CourseNeighbors
+from src.services.indexService import normalizar_filas
+from src.services.vectorIndexService import FlatIndex, construir_indice, evaluar_recall
+from src.services.embeddingQuantizationService import EMBEDDING_QUANTIZERS, Float32Vectors, cuantizar, evaluar_cuantizacion
+from src.services.modelRegistryService import ModelRegistry, ModelSnapshot, EscrituraAtomica
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -24,6 +37,9 @@ class ModelService:
     - Guarda archivos enviados desde el frontend.
     - Carga archivos existentes a memoria.
     - Valida tipo y estructura.
+
+    Los artefactos cargados y sus índices viven en un ModelSnapshot inmutable:
+    cada carga construye uno nuevo y lo publica con una sola asignación.
     """
 
     _path_map = {
@@ -34,104 +50,611 @@ class ModelService:
         "cursos_info": CURSOS_INFO_DIR,
     }
 
-    _models_cache = {tipo: None for tipo in VALID_MODEL_TYPES}
+    # Snapshot vigente (artefactos + índices derivados) y registro de versiones subidas
+    _snapshot = ModelSnapshot()
+    _registry = ModelRegistry(MANIFEST_DIR)
+    _publish_lock = threading.Lock()
+
+    # Estado de carga por artefacto: pendiente | cargando | cargado | diferido | error
+    _load_state = {tipo: "pendiente" for tipo in VALID_MODEL_TYPES}
+    _load_errors = {}
+    _load_lock = threading.Lock()
+
+    # Dimensiones esperadas de cada artefacto .npy
+    _npy_ndim = {"embeddings": 2, "matriz": 2, "cursos": 2}
+
+    @classmethod
+    def snapshot(cls) -> ModelSnapshot:
+        """Snapshot vigente. Quien lo toma al inicio de una petición lo usa hasta el final."""
+        return cls._snapshot
 
     # --------------------------------------------------------
     # MÉTODO 1: Guardar archivo subido
     # --------------------------------------------------------
     @classmethod
     async def handle_upload(cls, file: UploadFile, tipo: str):
-        """Guarda archivo subido desde el frontend según su tipo."""
+        """
+        Guarda archivo subido desde el frontend según su tipo.
+        El archivo se recibe por partes de UPLOAD_CHUNK_SIZE y se escribe fuera del
+        event loop en un temporal (con sha256 incremental). La cabecera se valida con
+        el primer bloque y el archivo solo reemplaza al vigente si resulta válido.
+        """
         if tipo not in VALID_MODEL_TYPES:
             raise HTTPException(status_code=400, detail=f"Tipo no válido: {tipo}")
 
         dest = cls._path_map[tipo]
-        Path(dest).parent.mkdir(parents=True, exist_ok=True)
 
         try:
-            with open(dest, "wb") as f:
-                f.write(await file.read())
+            primer_bloque = await file.read(UPLOAD_CHUNK_SIZE)
+
+            # La matriz puede llegar ya compacta (.npz con indices/scores)
+            if tipo == "matriz" and primer_bloque[:2] == b"PK":
+                dest = MATRIZ_TOPK_DIR
+
+            tamaño_esperado = cls._validar_inicio(tipo, dest, primer_bloque)
+
+            escritura = await run_in_threadpool(EscrituraAtomica, Path(dest))
+            try:
+                bloque = primer_bloque
+                while bloque:
+                    await run_in_threadpool(escritura.escribir, bloque)
+                    bloque = await file.read(UPLOAD_CHUNK_SIZE)
+
+                await run_in_threadpool(escritura.terminar)
+
+                if tamaño_esperado is not None and escritura.size != tamaño_esperado:
+                    raise HTTPException(
+                        status_code=422,
+                        detail=f"Archivo '{tipo}' incompleto: {escritura.size} bytes, se esperaban {tamaño_esperado}."
+                    )
+                if dest == MATRIZ_TOPK_DIR:
+                    await run_in_threadpool(cls._validar_vecinos, escritura.tmp)
+
+                # Una matriz densa se convierte a top-k vecinos, los embeddings se normalizan y el CSV
+                # del catálogo se compila desde el temporal: si no se pueden construir, el archivo
+                # vigente no se toca
+                derivado, derivado_dest = None, None
+                if tipo == "embeddings":
+                    derivado = await run_in_threadpool(cls._normalizar_embeddings, escritura.tmp)
+                    derivado_dest = EMBEDDINGS_NORM_DIR
+                if tipo == "matriz" and dest != MATRIZ_TOPK_DIR:
+                    derivado = await run_in_threadpool(cls._convertir_vecinos, escritura.tmp)
+                    derivado_dest = MATRIZ_TOPK_DIR
+                if tipo == "cursos_info":
+                    derivado = await run_in_threadpool(cls._compilar_catalogo, escritura.tmp)
+                    derivado_dest = CURSOS_CATALOG_DIR
+
+                # Temporal + fsync + rename: nunca se carga un archivo a medio escribir
+                sha256, size = await run_in_threadpool(escritura.confirmar)
+            except BaseException:
+                await run_in_threadpool(escritura.descartar)
+                raise
+
+            # El derivado se guarda después del original, así queda al día (mtime) respecto de él
+            if derivado is not None:
+                await run_in_threadpool(cls._guardar_derivado, derivado, derivado_dest)
+            version = cls._registry.registrar(tipo, dest, sha256, size)
 
-            logger.info(f"✅ Archivo '{tipo}' guardado correctamente en {dest}")
-            return {"message": f"Archivo '{tipo}' cargado correctamente.", "path": str(dest)}
+            logger.info(f"✅ Archivo '{tipo}' guardado correctamente en {dest} ({size} bytes)")
+            return {
+                "message": f"Archivo '{tipo}' cargado correctamente.",
+                "path": str(dest),
+                "version": version,
+                "sha256": sha256,
+            }
 
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Error guardando archivo {tipo}: {e}", exc_info=True)
             raise HTTPException(status_code=500, detail=str(e))
 
+    # --------------------------------------------------------
+    # Validación de artefactos
+    # --------------------------------------------------------
+    @staticmethod
+    def _leer_cabecera_npy(f: BinaryIO) -> tuple[tuple, np.dtype, int]:
+        """Lee forma, dtype y tamaño de cabecera de un .npy sin cargar los datos."""
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        if fortran_order:
+            raise ValueError("el arreglo está en orden Fortran; se espera orden C")
+        return shape, dtype, f.tell()
+
+    @classmethod
+    def _validar_npy(cls, tipo: str, shape: tuple, dtype: np.dtype):
+        """Comprueba dtype numérico, número de dimensiones y (para la matriz) que sea cuadrada."""
+        if dtype.kind not in "fiu":
+            raise ValueError(f"dtype no numérico: {dtype}")
+        if len(shape) != cls._npy_ndim[tipo]:
+            raise ValueError(f"se esperaban {cls._npy_ndim[tipo]} dimensiones y el archivo tiene forma {shape}")
+        if tipo == "matriz" and shape[0] != shape[1]:
+            raise ValueError(f"la matriz de similitud debe ser cuadrada, forma {shape}")
+
+    @classmethod
+    def _validar_inicio(cls, tipo: str, dest: Path, primer_bloque: bytes) -> int | None:
+        """
+        Valida un archivo subido a partir de su primer bloque.
+        Retorna el tamaño total esperado cuando la cabecera lo determina (.npy).
+        """
+        try:
+            if not primer_bloque:
+                raise ValueError("archivo vacío")
+
+            if tipo in cls._npy_ndim and dest != MATRIZ_TOPK_DIR:
+                shape, dtype, offset = cls._leer_cabecera_npy(io.BytesIO(primer_bloque))
+                cls._validar_npy(tipo, shape, dtype)
+                return offset + int(np.prod(shape)) * dtype.itemsize
+
+            if tipo == "cursos_info":
+                encabezado = primer_bloque.split(b"\n", 1)[0].decode("utf-8-sig").strip()
+                columnas = next(csv.reader([encabezado]))
+                faltantes = [c for c in CURSOS_INFO_COLUMNS if c not in columnas]
+                if faltantes:
+                    raise ValueError(f"faltan columnas {faltantes}")
+                return None
+
+            # Modelo Keras (.keras) y matriz compacta (.npz) son archivos zip
+            if primer_bloque[:2] != b"PK":
+                raise ValueError("se esperaba un archivo zip (.keras / .npz)")
+            return None
+
+        except (ValueError, UnicodeDecodeError, SyntaxError) as e:
+            raise HTTPException(status_code=422, detail=f"Archivo '{tipo}' inválido: {e}")
+
+    @staticmethod
+    def _validar_vecinos(path: Path):
+        """La matriz compacta debe traer arreglos `indices` y `scores` de forma (n, k)."""
+        try:
+            CourseNeighbors.cargar(path)
+        except (KeyError, ValueError, OSError) as e:
+            raise HTTPException(status_code=422, detail=f"Archivo 'matriz' compacto inválido: {e}")
+
+    @classmethod
+    def _cargar_npy(cls, tipo: str, path: Path) -> np.ndarray:
+        """
+        Valida la cabecera del .npy y lo carga.
+        Con MODEL_LOAD_MMAP el arreglo se mapea en solo lectura: los workers del
+        mismo host comparten la caché de páginas del sistema en lugar de copiarlo.
+        """
+        try:
+            with open(path, "rb") as f:
+                shape, dtype, _ = cls._leer_cabecera_npy(f)
+            cls._validar_npy(tipo, shape, dtype)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Archivo '{tipo}' inválido: {e}")
+
+        return np.load(path, mmap_mode="r" if MODEL_LOAD_MMAP else None)
+
+    @classmethod
+    def _normalizar_embeddings(cls, path: Path) -> np.ndarray | None:
+        """
+        Embeddings del .npy en `path` con filas normalizadas en float32 (sin guardarlos);
+        None si el archivo ya viene así y se puede mapear tal cual.
+        """
+        X_embeddings = cls._cargar_npy("embeddings", path)
+        normalizadas = normalizar_filas(X_embeddings)
+        return None if normalizadas is X_embeddings else normalizadas
+
+    @classmethod
+    def _preparar_normalizadas(cls, path: Path, X_embeddings: np.ndarray) -> np.ndarray:
+        """
+        Embeddings normalizados del índice, mapeados desde EMBEDDINGS_NORM_DIR: se normalizan
+        una sola vez (al subir) y los workers comparten sus páginas en lugar de copiarlos.
+        Si el archivo falta o es más viejo que `path`, se normalizan y se guardan primero.
+        """
+        if EMBEDDINGS_NORM_DIR.exists() and EMBEDDINGS_NORM_DIR.stat().st_mtime >= path.stat().st_mtime:
+            normalizadas = np.load(EMBEDDINGS_NORM_DIR, mmap_mode="r" if MODEL_LOAD_MMAP else None)
+            if normalizadas.shape == X_embeddings.shape and normalizadas.dtype == np.float32:
+                return normalizadas
+            logger.warning(f"Embeddings normalizados {normalizadas.shape} no corresponden a {path}. Normalizando de nuevo...")
+
+        normalizadas = normalizar_filas(X_embeddings)
+        if normalizadas is X_embeddings:
+            return normalizadas
+        cls._guardar_derivado(normalizadas, EMBEDDINGS_NORM_DIR)
+        return np.load(EMBEDDINGS_NORM_DIR, mmap_mode="r" if MODEL_LOAD_MMAP else None)
+
+    @staticmethod
+    def _guardar_derivado(derivado, path: Path):
+        """Guarda un artefacto derivado: un arreglo como .npy (atómico), el resto con su propio `guardar`."""
+        if isinstance(derivado, np.ndarray):
+            with EscrituraAtomica(path) as escritura:
+                np.save(escritura, derivado)
+                escritura.confirmar()
+        else:
+            derivado.guardar(path)
+
+    @classmethod
+    def _preparar_vecinos(cls, path: Path) -> CourseNeighbors:
+        """
+        Retorna la matriz de similitud en formato top-k.
+        Usa el .npz compacto si está al día; si no, convierte la matriz densa y lo guarda.
+        """
+        dense = cls._path_map["matriz"]
+        compacta_al_dia = MATRIZ_TOPK_DIR.exists() and (
+            not dense.exists() or MATRIZ_TOPK_DIR.stat().st_mtime >= dense.stat().st_mtime
+        )
+        if path == MATRIZ_TOPK_DIR or compacta_al_dia:
+            cls._validar_vecinos(MATRIZ_TOPK_DIR)
+            return CourseNeighbors.cargar(MATRIZ_TOPK_DIR)
+
+        vecinos = cls._convertir_vecinos(dense)
+        vecinos.guardar(MATRIZ_TOPK_DIR)
+        return vecinos
+
+    @classmethod
+    def _convertir_vecinos(cls, path: Path) -> CourseNeighbors:
+        """Top-k vecinos de la matriz de similitud densa en `path` (sin guardarlos)."""
+        return CourseNeighbors.desde_densa(cls._cargar_npy("matriz", path), MATRIZ_TOPK_K)
+
+    @classmethod
+    def _preparar_catalogo(cls, path: Path) -> CourseCatalog:
+        """
+        Retorna el catálogo compilado (ver CourseCatalog), mapeado desde CURSOS_CATALOG_DIR.
+        Si falta o es más viejo que el CSV, compila el CSV y lo guarda primero.
+        """
+        if CURSOS_CATALOG_DIR.exists() and CURSOS_CATALOG_DIR.stat().st_mtime >= path.stat().st_mtime:
+            try:
+                return CourseCatalog.cargar(CURSOS_CATALOG_DIR, mmap=MODEL_LOAD_MMAP)
+            except (ValueError, OSError) as e:
+                logger.warning(f"Catálogo compilado inválido ({e}). Compilando de nuevo desde {path}...")
+
+        cls._compilar_catalogo(path).guardar(CURSOS_CATALOG_DIR)
+        return CourseCatalog.cargar(CURSOS_CATALOG_DIR, mmap=MODEL_LOAD_MMAP)
+
+    @staticmethod
+    def _compilar_catalogo(path: Path) -> CourseCatalog:
+        """Compila el CSV del catálogo en `path` (sin guardarlo); 422 si no se puede leer."""
+        try:
+            return CourseCatalog.desde_csv(path)
+        except (ValueError, pd.errors.ParserError) as e:
+            raise HTTPException(status_code=422, detail=f"Archivo 'cursos_info' inválido: {e}")
+
     # --------------------------------------------------------
     # MÉTODO 2: Cargar archivo en memoria
     # --------------------------------------------------------
     @classmethod
-    def load(cls, tipo: str):
-        """Carga el archivo indicado en memoria (Autoencoder, Embeddings, Matriz, CSV)."""
+    def _construir(cls, tipo: str, path: Path) -> tuple[dict, dict]:
+        """Carga un artefacto con sus índices derivados, sin publicarlo. Retorna (modelos, índices)."""
+        if tipo == "autoencoder":
+            # TensorFlow/Keras solo se importa cuando realmente se necesita el autoencoder
+            from keras.models import load_model
+            return {"autoencoder": load_model(path)}, {}
+
+        if tipo == "embeddings":
+            X_embeddings = cls._cargar_npy("embeddings", path)
+            # Con cuantización no se guarda la copia float32: los embeddings originales (mapeados)
+            # solo se leen para volver a puntuar los mejores candidatos
+            vectores = None
+            if EMBEDDING_QUANTIZATION != "float32":
+                vectores = cuantizar(EMBEDDING_QUANTIZATION, X_embeddings, path=EMBEDDING_PQ_DIR,
+                                     subvectores=EMBEDDING_PQ_SUBVECTORS)
+            if vectores is None:
+                indice_embeddings = CourseEmbeddingIndex.desde_normalizadas(
+                    X_embeddings, cls._preparar_normalizadas(path, X_embeddings)
+                )
+            else:
+                indice_embeddings = CourseEmbeddingIndex(X_embeddings, vectores=vectores)
+            if vectores is None or VECTOR_INDEX_BACKEND != FlatIndex.nombre:
+                indice_embeddings.vectorial = construir_indice(
+                    VECTOR_INDEX_BACKEND,
+                    indice_embeddings.normalizadas_exactas(),
+                    path=VECTOR_INDEX_DIR,
+                    n_probe=VECTOR_INDEX_NPROBE
+                )
+            return {"embeddings": X_embeddings}, {"embeddings": indice_embeddings}
+
+        if tipo == "matriz":
+            # Solo se conservan los k vecinos de cada curso: memoria lineal en el catálogo
+            return {"matriz": cls._preparar_vecinos(path)}, {}
+
+        if tipo == "cursos":
+            return {"cursos": cls._cargar_npy("cursos", path)}, {}
+
+        # cursos_info: el catálogo compilado se publica siempre junto con sus índices
+        catalogo = cls._preparar_catalogo(path)
+        return {"cursos_info": catalogo}, {
+            "tfidf": CourseTextIndex(catalogo),
+            "filtros": CourseFilterIndex(catalogo),
+        }
+
+    @classmethod
+    def _cargar_artefacto(cls, tipo: str) -> tuple[dict, dict, dict]:
+        """Valida y construye un artefacto registrando su estado. Retorna (modelos, índices, checksums)."""
         if tipo not in VALID_MODEL_TYPES:
             raise HTTPException(status_code=400, detail=f"Tipo no válido: {tipo}")
 
         path = cls._path_map[tipo]
+        if tipo == "matriz" and not path.exists():
+            path = MATRIZ_TOPK_DIR
         if not path.exists():
+            cls._marcar_error(tipo, f"Archivo no encontrado: {path}")
             raise HTTPException(status_code=404, detail=f"Archivo no encontrado: {path}")
 
+        cls._load_state[tipo] = "cargando"
         try:
-            if tipo == "autoencoder":
-                pass
-                cls._models_cache["autoencoder"] = load_model(path)
-            elif tipo == "embeddings":
-                cls._models_cache["embeddings"] = np.load(path)
-            elif tipo == "matriz":
-                cls._models_cache["matriz"] = np.load(path)
-            elif tipo == "cursos":
-                cls._models_cache["cursos"] = np.load(path)
-            elif tipo == "cursos_info":
-                cls._models_cache["cursos_info"] = pd.read_csv(path)
-
-            logger.info(f"✅ Archivo '{tipo}' cargado correctamente desde {path}")
-            return {"message": f"Archivo '{tipo}' cargado correctamente."}
-
+            models, indexes = cls._construir(tipo, path)
+        except HTTPException as e:
+            cls._marcar_error(tipo, e.detail)
+            raise
         except Exception as e:
+            cls._marcar_error(tipo, str(e))
             logger.error(f"Error al cargar archivo {tipo}: {e}", exc_info=True)
             raise HTTPException(status_code=500, detail=str(e))
 
+        logger.info(f"✅ Archivo '{tipo}' cargado correctamente desde {path}")
+        return models, indexes, {tipo: (cls._registry.info(tipo) or {}).get("sha256")}
+
+    @classmethod
+    def _publicar(cls, models: dict, indexes: dict, checksums: dict) -> ModelSnapshot:
+        """Deriva el nuevo snapshot y lo publica con una sola asignación."""
+        with cls._publish_lock:
+            nuevo = cls._snapshot.derivar(models, indexes, checksums)
+            cls._snapshot = nuevo
+
+        for tipo in models:
+            cls._load_state[tipo] = "cargado"
+            cls._load_errors.pop(tipo, None)
+
+        df_cursos, X_embeddings = nuevo.models["cursos_info"], nuevo.models["embeddings"]
+        if df_cursos is not None and X_embeddings is not None and len(df_cursos) != len(X_embeddings):
+            logger.warning(f"Catálogo ({len(df_cursos)} filas) y embeddings ({len(X_embeddings)} filas) no coinciden.")
+        logger.info(f"Snapshot de modelos v{nuevo.version} publicado ({', '.join(models)})")
+        return nuevo
+
+    @classmethod
+    def load(cls, tipo: str):
+        """Carga el archivo indicado en memoria (Autoencoder, Embeddings, Matriz, CSV)."""
+        nuevo = cls._publicar(*cls._cargar_artefacto(tipo))
+        return {"message": f"Archivo '{tipo}' cargado correctamente.", "snapshot": nuevo.version}
+
+    @classmethod
+    def _marcar_error(cls, tipo: str, detalle: str):
+        """Registra el fallo de carga; si ya había una versión en memoria, sigue sirviéndose."""
+        cls._load_state[tipo] = "cargado" if cls._snapshot.models[tipo] is not None else "error"
+        cls._load_errors[tipo] = detalle
+
     # --------------------------------------------------------
     # MÉTODO 3: Verificar estado
     # --------------------------------------------------------
     @classmethod
     def is_ready(cls):
         """Verifica si los modelos están cargados correctamente."""
-        return {tipo: cls._models_cache[tipo] is not None for tipo in VALID_MODEL_TYPES}
+        snapshot = cls._snapshot
+        return {tipo: snapshot.models[tipo] is not None for tipo in VALID_MODEL_TYPES}
 
     @classmethod
-    def initialize(cls):
-        """Inicializa cargando todos los modelos necesarios."""
+    def readiness(cls):
+        """Estado listo / no listo del servicio y el estado de carga de cada artefacto."""
+        snapshot = cls._snapshot
+        return {
+            "ready": all(snapshot.models[tipo] is not None for tipo in REQUIRED_MODEL_TYPES),
+            "snapshot": snapshot.describir(),
+            "artefactos": {
+                tipo: {"estado": cls._load_state[tipo], "error": cls._load_errors.get(tipo)}
+                for tipo in VALID_MODEL_TYPES
+            },
+        }
+
+    @staticmethod
+    def _bytes_arreglo(arr: np.ndarray) -> tuple[int, int]:
+        """(bytes residentes, bytes mapeados) de un arreglo; un memmap no ocupa heap propio."""
+        if isinstance(arr, np.memmap):
+            return 0, arr.nbytes
+        return arr.nbytes, 0
+
+    @staticmethod
+    def _bytes_dispersa(matriz) -> int:
+        """Bytes ocupados por una matriz dispersa CSR/CSC."""
+        return int(matriz.data.nbytes + matriz.indices.nbytes + matriz.indptr.nbytes)
+
+    @classmethod
+    def memory_report(cls):
+        """
+        Memoria por artefacto: bytes residentes en el proceso vs. mapeados desde disco,
+        más los índices derivados y el RSS total del worker.
+        """
+        snapshot = cls._snapshot
+        reporte = {}
+        for tipo, obj in snapshot.models.items():
+            if isinstance(obj, np.ndarray):
+                residentes, mapeados = cls._bytes_arreglo(obj)
+            elif isinstance(obj, CourseNeighbors):
+                residentes, mapeados = obj.indices.nbytes + obj.scores.nbytes, 0
+            elif isinstance(obj, CourseCatalog):
+                residentes, mapeados = (0, obj.nbytes) if obj.mapeado else (obj.nbytes, 0)
+            elif isinstance(obj, pd.DataFrame):
+                residentes, mapeados = int(obj.memory_usage(deep=True).sum()), 0
+            else:
+                residentes, mapeados = None, None
+            reporte[tipo] = {"bytes_residentes": residentes, "bytes_mapeados": mapeados}
+
+        indices = {}
+        embeddings = snapshot.indexes.get("embeddings")
+        if embeddings is not None:
+            if embeddings.normalizadas is not None:
+                residentes, mapeados = cls._bytes_arreglo(embeddings.normalizadas)
+                indices["embeddings_normalizados"] = {"bytes_residentes": residentes, "bytes_mapeados": mapeados}
+            if embeddings.vectores is not None:
+                indices[f"embeddings_{embeddings.cuantizacion}"] = embeddings.vectores.nbytes
+            if getattr(embeddings.vectorial, "vectores", None) is not None:
+                indices["indice_vectorial"] = embeddings.vectorial.vectores.nbytes
+        tfidf = snapshot.indexes.get("tfidf")
+        if tfidf is not None:
+            indices["tfidf"] = cls._bytes_dispersa(tfidf.matrix) + cls._bytes_dispersa(tfidf._matrix_csc)
+        reporte["indices"] = indices
+
         try:
-            for tipo in VALID_MODEL_TYPES:
-                cls.load(tipo)
-            return True
-        except Exception as e:
-            logger.error(f"Error en inicialización: {e}")
-            return False
+            with open("/proc/self/statm") as f:
+                reporte["rss_bytes"] = int(f.read().split()[1]) * mmap.PAGESIZE
+        except OSError:
+            reporte["rss_bytes"] = None
+        return reporte
+
+    # --------------------------------------------------------
+    # MÉTODO 4: Evaluar índice vectorial
+    # --------------------------------------------------------
+    @classmethod
+    def evaluar_indice_vectorial(cls, backend: str | None = None, k: int = 10, n_consultas: int = 100):
+        """
+        Reporta recall@k y latencia de un backend de índice vectorial contra el exacto.
+        Por defecto evalúa el backend activo; las consultas son cursos del catálogo con ruido.
+        """
+        indice_embeddings = cls._snapshot.indexes.get("embeddings")
+        if indice_embeddings is None:
+            raise HTTPException(status_code=400, detail="❌ Modelo 'embeddings' no está cargado.")
+
+        normalizadas = indice_embeddings.normalizadas_exactas()
+        activo = getattr(indice_embeddings.vectorial, "nombre", FlatIndex.nombre)
+        if indice_embeddings.vectorial is not None and (backend is None or backend == activo):
+            indice = indice_embeddings.vectorial
+        else:
+            try:
+                indice = construir_indice(backend or activo, normalizadas, n_probe=VECTOR_INDEX_NPROBE)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+        return evaluar_recall(indice, FlatIndex(normalizadas), cls._consultas_evaluacion(normalizadas, n_consultas), k=k)
+
+    @staticmethod
+    def _consultas_evaluacion(normalizadas: np.ndarray, n_consultas: int) -> np.ndarray:
+        """Consultas de evaluación: cursos del catálogo con ruido, normalizados."""
+        rng = np.random.default_rng(0)
+        consultas = normalizadas[rng.choice(len(normalizadas), min(n_consultas, len(normalizadas)), replace=False)]
+        consultas = consultas + rng.normal(scale=0.05, size=consultas.shape).astype(np.float32)
+        consultas /= np.linalg.norm(consultas, axis=1, keepdims=True)
+        return consultas
+
+    # --------------------------------------------------------
+    # MÉTODO 5: Evaluar cuantización de embeddings
+    # --------------------------------------------------------
+    @classmethod
+    def evaluar_cuantizacion_embeddings(cls, modos: list[str] | None = None, k: int = 10, n_consultas: int = 100,
+                                        rerank: int = EMBEDDING_RERANK):
+        """
+        Reporta, por modo de cuantización, recall@k contra la búsqueda exacta en float32 (sin y con
+        la nueva puntuación de los `rerank` mejores), latencia por consulta y memoria por curso.
+        Por defecto evalúa todos los modos; los que no están activos se cuantizan al vuelo
+        (la PQ se entrena sin guardarse, lo que puede tardar en catálogos grandes).
+        """
+        indice_embeddings = cls._snapshot.indexes.get("embeddings")
+        if indice_embeddings is None:
+            raise HTTPException(status_code=400, detail="❌ Modelo 'embeddings' no está cargado.")
+
+        modos = modos or list(EMBEDDING_QUANTIZERS)
+        invalidos = [m for m in modos if m not in EMBEDDING_QUANTIZERS]
+        if invalidos:
+            raise HTTPException(status_code=400, detail=f"Modos de cuantización no válidos: {invalidos}")
+
+        X_embeddings = indice_embeddings.X_embeddings
+        normalizadas = indice_embeddings.normalizadas_exactas()
+        consultas = cls._consultas_evaluacion(normalizadas, n_consultas)
+        reporte = {"activo": indice_embeddings.cuantizacion, "modos": []}
+        for modo in modos:
+            inicio = time.perf_counter()
+            if modo == Float32Vectors.nombre:
+                vectores = Float32Vectors(normalizadas)
+            elif modo == indice_embeddings.cuantizacion:
+                vectores = indice_embeddings.vectores
+            else:
+                vectores = cuantizar(modo, X_embeddings, subvectores=EMBEDDING_PQ_SUBVECTORS)
+            construccion = time.perf_counter() - inicio
+
+            resultado = evaluar_cuantizacion(vectores, normalizadas, X_embeddings, consultas, k=k)
+            resultado["construccion_s"] = construccion
+            if rerank > 0 and modo != Float32Vectors.nombre:
+                con_rerank = evaluar_cuantizacion(vectores, normalizadas, X_embeddings, consultas, k=k, rerank=rerank)
+                resultado.update({
+                    "rerank": rerank,
+                    "recall_at_k_rerank": con_rerank["recall_at_k"],
+                    "latencia_ms_p50_rerank": con_rerank["latencia_ms_p50"],
+                    "latencia_ms_p99_rerank": con_rerank["latencia_ms_p99"],
+                })
+            reporte["modos"].append(resultado)
+        return reporte
+
+    @classmethod
+    def initialize(cls):
+        """
+        Inicializa cargando todos los modelos necesarios.
+        Cada artefacto se carga por separado (un fallo no impide cargar el resto)
+        y los de LAZY_MODEL_TYPES quedan diferidos hasta su primer uso.
+        """
+        models, indexes, checksums = {}, {}, {}
+        for tipo in VALID_MODEL_TYPES:
+            if tipo in LAZY_MODEL_TYPES:
+                cls._load_state[tipo] = "diferido"
+                continue
+            try:
+                m, i, c = cls._cargar_artefacto(tipo)
+                models.update(m)
+                indexes.update(i)
+                checksums.update(c)
+            except HTTPException as e:
+                logger.error(f"Error en inicialización de '{tipo}': {e.detail}")
+
+        # Todo lo cargado se publica junto: catálogo, embeddings e índices en un único snapshot
+        if models:
+            cls._publicar(models, indexes, checksums)
+        return cls.readiness()["ready"]
+
+    @classmethod
+    def start_background_loading(cls) -> threading.Thread:
+        """Lanza la inicialización en un hilo para no retrasar el arranque de la API."""
+        def _cargar():
+            if cls.initialize():
+                logger.info("--- Servicio de modelos inicializado correctamente.")
+            else:
+                logger.error("--- No se pudieron cargar los modelos requeridos. Servicio no disponible.")
+
+        hilo = threading.Thread(target=_cargar, name="model-loader", daemon=True)
+        hilo.start()
+        return hilo
+
+    @classmethod
+    def get_model(cls, tipo: str):
+        """Retorna el artefacto cargado; los diferidos (p. ej. el autoencoder) se cargan en su primer uso."""
+        if cls._snapshot.models[tipo] is None and tipo in LAZY_MODEL_TYPES:
+            with cls._load_lock:
+                if cls._snapshot.models[tipo] is None:
+                    cls.load(tipo)
+        return cls._snapshot.models[tipo]
     
     @classmethod
     def download_file(cls, tipo: str):
+        """
+        Descarga el artefacto. FileResponse atiende cabeceras Range / If-Range
+        (respuestas 206), así que los archivos grandes pueden bajarse por partes o
+        reanudarse; el ETag cambia con cada versión subida.
+        """
         if tipo not in cls._path_map:
             raise HTTPException(status_code=400, detail=f"Tipo no válido: {tipo}")
 
         path = cls._path_map[tipo]
+        if tipo == "matriz" and not path.exists():
+            path = MATRIZ_TOPK_DIR
         if not path.exists():
             raise HTTPException(status_code=404, detail=f"Archivo no encontrado: {path}")
 
+        headers = {}
+        info = cls._registry.info(tipo)
+        if info and info.get("path") == str(path):
+            headers["X-Checksum-SHA256"] = info["sha256"]
+
         logger.info(f"✅ Archivo '{tipo}' descargado correctamente desde {path}")
         return FileResponse(
             path=path,
             filename=path.name,
-            media_type="application/octet-stream"
+            media_type="application/octet-stream",
+            headers=headers
         )
     
 # ============================================================
 # SINGLETON (instancia global)
 # ============================================================
+# La carga de modelos se lanza en el evento de inicio (ver src/main.py)
 models_service = ModelService()
-if not models_service.initialize():
-    logger.error("--- No se pudieron cargar los modelos. Servicio no disponible.")
-else:
-    logger.info("--- Servicio de modelos inicializado correctamente.")
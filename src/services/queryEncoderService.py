@@ -0,0 +1,387 @@
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from fastapi import HTTPException
+from src.core.config import AUTOENCODER_DIR, QUERY_ENCODER_DIR, QUERY_ENCODER_ENABLED, QUERY_ENCODER_RUNTIME
+from src.core.config import QUERY_ENCODER_WORKERS, QUERY_ENCODER_MAX_BATCH, QUERY_ENCODER_MAX_WAIT_MS
+from src.core.config import QUERY_ENCODER_RIDGE_ALPHA
+from src.services.indexService import CourseTextIndex
+from src.services.microBatchService import MicroBatcher
+from src.services.modelRegistryService import ModelSnapshot, escribir_atomico
+from src.services.modelService import ModelService
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# TEXTO → CARACTERÍSTICAS DE `cursos` — QueryFeaturePipeline
+# ============================================================
+class QueryFeaturePipeline:
+    """
+    Lleva el texto de una consulta al espacio de características de la matriz `cursos`
+    (la entrada del autoencoder). El pipeline que generó esa matriz no forma parte del
+    servicio, así que se ajusta sobre el propio catálogo: una regresión ridge del TF-IDF
+    de NOMBRE_OFERTA a la fila de `cursos` de cada curso. Una consulta queda con la misma
+    escala y columnas que los cursos con los que se entrenó el autoencoder.
+    """
+
+    def __init__(self, indice_tfidf: CourseTextIndex, X_cursos: np.ndarray, alpha: float = QUERY_ENCODER_RIDGE_ALPHA):
+        from sklearn.linear_model import Ridge
+
+        if X_cursos.shape[0] != indice_tfidf.n_docs:
+            raise ValueError(f"'cursos' tiene {X_cursos.shape[0]} filas y el catálogo {indice_tfidf.n_docs}")
+
+        modelo = Ridge(alpha=alpha, fit_intercept=False).fit(indice_tfidf.matrix, np.asarray(X_cursos, dtype=np.float32))
+        self.W = np.ascontiguousarray(modelo.coef_.T, dtype=np.float32)  # (términos, columnas de cursos)
+        self.indice_tfidf = indice_tfidf
+        self.dim = self.W.shape[1]
+
+    def transformar(self, textos: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """(características (m, dim), máscara de las consultas con algún término del vocabulario)."""
+        tfidf = self.indice_tfidf.vectorizer.transform(textos)
+        return np.asarray(tfidf @ self.W, dtype=np.float32), np.diff(tfidf.indptr) > 0
+
+
+# ============================================================
+# RUNTIMES DEL ENCODER
+# ============================================================
+def _elu(x):
+    return np.where(x > 0, x, np.expm1(np.minimum(x, 0)))
+
+
+ACTIVACIONES = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "sigmoid": lambda x: 1 / (1 + np.exp(-x)),
+    "tanh": np.tanh,
+    "elu": _elu,
+    "selu": lambda x: 1.0507009873554805 * np.where(x > 0, x, 1.6732632423543772 * np.expm1(np.minimum(x, 0))),
+    "softplus": lambda x: np.logaddexp(0, x),
+}
+
+# Capas que en inferencia no hacen nada
+CAPAS_IDENTIDAD = {"InputLayer", "Dropout", "GaussianNoise", "GaussianDropout", "AlphaDropout", "ActivityRegularization"}
+
+
+def extraer_encoder(autoencoder, dim: int):
+    """
+    Mitad encoder del autoencoder: una sub-capa llamada "encoder" si existe o, si no,
+    el modelo desde la entrada hasta la primera capa cuya salida tiene la dimensión
+    de los embeddings (el cuello de botella).
+    """
+    import keras
+
+    try:
+        encoder = autoencoder.get_layer("encoder")
+        if encoder.output.shape[-1] == dim:
+            return encoder
+    except ValueError:
+        pass
+
+    for capa in autoencoder.layers:
+        if type(capa).__name__ != "InputLayer" and capa.output.shape[-1] == dim:
+            return keras.Model(autoencoder.input, capa.output)
+    raise ValueError(f"el autoencoder no tiene una capa de dimensión {dim} (la de los embeddings)")
+
+
+class NumpyEncoder:
+    """
+    Encoder exportado a NumPy: una secuencia de capas densas (W, b, activación) y
+    afines por elemento (BatchNormalization plegada). En inferencia no necesita
+    TensorFlow y cada lote es un par de productos de matrices float32.
+    """
+
+    nombre = "numpy"
+
+    def __init__(self, capas: list[dict]):
+        if not capas:
+            raise ValueError("el encoder no tiene capas")
+        self.capas = capas
+        self.dim_entrada = next(len(c["b"]) if c["W"] is None else c["W"].shape[0] for c in capas)
+        self.dim = len(capas[-1]["b"])
+
+    @staticmethod
+    def _capas_keras(modelo):
+        for capa in modelo.layers:
+            if hasattr(capa, "layers"):
+                yield from NumpyEncoder._capas_keras(capa)
+            else:
+                yield capa
+
+    @classmethod
+    def desde_keras(cls, encoder) -> "NumpyEncoder":
+        """Convierte un encoder Keras secuencial; ValueError si usa capas sin equivalente."""
+        capas = []
+        for capa in cls._capas_keras(encoder):
+            tipo = type(capa).__name__
+            if tipo in CAPAS_IDENTIDAD:
+                continue
+
+            if tipo == "Dense":
+                activacion = capa.activation.__name__
+                if activacion not in ACTIVACIONES:
+                    raise ValueError(f"activación no soportada: {activacion}")
+                pesos = capa.get_weights()
+                W = pesos[0].astype(np.float32)
+                b = pesos[1].astype(np.float32) if len(pesos) > 1 else np.zeros(W.shape[1], dtype=np.float32)
+                capas.append({"W": W, "escala": None, "b": b, "act": activacion})
+
+            elif tipo == "BatchNormalization":
+                gamma, beta, media, varianza = (
+                    capa.gamma.numpy() if capa.scale else 1.0,
+                    capa.beta.numpy() if capa.center else 0.0,
+                    capa.moving_mean.numpy(),
+                    capa.moving_variance.numpy(),
+                )
+                escala = (gamma / np.sqrt(varianza + capa.epsilon)).astype(np.float32)
+                desplazamiento = (beta - media * escala).astype(np.float32)
+                previa = capas[-1] if capas else None
+                if previa is not None and previa["act"] == "linear" and previa["W"] is not None:
+                    previa["W"] = previa["W"] * escala
+                    previa["b"] = previa["b"] * escala + desplazamiento
+                else:
+                    capas.append({"W": None, "escala": escala, "b": desplazamiento, "act": "linear"})
+
+            elif tipo == "Activation":
+                activacion = capa.activation.__name__
+                if activacion not in ACTIVACIONES or not capas or capas[-1]["act"] != "linear":
+                    raise ValueError(f"activación no soportada en esta posición: {activacion}")
+                capas[-1]["act"] = activacion
+
+            else:
+                raise ValueError(f"capa no soportada por el runtime NumPy: {tipo}")
+
+        return cls(capas)
+
+    def __call__(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        for capa in self.capas:
+            X = X @ capa["W"] + capa["b"] if capa["W"] is not None else X * capa["escala"] + capa["b"]
+            X = ACTIVACIONES[capa["act"]](X)
+        return X
+
+    def guardar(self, path):
+        arreglos = {"activaciones": np.array([c["act"] for c in self.capas])}
+        for i, capa in enumerate(self.capas):
+            arreglos[f"b_{i}"] = capa["b"]
+            if capa["W"] is not None:
+                arreglos[f"W_{i}"] = capa["W"]
+            else:
+                arreglos[f"escala_{i}"] = capa["escala"]
+        buffer = io.BytesIO()
+        np.savez(buffer, **arreglos)
+        escribir_atomico(path, buffer.getvalue())
+        logger.info(f"Encoder exportado a NumPy en {path} ({len(self.capas)} capas)")
+
+    @classmethod
+    def cargar(cls, path) -> "NumpyEncoder":
+        with np.load(path) as data:
+            return cls([
+                {"W": data.get(f"W_{i}"), "escala": data.get(f"escala_{i}"), "b": data[f"b_{i}"], "act": str(act)}
+                for i, act in enumerate(data["activaciones"])
+            ])
+
+
+class KerasEncoder:
+    """Encoder Keras tal cual (cualquier arquitectura); se llama directamente, sin predict()."""
+
+    nombre = "keras"
+
+    def __init__(self, encoder):
+        self.encoder = encoder
+        self.dim_entrada = encoder.input.shape[-1]
+        self.dim = encoder.output.shape[-1]
+
+    def __call__(self, X: np.ndarray) -> np.ndarray:
+        return np.asarray(self.encoder(np.asarray(X, dtype=np.float32), training=False))
+
+
+# ============================================================
+# CODIFICADOR DE CONSULTAS — QueryEncoder
+# ============================================================
+class QueryEncoder:
+    """
+    Embedding de una consulta en el espacio de los cursos:
+    texto → características de `cursos` (QueryFeaturePipeline) → encoder del autoencoder.
+
+    Las consultas sin ningún término del vocabulario no tienen características y
+    reciben un vector nulo (no aportan similitud de embeddings).
+    Las peticiones concurrentes se agrupan en lotes (MicroBatcher) y cada lote se
+    ejecuta en el pool de hilos indicado.
+    """
+
+    def __init__(self, pipeline: QueryFeaturePipeline, runtime, executor=None,
+                 max_lote: int = QUERY_ENCODER_MAX_BATCH, max_espera_ms: float = QUERY_ENCODER_MAX_WAIT_MS):
+        if runtime.dim_entrada != pipeline.dim:
+            raise ValueError(f"el encoder espera {runtime.dim_entrada} columnas y 'cursos' tiene {pipeline.dim}")
+        self.pipeline = pipeline
+        self.runtime = runtime
+        self.dim = runtime.dim
+        self._batcher = MicroBatcher(self.codificar_lote, max_lote, max_espera_ms, executor, nombre="query-encoder")
+
+    def codificar_lote(self, textos: list[str]) -> np.ndarray:
+        """Embeddings (m, dim) float32 de varias consultas en una sola pasada por el encoder."""
+        X, con_terminos = self.pipeline.transformar(textos)
+        Q = np.zeros((len(textos), self.dim), dtype=np.float32)
+        if con_terminos.any():
+            Q[con_terminos] = self.runtime(X[con_terminos])
+        return Q
+
+    def codificar(self, texto: str) -> np.ndarray:
+        """Embedding de una consulta, agrupada con las que lleguen a la vez."""
+        return self._batcher.ejecutar(texto)
+
+    async def codificar_async(self, texto: str) -> np.ndarray:
+        """Como codificar(), sin bloquear el event loop."""
+        return await self._batcher.ejecutar_async(texto)
+
+    def detener(self):
+        self._batcher.detener()
+
+
+# ============================================================
+# SERVICE LAYER — QueryEncoderService
+# ============================================================
+class QueryEncoderService:
+    """
+    Mantiene el QueryEncoder del catálogo vigente.
+    - Solo con QUERY_ENCODER_ENABLED=1; si no, el recomendador usa el promedio de los
+      vecinos TF-IDF.
+    - Se construye en segundo plano la primera vez que se pide para un snapshot con
+      `cursos`, catálogo y embeddings; mientras tanto (o si falla) `obtener` retorna
+      None y el recomendador usa el promedio de los vecinos TF-IDF.
+    - Con runtime "auto"/"numpy" el encoder se exporta a QUERY_ENCODER_DIR; mientras
+      ese archivo esté al día se carga sin importar TensorFlow.
+    """
+
+    def __init__(self, habilitado: bool = QUERY_ENCODER_ENABLED, runtime: str = QUERY_ENCODER_RUNTIME,
+                 workers: int = QUERY_ENCODER_WORKERS, path=QUERY_ENCODER_DIR):
+        if runtime not in ("auto", "numpy", "keras"):
+            raise ValueError(f"Runtime de codificador no válido: {runtime}")
+        self.habilitado = habilitado
+        self.runtime = runtime
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="query-encoder")
+        self._lock = threading.Lock()
+        self._fuentes = None
+        self._encoder = None
+        self._construccion = None
+        self._error = None
+
+    @staticmethod
+    def _fuentes_de(snapshot: ModelSnapshot) -> tuple | None:
+        fuentes = (snapshot.models["cursos"], snapshot.indexes.get("tfidf"), snapshot.indexes.get("embeddings"))
+        if any(f is None for f in fuentes):
+            return None
+        return fuentes + (snapshot.models["autoencoder"],)
+
+    def _vigente(self, fuentes: tuple) -> bool:
+        if self._fuentes is None or any(a is not b for a, b in zip(fuentes[:3], self._fuentes)):
+            return False
+        # Sin autoencoder en el snapshot (diferido o exportado) sirve el encoder actual; mientras se
+        # construye, el autoencoder que la propia construcción acaba de cargar cuenta como el mismo
+        autoencoder, usado = fuentes[3], self._fuentes[3]
+        return autoencoder is None or autoencoder is usado or (usado is None and not self._construccion.done())
+
+    def obtener(self, snapshot: ModelSnapshot, esperar: bool = False) -> QueryEncoder | None:
+        """QueryEncoder del snapshot, o None si no está disponible (todavía)."""
+        if not self.habilitado:
+            return None
+        fuentes = self._fuentes_de(snapshot)
+        if fuentes is None:
+            return None
+
+        with self._lock:
+            if not self._vigente(fuentes):
+                if self._encoder is not None:
+                    self._encoder.detener()
+                self._fuentes, self._encoder, self._error = fuentes, None, None
+                self._construccion = self._executor.submit(self._construir, snapshot, fuentes)
+            construccion, encoder = self._construccion, self._encoder
+
+        if encoder is None and esperar:
+            construccion.result()
+            encoder = self._encoder
+        return encoder
+
+    def _cargar_runtime(self, dim: int):
+        """Runtime del encoder: el exportado si está al día, si no se extrae del autoencoder."""
+        if self.runtime != "keras" and self.path.exists() and (
+            not AUTOENCODER_DIR.exists() or self.path.stat().st_mtime >= AUTOENCODER_DIR.stat().st_mtime
+        ):
+            runtime = NumpyEncoder.cargar(self.path)
+            if runtime.dim == dim:
+                return runtime, None
+
+        autoencoder = ModelService.get_model("autoencoder")
+        encoder = extraer_encoder(autoencoder, dim)
+        if self.runtime != "keras":
+            try:
+                runtime = NumpyEncoder.desde_keras(encoder)
+                runtime.guardar(self.path)
+                return runtime, autoencoder
+            except ValueError as e:
+                if self.runtime == "numpy":
+                    raise
+                logger.info(f"Encoder no exportable a NumPy ({e}); se usa Keras.")
+        return KerasEncoder(encoder), autoencoder
+
+    def _construir(self, snapshot: ModelSnapshot, fuentes: tuple):
+        X_cursos, indice_tfidf, indice_embeddings, _ = fuentes
+        try:
+            runtime, autoencoder = self._cargar_runtime(indice_embeddings.dim)
+            encoder = QueryEncoder(QueryFeaturePipeline(indice_tfidf, X_cursos), runtime, executor=self._executor)
+        except HTTPException as e:
+            self._fallo(fuentes, e.detail)
+            return
+        except Exception as e:
+            self._fallo(fuentes, str(e))
+            return
+
+        with self._lock:
+            if self._fuentes is fuentes:
+                self._encoder = encoder
+                # Cargar el autoencoder publica un snapshot nuevo con el mismo catálogo: sigue vigente
+                self._fuentes = fuentes[:3] + (autoencoder if autoencoder is not None else fuentes[3],)
+                logger.info(f"Codificador de consultas listo (runtime {runtime.nombre}, dimensión {encoder.dim})")
+            else:
+                encoder.detener()
+
+    def _fallo(self, fuentes: tuple, detalle: str):
+        with self._lock:
+            if self._fuentes is fuentes:
+                self._error = detalle
+        logger.warning(f"Codificador de consultas no disponible, se usa el promedio de vecinos TF-IDF: {detalle}")
+
+    def estado(self) -> dict:
+        encoder = self._encoder
+        if not self.habilitado:
+            estado = "deshabilitado"
+        elif encoder is not None:
+            estado = "listo"
+        elif self._error is not None:
+            estado = "error"
+        elif self._construccion is not None and not self._construccion.done():
+            estado = "construyendo"
+        else:
+            estado = "no disponible"
+        return {
+            "estado": estado,
+            "runtime": encoder.runtime.nombre if encoder is not None else None,
+            "dimension": encoder.dim if encoder is not None else None,
+            "error": self._error,
+        }
+
+    def detener(self):
+        with self._lock:
+            if self._encoder is not None:
+                self._encoder.detener()
+        self._executor.shutdown(wait=False)
+
+
+# ============================================================
+# SINGLETON INSTANCE
+# ============================================================
+query_encoder_service = QueryEncoderService()
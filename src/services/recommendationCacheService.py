@@ -0,0 +1,85 @@
+import logging
+import threading
+from collections import OrderedDict
+from src.core.config import RECOMMENDATION_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class RecommendationCache:
+    """
+    Cache LRU acotado de resultados de recomendación.
+    La clave incluye la versión del snapshot de modelos. La cache sigue la versión más nueva
+    que ha visto: al llegar una mayor (recarga del catálogo o de los embeddings) se vacía, y
+    las peticiones que aún usan un snapshot anterior no leen ni guardan resultados (tampoco
+    hacen retroceder la versión ni vacían la cache).
+    """
+
+    def __init__(self, max_entries: int = RECOMMENDATION_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entradas = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self._metricas = {"hits": 0, "misses": 0, "evictions": 0, "invalidaciones": 0}
+
+    @staticmethod
+    def normalizar(texto: str) -> str:
+        """Minúsculas y espacios colapsados (el tokenizador TF-IDF ignora ambos)."""
+        return " ".join(texto.lower().split())
+
+    def _vigente(self, version: int) -> bool:
+        """Si `version` es la más nueva vista (una mayor vacía la cache); False para snapshots anteriores."""
+        if self._version is None or version > self._version:
+            if self._entradas:
+                self._metricas["invalidaciones"] += 1
+                logger.info(f"Cache de recomendaciones invalidada (snapshot v{self._version} → v{version})")
+            self._entradas.clear()
+            self._version = version
+        return version == self._version
+
+    def obtener(self, version: int, clave: tuple):
+        """Resultado guardado para la clave en esta versión de modelos, o None."""
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            valor = self._entradas.get((version, *clave)) if self._vigente(version) else None
+            if valor is None:
+                self._metricas["misses"] += 1
+                return None
+            self._entradas.move_to_end((version, *clave))
+            self._metricas["hits"] += 1
+            return valor
+
+    def guardar(self, version: int, clave: tuple, valor):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if not self._vigente(version):
+                return
+            self._entradas[(version, *clave)] = valor
+            self._entradas.move_to_end((version, *clave))
+            while len(self._entradas) > self.max_entries:
+                self._entradas.popitem(last=False)
+                self._metricas["evictions"] += 1
+
+    def invalidar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._metricas["invalidaciones"] += 1
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self._metricas["hits"] + self._metricas["misses"]
+            return {
+                **self._metricas,
+                "hit_rate": self._metricas["hits"] / consultas if consultas else None,
+                "entradas": len(self._entradas),
+                "max_entries": self.max_entries,
+                "version": self._version,
+            }
+
+
+# ============================================================
+# SINGLETON INSTANCE
+recommendation_cache = RecommendationCache()
+# ============================================================
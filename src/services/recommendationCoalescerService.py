@@ -0,0 +1,78 @@
+import logging
+from concurrent.futures import Executor
+from src.core.config import (
+    RECOMMENDATION_COALESCE, RECOMMENDATION_COALESCE_WINDOW_MS, RECOMMENDATION_COALESCE_MAX_BATCH,
+    RECOMMENDATION_PESO_EMBED, RECOMMENDATION_PESO_TFIDF
+)
+from src.services.microBatchService import MicroBatcher
+from src.services.modelRegistryService import ModelSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# AGRUPADOR DE RECOMENDACIONES — RecommendationCoalescer
+# ============================================================
+class RecommendationCoalescer:
+    """
+    Junta las consultas de recomendación que llegan casi a la vez (p. ej. varios
+    turnos en el paso 3) y las puntúa con una sola llamada a `recomendar_lote`
+    (RecommenderService.obtener_recomendaciones_lote): un producto disperso y uno
+    denso por lote en lugar de un recorrido del catálogo por consulta.
+
+    Dentro de un lote, las consultas se agrupan por snapshot y parámetros (k, pesos,
+    filtros); cada grupo es una llamada. La ventana (`ventana_ms`) y el lote máximo
+    acotan la espera añadida y el tiempo de cada lote.
+
+    Con `executor` los lotes se calculan en ese pool. Desde el event loop conviene
+    `recomendar_async`: la consulta espera su lote sin ocupar un hilo, de modo que el
+    lote puede juntar más consultas que hilos tiene el pool.
+    """
+
+    def __init__(self, recomendar_lote, habilitado: bool = RECOMMENDATION_COALESCE,
+                 max_lote: int = RECOMMENDATION_COALESCE_MAX_BATCH, ventana_ms: float = RECOMMENDATION_COALESCE_WINDOW_MS,
+                 executor: Executor | None = None):
+        self.recomendar_lote = recomendar_lote
+        self.habilitado = habilitado
+        self._batcher = MicroBatcher(self._recomendar, max_lote, ventana_ms, executor, nombre="recommendation-coalescer")
+
+    def _recomendar(self, peticiones: list[tuple]) -> list[list[dict]]:
+        grupos = {}
+        for i, (_, parametros, snapshot) in enumerate(peticiones):
+            grupos.setdefault((id(snapshot), parametros), (snapshot, []))[1].append(i)
+
+        resultados = [None] * len(peticiones)
+        for (_, parametros), (snapshot, posiciones) in grupos.items():
+            num_recomendaciones, peso_embed, peso_tfidf, modalidad, duracion = parametros
+            lote = self.recomendar_lote(
+                [peticiones[i][0] for i in posiciones],
+                num_recomendaciones,
+                peso_embed=peso_embed,
+                peso_tfidf=peso_tfidf,
+                modalidad=modalidad,
+                duracion=duracion,
+                snapshot=snapshot
+            )
+            for i, recomendaciones in zip(posiciones, lote):
+                resultados[i] = recomendaciones
+        return resultados
+
+    def recomendar(self, texto: str, snapshot: ModelSnapshot, num_recomendaciones=5,
+                   peso_embed=RECOMMENDATION_PESO_EMBED, peso_tfidf=RECOMMENDATION_PESO_TFIDF,
+                   modalidad=None, duracion=None) -> list[dict]:
+        """Recomendaciones de una consulta, calculadas junto con las que lleguen en la misma ventana."""
+        parametros = (num_recomendaciones, peso_embed, peso_tfidf, modalidad, duracion)
+        return self._batcher.ejecutar((texto, parametros, snapshot))
+
+    async def recomendar_async(self, texto: str, snapshot: ModelSnapshot, num_recomendaciones=5,
+                               peso_embed=RECOMMENDATION_PESO_EMBED, peso_tfidf=RECOMMENDATION_PESO_TFIDF,
+                               modalidad=None, duracion=None) -> list[dict]:
+        """Igual que recomendar, sin bloquear el event loop mientras se espera el lote."""
+        parametros = (num_recomendaciones, peso_embed, peso_tfidf, modalidad, duracion)
+        return await self._batcher.ejecutar_async((texto, parametros, snapshot))
+
+    def estadisticas(self) -> dict:
+        return {"habilitado": self.habilitado, **self._batcher.estadisticas()}
+
+    def detener(self):
+        self._batcher.detener()
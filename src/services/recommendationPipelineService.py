@@ -0,0 +1,211 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+from src.core.config import RECOMMENDATION_CANDIDATES, RECOMMENDATION_PIPELINE, EMBEDDING_RERANK
+from src.services.indexService import CourseEmbeddingIndex, CourseTextIndex, top_k_indices
+
+
+def _en_ordenados(valores: np.ndarray, ordenados: np.ndarray) -> np.ndarray:
+    """Máscara de los `valores` presentes en el arreglo ordenado `ordenados` (O(m log n), sin recorrerlo)."""
+    if len(ordenados) == 0:
+        return np.zeros(len(valores), dtype=bool)
+    posiciones = np.minimum(np.searchsorted(ordenados, valores), len(ordenados) - 1)
+    return ordenados[posiciones] == valores
+
+
+# ============================================================
+# MÉTRICAS POR ETAPA — RecommendationStageStats
+# ============================================================
+class RecommendationStageStats:
+    """
+    Tiempos de cada etapa del ranking en dos etapas (percentiles sobre las últimas `muestras`
+    consultas), el tamaño del conjunto de candidatos y cuántas consultas recurrieron al
+    ranking exhaustivo. Sirven para ajustar RECOMMENDATION_CANDIDATES contra la latencia.
+    Las consultas rankeadas en el pool de procesos se registran aquí cuando el proceso de la
+    API recibe el resultado.
+    """
+
+    etapas = ("vector_consulta", "candidatos", "reranking", "materializacion")
+
+    def __init__(self, muestras: int = 2048):
+        self._lock = threading.Lock()
+        self._tiempos = {etapa: deque(maxlen=muestras) for etapa in self.etapas}
+        self._candidatos = deque(maxlen=muestras)
+        self._consultas = 0
+        self._exhaustivas = 0
+
+    def registrar(self, tiempos: dict):
+        with self._lock:
+            for etapa, ms in tiempos.items():
+                if etapa in self._tiempos:
+                    self._tiempos[etapa].append(ms)
+            if "n_candidatos" in tiempos:
+                self._consultas += 1
+                self._exhaustivas += int(tiempos.get("exhaustivo", False))
+                self._candidatos.append(tiempos["n_candidatos"])
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            tiempos = {etapa: list(valores) for etapa, valores in self._tiempos.items()}
+            candidatos, consultas, exhaustivas = list(self._candidatos), self._consultas, self._exhaustivas
+
+        def percentil(valores, p):
+            return float(np.percentile(valores, p)) if valores else None
+
+        return {
+            "pipeline": RECOMMENDATION_PIPELINE,
+            "presupuesto_candidatos": RECOMMENDATION_CANDIDATES,
+            "consultas": consultas,
+            "exhaustivas": exhaustivas,
+            "candidatos_p50": percentil(candidatos, 50),
+            "candidatos_p99": percentil(candidatos, 99),
+            **{f"{etapa}_ms_p50": percentil(valores, 50) for etapa, valores in tiempos.items()},
+            **{f"{etapa}_ms_p99": percentil(valores, 99) for etapa, valores in tiempos.items()},
+        }
+
+
+# ============================================================
+# RANKING EN DOS ETAPAS — RecommendationPipeline
+# ============================================================
+class RecommendationPipeline:
+    """
+    Ranking híbrido en dos etapas:
+    1. Candidatos: los `presupuesto` cursos de mayor similitud TF-IDF leídos del índice invertido
+       (solo los postings de los términos de la consulta) más, con un índice vectorial aproximado,
+       sus `presupuesto` vecinos por embeddings; el filtro de metadatos se aplica aquí.
+    2. Reranking: solo los candidatos se puntúan con peso_embed · embeddings + peso_tfidf · TF-IDF.
+    El costo de la segunda etapa no depende del tamaño del catálogo. Si la primera etapa no
+    junta k candidatos (pocas coincidencias o filtro muy estrecho), se puntúan todos los cursos
+    que cumplen el filtro, como el ranking exhaustivo. Una consulta sin términos del vocabulario
+    (y sin vector del codificador) no tiene con qué puntuar: no hay candidatos ni recomendaciones.
+    """
+
+    @staticmethod
+    def vector_consulta(filas_lexicas: np.ndarray, scores_lexicos: np.ndarray,
+                        indice_embeddings: CourseEmbeddingIndex) -> np.ndarray | None:
+        """Promedio de los embeddings de los 10 cursos más afines por TF-IDF (None si no hay ninguno)."""
+        if len(filas_lexicas) == 0:
+            return None
+        return indice_embeddings.X_embeddings[filas_lexicas[top_k_indices(scores_lexicos, 10)]].mean(axis=0)
+
+    @staticmethod
+    def candidatos(filas_lexicas: np.ndarray, scores_lexicos: np.ndarray, indice_embeddings: CourseEmbeddingIndex,
+                   q_unit: np.ndarray, k: int, filas: np.ndarray | None = None,
+                   presupuesto: int = RECOMMENDATION_CANDIDATES) -> tuple[np.ndarray, np.ndarray, bool]:
+        """
+        Primera etapa: (candidatos ordenados por índice, su similitud TF-IDF, si se recurrió al
+        conjunto completo). `filas_lexicas` / `scores_lexicos` son los cursos con términos de la
+        consulta (CourseTextIndex.candidatos, ordenados por índice); `filas`, el pre-filtro.
+        """
+        presupuesto = max(k, presupuesto)
+        if filas is not None:
+            dentro = _en_ordenados(filas_lexicas, filas)
+            filas_lexicas, scores_lexicos = filas_lexicas[dentro], scores_lexicos[dentro]
+
+        candidatos = np.sort(filas_lexicas[top_k_indices(scores_lexicos, presupuesto)])
+        vectorial = indice_embeddings.vectorial
+        if vectorial is not None and not vectorial.exacto and q_unit.any():
+            vecinos, _ = vectorial.buscar(q_unit, presupuesto)
+            if filas is not None:
+                vecinos = vecinos[_en_ordenados(vecinos, filas)]
+            candidatos = np.union1d(candidatos, vecinos)
+
+        exhaustivo = len(candidatos) < k
+        if exhaustivo:
+            candidatos = filas if filas is not None else np.arange(indice_embeddings.n_docs)
+
+        # Similitud TF-IDF de cada candidato (0 si no comparte términos con la consulta)
+        tfidf = np.zeros(len(candidatos))
+        if len(filas_lexicas):
+            posiciones = np.minimum(np.searchsorted(filas_lexicas, candidatos), len(filas_lexicas) - 1)
+            coincide = filas_lexicas[posiciones] == candidatos
+            tfidf[coincide] = scores_lexicos[posiciones[coincide]]
+        return candidatos, tfidf, exhaustivo
+
+    @staticmethod
+    def rerankear(candidatos: np.ndarray | None, tfidf: np.ndarray, q_unit: np.ndarray,
+                  indice_embeddings: CourseEmbeddingIndex, k: int, peso_embed: float, peso_tfidf: float,
+                  refinar: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Segunda etapa: los k mejores candidatos (ordenados por índice; None = todo el catálogo) por
+        peso_embed · embeddings + peso_tfidf · TF-IDF. Con embeddings cuantizados, los `refinar`
+        mejores (por defecto EMBEDDING_RERANK) se vuelven a puntuar con los embeddings originales.
+        """
+        similitud_final = peso_embed * indice_embeddings.puntuar(q_unit, candidatos) + peso_tfidf * tfidf
+        refinar = EMBEDDING_RERANK if refinar is None else refinar
+        if indice_embeddings.vectores is not None and refinar > 0:
+            # En orden de índice, para desempatar igual que sin cuantizar
+            mejores = np.sort(top_k_indices(similitud_final, max(k, refinar)))
+            candidatos = mejores if candidatos is None else candidatos[mejores]
+            similitud_final = peso_embed * indice_embeddings.exactas(q_unit, candidatos) + peso_tfidf * tfidf[mejores]
+
+        top = top_k_indices(similitud_final, k)
+        return (top if candidatos is None else candidatos[top]), similitud_final[top]
+
+    @staticmethod
+    def rerankear_lote(candidatos: list[np.ndarray], tfidf: list[np.ndarray], Q_unit: np.ndarray,
+                       indice_embeddings: CourseEmbeddingIndex, k: int, peso_embed: float,
+                       peso_tfidf: float) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        Segunda etapa de un bloque de consultas con un único producto de matrices: los vectores
+        unitarios `Q_unit` (m, dim) contra la unión de sus candidatos, y cada consulta se queda
+        con las columnas de los suyos. Mismo ranking que `rerankear` consulta por consulta
+        (solo con embeddings sin cuantizar).
+        """
+        union = np.unique(np.concatenate(candidatos))
+        normalizadas = indice_embeddings.normalizadas
+        sims = Q_unit @ (normalizadas if len(union) == indice_embeddings.n_docs else normalizadas[union]).T
+        resultados = []
+        for fila, (cands, tfidf_cands) in enumerate(zip(candidatos, tfidf)):
+            similitud_final = peso_embed * sims[fila, np.searchsorted(union, cands)] + peso_tfidf * tfidf_cands
+            top = top_k_indices(similitud_final, k)
+            resultados.append((cands[top], similitud_final[top]))
+        return resultados
+
+    @staticmethod
+    def rankear(texto: str, indice_tfidf: CourseTextIndex, indice_embeddings: CourseEmbeddingIndex, k: int,
+                peso_embed: float, peso_tfidf: float, filas: np.ndarray | None = None,
+                q_vec_embed: np.ndarray | None = None,
+                presupuesto: int | None = None) -> tuple[np.ndarray, np.ndarray, dict]:
+        """
+        Las k mejores filas para el texto (ya normalizado), sus puntajes y los tiempos de cada etapa.
+        `q_vec_embed` es el vector de la consulta (p. ej. del autoencoder); si es None se usa el
+        promedio de los embeddings de los 10 cursos más afines por TF-IDF (sin términos del
+        vocabulario, ninguna fila). `presupuesto`: candidatos por fuente de la primera etapa
+        (por defecto RECOMMENDATION_CANDIDATES).
+        """
+        tiempos = {}
+        inicio = time.perf_counter()
+        filas_lexicas, scores_lexicos = indice_tfidf.candidatos(texto)
+        lexico = time.perf_counter()
+        if q_vec_embed is None:
+            q_vec_embed = RecommendationPipeline.vector_consulta(filas_lexicas, scores_lexicos, indice_embeddings)
+            tiempos["vector_consulta"] = (time.perf_counter() - lexico) * 1000
+            if q_vec_embed is None:
+                tiempos.update({"candidatos": (lexico - inicio) * 1000, "n_candidatos": 0, "exhaustivo": False})
+                return np.empty(0, dtype=np.int64), np.empty(0), tiempos
+        q_unit = indice_embeddings.unitario(q_vec_embed)
+
+        medio = time.perf_counter()
+        candidatos, tfidf, exhaustivo = RecommendationPipeline.candidatos(
+            filas_lexicas, scores_lexicos, indice_embeddings, q_unit, k, filas,
+            RECOMMENDATION_CANDIDATES if presupuesto is None else presupuesto
+        )
+        rerank = time.perf_counter()
+        indices, scores = RecommendationPipeline.rerankear(candidatos, tfidf, q_unit, indice_embeddings, k,
+                                                           peso_embed, peso_tfidf)
+        fin = time.perf_counter()
+        tiempos.update({
+            "candidatos": (lexico - inicio + rerank - medio) * 1000,
+            "reranking": (fin - rerank) * 1000,
+            "n_candidatos": len(candidatos),
+            "exhaustivo": exhaustivo,
+        })
+        return indices, scores, tiempos
+
+
+# ============================================================
+# SINGLETON INSTANCE
+# ============================================================
+recommendation_stage_stats = RecommendationStageStats()
@@ -0,0 +1,298 @@
+import asyncio
+import copy
+import logging
+import multiprocessing
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from src.core.config import RECOMMENDATION_WORKERS, RECOMMENDATION_PROCESS_WORKERS
+from src.services.modelRegistryService import ModelSnapshot
+from src.services.recommendationPipelineService import recommendation_stage_stats
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# HILOS DEDICADOS — RecommendationExecutor
+# ============================================================
+class RecommendationExecutor:
+    """
+    Pool de hilos propio de la etapa de recomendación (paso 3 del diálogo).
+    Los turnos de los pasos 1 y 2 (solo estado y base de datos) usan el threadpool
+    por defecto de Starlette y nunca esperan detrás de un cálculo de recomendación.
+    También ejecuta los lotes del agrupador de recomendaciones (ver `submit`), así que
+    las tareas de este pool no deben esperar a ese agrupador: ocuparían los hilos que
+    calculan sus lotes.
+    """
+
+    def __init__(self, workers: int = RECOMMENDATION_WORKERS):
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="recommendation")
+        self._lock = threading.Lock()
+        self._metricas = {"enviadas": 0, "completadas": 0, "errores": 0, "tiempo_total_ms": 0.0}
+
+    def _medir(self, funcion, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self._metricas["errores"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._metricas["completadas"] += 1
+                self._metricas["tiempo_total_ms"] += (time.perf_counter() - inicio) * 1000
+
+    def submit(self, funcion, *args, **kwargs) -> Future:
+        """Encola `funcion` en el pool dedicado (interfaz de Executor, p. ej. para MicroBatcher)."""
+        with self._lock:
+            self._metricas["enviadas"] += 1
+        return self._pool.submit(self._medir, funcion, *args, **kwargs)
+
+    async def ejecutar(self, funcion, *args, **kwargs):
+        """Ejecuta `funcion` en el pool dedicado sin bloquear el event loop."""
+        return await asyncio.wrap_future(self.submit(funcion, *args, **kwargs))
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            metricas = dict(self._metricas)
+        return {
+            "workers": self.workers,
+            **metricas,
+            "en_curso_o_en_cola": metricas["enviadas"] - metricas["completadas"],
+        }
+
+    def detener(self):
+        self._pool.shutdown(wait=False)
+
+
+# ============================================================
+# CATÁLOGO EN MEMORIA COMPARTIDA — SharedCatalog
+# ============================================================
+class SharedCatalog:
+    """
+    Arreglos de los índices de un snapshot copiados una vez a segmentos de memoria
+    compartida. Los procesos del pool los mapean sin copiarlos ni deserializarlos;
+    a cada tarea solo viaja el `descriptor` (nombres, formas y dtypes).
+    Los objetos pequeños (vocabulario TF-IDF, categorías) se serializan una vez
+    en otro segmento. `en_uso` cuenta las tareas que lo están usando: uno retirado
+    del pool solo se libera cuando la última termina.
+    """
+
+    def __init__(self, token: int, snapshot: ModelSnapshot):
+        tfidf, embeddings, filtros = (snapshot.indexes[i] for i in ("tfidf", "embeddings", "filtros"))
+
+        # El vectorizador guarda todos los términos descartados en stop_words_: no hacen falta para transformar
+        vectorizer = copy.copy(tfidf.vectorizer)
+        vectorizer.stop_words_ = None
+
+        arreglos = {
+            "X_embeddings": embeddings.X_embeddings,
+            "normalizadas": embeddings.normalizadas,
+            "nombres": filtros.nombres,
+            "objetos": np.frombuffer(pickle.dumps({"vectorizer": vectorizer, "categorias": filtros.categorias}),
+                                     dtype=np.uint8),
+            **{f"codigos_{c}": filtros.codigos[c] for c in filtros.columnas},
+        }
+        for nombre, matriz in (("csr", tfidf.matrix), ("csc", tfidf._matrix_csc)):
+            arreglos[f"{nombre}_data"] = matriz.data
+            arreglos[f"{nombre}_indices"] = matriz.indices
+            arreglos[f"{nombre}_indptr"] = matriz.indptr
+
+        self.snapshot = snapshot
+        self.en_uso = 0
+        self.retirado = False
+        self.segmentos = []
+        self.descriptor = {"token": token, "forma_tfidf": tfidf.matrix.shape, "columnas": filtros.columnas, "arreglos": {}}
+        try:
+            for nombre, arreglo in arreglos.items():
+                arreglo = np.ascontiguousarray(arreglo)
+                shm = shared_memory.SharedMemory(create=True, size=max(1, arreglo.nbytes))
+                self.segmentos.append(shm)
+                np.ndarray(arreglo.shape, dtype=arreglo.dtype, buffer=shm.buf)[...] = arreglo
+                self.descriptor["arreglos"][nombre] = (shm.name, arreglo.shape, arreglo.dtype.str)
+        except BaseException:
+            self.liberar()
+            raise
+        self.nbytes = sum(shm.size for shm in self.segmentos)
+
+    def liberar(self):
+        for shm in self.segmentos:
+            shm.close()
+            shm.unlink()
+        self.segmentos = []
+
+
+# Estado de cada proceso del pool: el último catálogo adjuntado
+_catalogo_worker = {"token": None, "segmentos": [], "indices": None}
+
+
+def _adjuntar_catalogo(descriptor: dict) -> tuple:
+    """(tfidf, embeddings, filtros) reconstruidos sobre la memoria compartida del descriptor."""
+    from scipy.sparse import csc_matrix, csr_matrix
+    from src.services.indexService import CourseEmbeddingIndex, CourseFilterIndex, CourseTextIndex
+
+    if _catalogo_worker["token"] == descriptor["token"]:
+        return _catalogo_worker["indices"]
+
+    # Se sueltan las vistas del catálogo anterior antes de cerrar sus segmentos
+    anteriores = _catalogo_worker["segmentos"]
+    _catalogo_worker.update(token=None, segmentos=[], indices=None)
+    for shm in anteriores:
+        try:
+            shm.close()
+        except BufferError:
+            pass
+
+    segmentos, a = [], {}
+    for nombre, (shm_name, forma, dtype) in descriptor["arreglos"].items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        segmentos.append(shm)
+        a[nombre] = np.ndarray(forma, dtype=np.dtype(dtype), buffer=shm.buf)
+
+    objetos = pickle.loads(a.pop("objetos").tobytes())
+    forma = descriptor["forma_tfidf"]
+    indices = (
+        CourseTextIndex.desde_partes(
+            objetos["vectorizer"],
+            csr_matrix((a["csr_data"], a["csr_indices"], a["csr_indptr"]), shape=forma),
+            csc_matrix((a["csc_data"], a["csc_indices"], a["csc_indptr"]), shape=forma),
+        ),
+        CourseEmbeddingIndex.desde_normalizadas(a["X_embeddings"], a["normalizadas"]),
+        CourseFilterIndex.desde_codigos(
+            {c: a[f"codigos_{c}"] for c in descriptor["columnas"]}, objetos["categorias"], a["nombres"]
+        ),
+    )
+    _catalogo_worker.update(token=descriptor["token"], segmentos=segmentos, indices=indices)
+    return indices
+
+
+def _rankear_en_worker(descriptor: dict, textos: list[str], parametros: tuple, Q: np.ndarray | None):
+    """
+    Tarea de un proceso del pool: RecommenderService._rankear_lote sobre el catálogo compartido.
+    Retorna (ranking, tiempos por etapa de cada consulta) para registrarlos en el proceso de la API.
+    """
+    from src.services.recommenderService import RecommenderService
+
+    num_recomendaciones, peso_embed, peso_tfidf, modalidad, duracion, memoria_mb, pipeline = parametros
+    indice_tfidf, indice_embeddings, indice_filtros = _adjuntar_catalogo(descriptor)
+    tiempos = []
+    ranking = RecommenderService._rankear_lote(
+        textos, num_recomendaciones, peso_embed, peso_tfidf, indice_tfidf, indice_embeddings, indice_filtros,
+        modalidad=modalidad, duracion=duracion, Q=Q, memoria_mb=memoria_mb, pipeline=pipeline,
+        registrar=tiempos.append
+    )
+    return ranking, tiempos
+
+
+# ============================================================
+# PROCESOS DEDICADOS — RecommendationProcessPool
+# ============================================================
+class RecommendationProcessPool:
+    """
+    Pool de procesos para el cálculo numérico de las recomendaciones: escapa del GIL
+    de las partes de pandas / Python del proceso de la API.
+    - El catálogo se publica una vez en memoria compartida (SharedCatalog) por cada juego de
+      índices (tfidf, embeddings, filtros): un snapshot nuevo que los comparte (p. ej. al cargar
+      el autoencoder) reutiliza el publicado. Se conservan los `catalogos_retenidos` más
+      recientes; uno retirado se libera cuando terminan las tareas que lo usan.
+    - Los procesos se crean con "spawn" (el proceso de la API tiene hilos) y devuelven
+      solo índices y puntajes; la respuesta se arma en el proceso de la API.
+    """
+
+    def __init__(self, workers: int = RECOMMENDATION_PROCESS_WORKERS, catalogos_retenidos: int = 2):
+        self.workers = workers
+        self.habilitado = workers > 0
+        self.catalogos_retenidos = catalogos_retenidos
+        self._pool = None
+        self._lock = threading.Lock()
+        self._catalogos = OrderedDict()  # (tfidf, embeddings, filtros) -> SharedCatalog
+        self._tokens = 0
+
+    @staticmethod
+    def admite(snapshot: ModelSnapshot) -> bool:
+        """Los procesos comparten los embeddings normalizados en float32: con cuantización se rankea en el proceso."""
+        return (all(snapshot.indexes.get(i) is not None for i in ("tfidf", "embeddings", "filtros"))
+                and snapshot.indexes["embeddings"].normalizadas is not None)
+
+    @staticmethod
+    def _clave(snapshot: ModelSnapshot) -> tuple:
+        """
+        Los índices que se comparten con los procesos. Cada carga de cursos_info o embeddings
+        construye índices nuevos, así que identifican la versión del catálogo publicado
+        (el SharedCatalog los mantiene vivos mientras esté en el pool).
+        """
+        return tuple(snapshot.indexes[i] for i in ("tfidf", "embeddings", "filtros"))
+
+    def _adquirir(self, snapshot: ModelSnapshot) -> SharedCatalog:
+        """Catálogo compartido de los índices del snapshot (publicado si hace falta), marcado en uso."""
+        clave = self._clave(snapshot)
+        with self._lock:
+            catalogo = self._catalogos.get(clave)
+            if catalogo is None:
+                self._tokens += 1
+                catalogo = SharedCatalog(self._tokens, snapshot)
+                self._catalogos[clave] = catalogo
+                logger.info(f"Catálogo del snapshot v{snapshot.version} en memoria compartida ({catalogo.nbytes} bytes)")
+                while len(self._catalogos) > self.catalogos_retenidos:
+                    self._retirar(self._catalogos.popitem(last=False)[1])
+            else:
+                self._catalogos.move_to_end(clave)
+            catalogo.en_uso += 1
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return catalogo
+
+    def _soltar(self, catalogo: SharedCatalog):
+        with self._lock:
+            catalogo.en_uso -= 1
+            if catalogo.retirado and catalogo.en_uso == 0:
+                catalogo.liberar()
+
+    @staticmethod
+    def _retirar(catalogo: SharedCatalog):
+        """Saca el catálogo del pool; sus segmentos se liberan cuando ninguna tarea lo usa (con el lock tomado)."""
+        catalogo.retirado = True
+        if catalogo.en_uso == 0:
+            catalogo.liberar()
+
+    def rankear(self, snapshot: ModelSnapshot, textos: list[str], parametros: tuple,
+                Q: np.ndarray | None = None) -> list[tuple[np.ndarray, np.ndarray]]:
+        """Ranking de un lote de consultas en un proceso del pool (ver RecommenderService._rankear_lote)."""
+        catalogo = self._adquirir(snapshot)
+        try:
+            ranking, tiempos = self._pool.submit(_rankear_en_worker, catalogo.descriptor, textos, parametros, Q).result()
+        finally:
+            self._soltar(catalogo)
+        for tiempos_consulta in tiempos:
+            recommendation_stage_stats.registrar(tiempos_consulta)
+        return ranking
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "habilitado": self.habilitado,
+                "workers": self.workers,
+                "catalogos": len(self._catalogos),
+                "bytes_compartidos": sum(c.nbytes for c in self._catalogos.values()),
+            }
+
+    def detener(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+            while self._catalogos:
+                self._retirar(self._catalogos.popitem(last=False)[1])
+
+
+# ============================================================
+# SINGLETON INSTANCES
+# ============================================================
+recommendation_executor = RecommendationExecutor()
+recommendation_process_pool = RecommendationProcessPool()
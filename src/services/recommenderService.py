@@ -2,10 +2,21 @@ from fastapi import HTTPException
 import numpy as np
 import logging
 from src.services.modelService import ModelService
+from src.services.modelRegistryService import ModelSnapshot
+from src.services.catalogStoreService import CourseCatalog
+from src.services.indexService import CourseTextIndex, CourseEmbeddingIndex, CourseFilterIndex, top_k_indices, top_k_filas
+from src.services.recommendationCacheService import RecommendationCache, recommendation_cache
+from src.services.queryEncoderService import query_encoder_service
+from src.services.recommendationCoalescerService import RecommendationCoalescer
+from src.services.recommendationPoolService import recommendation_executor, recommendation_process_pool
+from src.services.recommendationPipelineService import RecommendationPipeline, recommendation_stage_stats
+from src.core.config import (
+    VECTOR_INDEX_CANDIDATOS, RECOMMENDATION_BATCH_MEMORY_MB, RECOMMENDATION_PESO_EMBED, RECOMMENDATION_PESO_TFIDF,
+    RECOMMENDATION_PIPELINE
+)
+import time
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from fastapi import HTTPException
 
 logger = logging.getLogger(__name__) 
@@ -21,36 +32,547 @@ class RecommenderService:
     - Información de cursos (estructura de X_final_cursos.npy y DataFrame descriptivo).
     """
 
+    @staticmethod
+    def _catalogo(df_cursos) -> CourseCatalog:
+        """
+        Catálogo columnar de los cursos. El del snapshot ya viene compilado (ver ModelService);
+        un DataFrame externo se compila al vuelo.
+        """
+        if isinstance(df_cursos, CourseCatalog):
+            return df_cursos
+        logger.warning("Catálogo compilado no disponible para este DataFrame. Compilando al vuelo...")
+        return CourseCatalog.desde_dataframe(df_cursos)
+
+    @staticmethod
+    def _indice_tfidf(df_cursos, snapshot: ModelSnapshot | None = None) -> CourseTextIndex:
+        """
+        Retorna el índice TF-IDF precalculado del catálogo cargado.
+        Si el DataFrame no es el del cache (p. ej. un CSV externo), se indexa al vuelo.
+        """
+        snapshot = snapshot or ModelService.snapshot()
+        indice = snapshot.indexes.get("tfidf")
+        if indice is None or indice.df_cursos is not df_cursos:
+            logger.warning("Índice TF-IDF no disponible para este catálogo. Construyendo al vuelo...")
+            indice = CourseTextIndex(df_cursos)
+        return indice
+
+    @staticmethod
+    def _indice_embeddings(X_embeddings, snapshot: ModelSnapshot | None = None) -> CourseEmbeddingIndex:
+        """
+        Retorna los embeddings prenormalizados del modelo cargado.
+        Si la matriz no es la del cache, se normaliza al vuelo.
+        """
+        snapshot = snapshot or ModelService.snapshot()
+        indice = snapshot.indexes.get("embeddings")
+        if indice is None or indice.X_embeddings is not X_embeddings:
+            logger.warning("Índice de embeddings no disponible para esta matriz. Normalizando al vuelo...")
+            indice = CourseEmbeddingIndex(X_embeddings)
+        return indice
+
+    @staticmethod
+    def _indice_filtros(df_cursos, snapshot: ModelSnapshot | None = None) -> CourseFilterIndex:
+        """
+        Retorna el índice de metadatos (modalidad / tipo de oferta) del catálogo cargado.
+        Si el DataFrame no es el del cache, se indexa al vuelo.
+        """
+        snapshot = snapshot or ModelService.snapshot()
+        indice = snapshot.indexes.get("filtros")
+        if indice is None or indice.df_cursos is not df_cursos:
+            logger.warning("Índice de filtros no disponible para este catálogo. Construyendo al vuelo...")
+            indice = CourseFilterIndex(df_cursos)
+        return indice
+
+    @staticmethod
+    def _ranking_hibrido(sims_tfidf, indice_embeddings: CourseEmbeddingIndex, k: int,
+                         peso_embed=RECOMMENDATION_PESO_EMBED, peso_tfidf=RECOMMENDATION_PESO_TFIDF,
+                         filas: np.ndarray | None = None, q_vec_embed: np.ndarray | None = None,
+                         con_scores: bool = False):
+        """
+        Ranking exhaustivo (RECOMMENDATION_PIPELINE="exhaustivo"): combina la similitud TF-IDF de
+        todo el catálogo con la de embeddings y retorna los k mejores índices.
+        El vector de consulta es `q_vec_embed` (el texto codificado por el autoencoder) o,
+        si no se indica, el promedio de los embeddings de los 10 cursos más afines por TF-IDF;
+        si la consulta no tiene términos del vocabulario no se recomienda ningún curso.
+
+        - `filas`: si se indica, solo se rankean esos cursos (pre-filtro de metadatos).
+        - Con un índice vectorial aproximado solo se puntúan los candidatos del índice
+          más los mejores por TF-IDF, en lugar de recorrer todo el catálogo.
+        - Con embeddings cuantizados, los mejores se vuelven a puntuar con los originales
+          (ver RecommendationPipeline.rerankear).
+        - `con_scores`: retorna (índices, puntajes) en lugar de solo los índices.
+        """
+        if q_vec_embed is None:
+            if not sims_tfidf.any():
+                vacio = np.empty(0, dtype=np.int64)
+                return (vacio, np.empty(0)) if con_scores else vacio
+            top_indices = top_k_indices(sims_tfidf, 10)
+            q_vec_embed = indice_embeddings.X_embeddings[top_indices].mean(axis=0)
+        q_unit = indice_embeddings.unitario(q_vec_embed)
+
+        def puntuar(indices):
+            resultado = RecommendationPipeline.rerankear(
+                indices, sims_tfidf if indices is None else sims_tfidf[indices], q_unit, indice_embeddings, k,
+                peso_embed, peso_tfidf
+            )
+            return resultado if con_scores else resultado[0]
+
+        vectorial = indice_embeddings.vectorial
+        if vectorial is not None and not vectorial.exacto:
+            n_candidatos = max(k, VECTOR_INDEX_CANDIDATOS)
+            vecinos, _ = vectorial.buscar(q_unit, n_candidatos)
+            candidatos = np.union1d(vecinos, top_k_indices(sims_tfidf, n_candidatos))
+            if filas is not None:
+                candidatos = np.intersect1d(candidatos, filas, assume_unique=True)
+            if len(candidatos) >= k:
+                return puntuar(candidatos)
+            # Pocos candidatos tras el filtro: búsqueda exacta sobre las filas filtradas
+
+        return puntuar(filas)
+
+    @staticmethod
+    def _rankear_consulta(texto: str, indice_tfidf: CourseTextIndex, indice_embeddings: CourseEmbeddingIndex, k: int,
+                          peso_embed: float, peso_tfidf: float, filas: np.ndarray | None = None,
+                          q_vec_embed: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray, dict]:
+        """
+        Los k mejores índices de una consulta con el ranking de RECOMMENDATION_PIPELINE: en dos etapas
+        (ver RecommendationPipeline) o exhaustivo (_ranking_hibrido). También retorna sus puntajes
+        y los tiempos por etapa.
+        """
+        if RECOMMENDATION_PIPELINE == "dos_etapas":
+            return RecommendationPipeline.rankear(
+                texto, indice_tfidf, indice_embeddings, k, peso_embed, peso_tfidf, filas=filas, q_vec_embed=q_vec_embed
+            )
+
+        inicio = time.perf_counter()
+        sims_tfidf = indice_tfidf.similitudes(texto)
+        indices, scores = RecommenderService._ranking_hibrido(
+            sims_tfidf, indice_embeddings, k, peso_embed=peso_embed, peso_tfidf=peso_tfidf,
+            filas=filas, q_vec_embed=q_vec_embed, con_scores=True
+        )
+        return indices, scores, {"reranking": (time.perf_counter() - inicio) * 1000}
+
     @staticmethod
     def obtener_recomendaciones_inteligentes(
         texto_usuario,
         df_final,
         X_embeddings,
         num_recomendaciones=5,
-        peso_embed=0.6,
-        peso_tfidf=0.4
-    ):
-        texto_usuario = texto_usuario.lower().strip()
+        peso_embed=RECOMMENDATION_PESO_EMBED,
+        peso_tfidf=RECOMMENDATION_PESO_TFIDF,
+        modalidad=None,
+        duracion=None,
+        snapshot: ModelSnapshot | None = None
+    ) -> pd.DataFrame:
+        """
+        Recomendaciones híbridas (TF-IDF + embeddings) para el texto del usuario, como
+        DataFrame con NOMBRE_OFERTA, MODALIDAD y TIPO_OFERTA indexado por fila del catálogo.
+        Ver recomendar_cursos, que retorna las mismas filas sin pasar por pandas.
+        """
+        recomendaciones = RecommenderService.recomendar_cursos(
+            texto_usuario, df_final, X_embeddings, num_recomendaciones, peso_embed, peso_tfidf,
+            modalidad=modalidad, duracion=duracion, snapshot=snapshot
+        )
+        return RecommenderService._a_dataframe(df_final, recomendaciones)
 
-        corpus = df_final['NOMBRE_OFERTA'].fillna('').astype(str).tolist()
+    @staticmethod
+    def recomendar_cursos(
+        texto_usuario,
+        df_final,
+        X_embeddings,
+        num_recomendaciones=5,
+        peso_embed=RECOMMENDATION_PESO_EMBED,
+        peso_tfidf=RECOMMENDATION_PESO_TFIDF,
+        modalidad=None,
+        duracion=None,
+        snapshot: ModelSnapshot | None = None
+    ) -> list[dict]:
+        """
+        Recomendaciones híbridas (TF-IDF + embeddings) para el texto del usuario: una fila
+        {"indice", "NOMBRE_OFERTA", "MODALIDAD", "TIPO_OFERTA", "score"} por curso, sin nombres
+        repetidos (la misma forma que obtener_recomendaciones_lote, por cualquier ruta de cálculo).
+        `df_final` es el catálogo (CourseCatalog del snapshot o un DataFrame externo).
+        `modalidad` y `duracion` filtran el catálogo antes de rankear, de modo que
+        el top-k se calcula solo sobre cursos que cumplen el filtro.
+        `snapshot` es el snapshot de modelos del que provienen df_final y X_embeddings.
 
-        vect = TfidfVectorizer(max_features=5000)
-        tfidf_matrix = vect.fit_transform(corpus)
-        q_vec_tfidf = vect.transform([texto_usuario])
-        sims_tfidf = cosine_similarity(q_vec_tfidf, tfidf_matrix)[0]
+        Si X_embeddings son los del snapshot y el codificador de consultas está listo, el
+        vector de la consulta lo produce el autoencoder (ver queryEncoderService).
+
+        Si df_final y X_embeddings son los del snapshot, el resultado se guarda en la
+        cache de recomendaciones (clave: consulta normalizada, filtros, k, pesos y versión)
+        y, con RECOMMENDATION_COALESCE, se calcula en lote junto con las consultas
+        concurrentes o, con RECOMMENDATION_PROCESS_WORKERS, en el pool de procesos
+        (mismo resultado; solo con el índice vectorial exacto).
+        """
+        texto_usuario = RecommendationCache.normalizar(texto_usuario)
 
-        top_indices = np.argsort(sims_tfidf)[::-1][:10]
-        q_vec_embed = X_embeddings[top_indices].mean(axis=0).reshape(1, -1)
-        sims_embed = cosine_similarity(q_vec_embed, X_embeddings)[0]
+        snapshot = snapshot or ModelService.snapshot()
+        encoder = query_encoder_service.obtener(snapshot) if X_embeddings is snapshot.models["embeddings"] else None
+        cacheable = df_final is snapshot.models["cursos_info"] and X_embeddings is snapshot.models["embeddings"]
+        clave = RecommenderService._clave_cache(texto_usuario, modalidad, duracion, num_recomendaciones,
+                                                peso_embed, peso_tfidf, encoder)
+        if cacheable:
+            resultados = recommendation_cache.obtener(snapshot.version, clave)
+            if resultados is not None:
+                return [dict(r) for r in resultados]
 
-        similitud_final = peso_embed * sims_embed + peso_tfidf * sims_tfidf
+        catalogo = RecommenderService._catalogo(df_final)
+        indice_embeddings = RecommenderService._indice_embeddings(X_embeddings, snapshot)
+        exacto = getattr(indice_embeddings.vectorial, "exacto", True)
+        if RecommenderService._agrupable(df_final, X_embeddings, snapshot):
+            resultados = recommendation_coalescer.recomendar(
+                texto_usuario, snapshot, num_recomendaciones, peso_embed, peso_tfidf, modalidad, duracion
+            )
+        elif cacheable and exacto and recommendation_process_pool.habilitado:
+            resultados = RecommenderService.obtener_recomendaciones_lote(
+                [texto_usuario], num_recomendaciones, peso_embed, peso_tfidf, modalidad, duracion, snapshot=snapshot
+            )[0]
+        else:
+            filas = RecommenderService._indice_filtros(df_final, snapshot).filas(modalidad, duracion)
+            inicio = time.perf_counter()
+            q_vec_embed = encoder.codificar(texto_usuario) if encoder is not None else None
+            vector_ms = (time.perf_counter() - inicio) * 1000
+            top_indices, top_scores, tiempos = RecommenderService._rankear_consulta(
+                texto_usuario,
+                RecommenderService._indice_tfidf(df_final, snapshot),
+                indice_embeddings,
+                num_recomendaciones * 3,
+                peso_embed,
+                peso_tfidf,
+                filas=filas,
+                q_vec_embed=q_vec_embed
+            )
+            if q_vec_embed is not None:
+                tiempos["vector_consulta"] = vector_ms
+            # Primera aparición de cada nombre con la clave precalculada del catálogo
+            primeros = catalogo.primeros_por_nombre(top_indices, num_recomendaciones)
 
-        top_indices = np.argsort(similitud_final)[::-1][:num_recomendaciones * 3]
-        resultados = df_final.iloc[top_indices][['NOMBRE_OFERTA', 'MODALIDAD', 'TIPO_OFERTA']]
-        resultados = resultados.drop_duplicates(subset='NOMBRE_OFERTA').head(num_recomendaciones)
+            inicio = time.perf_counter()
+            resultados = [
+                {**registro, "score": float(score)}
+                for registro, score in zip(catalogo.registros(top_indices[primeros]), top_scores[primeros])
+            ]
+            tiempos["materializacion"] = (time.perf_counter() - inicio) * 1000
+            recommendation_stage_stats.registrar(tiempos)
 
+        if cacheable:
+            recommendation_cache.guardar(snapshot.version, clave, tuple(resultados))
+            return [dict(r) for r in resultados]
         return resultados
 
+    @staticmethod
+    def _clave_cache(texto_usuario, modalidad, duracion, num_recomendaciones, peso_embed, peso_tfidf, encoder) -> tuple:
+        """Clave de la consulta en recommendation_cache (el texto ya normalizado)."""
+        return texto_usuario, modalidad, duracion, num_recomendaciones, peso_embed, peso_tfidf, encoder is not None
+
+    @staticmethod
+    def _agrupable(df_final, X_embeddings, snapshot: ModelSnapshot) -> bool:
+        """La consulta va al agrupador: catálogo y embeddings del snapshot, índice vectorial exacto."""
+        return (
+            recommendation_coalescer.habilitado
+            and df_final is snapshot.models["cursos_info"]
+            and X_embeddings is snapshot.models["embeddings"]
+            and getattr(RecommenderService._indice_embeddings(X_embeddings, snapshot).vectorial, "exacto", True)
+        )
+
+    @staticmethod
+    async def recomendar_cursos_async(
+        texto_usuario,
+        df_final,
+        X_embeddings,
+        num_recomendaciones=5,
+        peso_embed=RECOMMENDATION_PESO_EMBED,
+        peso_tfidf=RECOMMENDATION_PESO_TFIDF,
+        modalidad=None,
+        duracion=None,
+        snapshot: ModelSnapshot | None = None
+    ) -> list[dict]:
+        """
+        recomendar_cursos desde el event loop. Con RECOMMENDATION_COALESCE la consulta espera su
+        lote en el agrupador sin ocupar un hilo (solo el lote se calcula en recommendation_executor),
+        así que un lote junta todos los turnos concurrentes y no solo RECOMMENDATION_WORKERS.
+        Por las demás rutas el cálculo completo va a recommendation_executor.
+        """
+        snapshot = snapshot or ModelService.snapshot()
+        if not RecommenderService._agrupable(df_final, X_embeddings, snapshot):
+            return await recommendation_executor.ejecutar(
+                RecommenderService.recomendar_cursos, texto_usuario, df_final, X_embeddings, num_recomendaciones,
+                peso_embed, peso_tfidf, modalidad=modalidad, duracion=duracion, snapshot=snapshot
+            )
+
+        texto_usuario = RecommendationCache.normalizar(texto_usuario)
+        encoder = query_encoder_service.obtener(snapshot)
+        clave = RecommenderService._clave_cache(texto_usuario, modalidad, duracion, num_recomendaciones,
+                                                peso_embed, peso_tfidf, encoder)
+        resultados = recommendation_cache.obtener(snapshot.version, clave)
+        if resultados is None:
+            resultados = await recommendation_coalescer.recomendar_async(
+                texto_usuario, snapshot, num_recomendaciones, peso_embed, peso_tfidf, modalidad, duracion
+            )
+            recommendation_cache.guardar(snapshot.version, clave, tuple(resultados))
+        return [dict(r) for r in resultados]
+
+    @staticmethod
+    def _a_dataframe(df_cursos, recomendaciones: list[dict]) -> pd.DataFrame:
+        """Filas de recomendar_cursos / obtener_recomendaciones_lote como DataFrame (índice: el del catálogo)."""
+        columnas = ['NOMBRE_OFERTA', 'MODALIDAD', 'TIPO_OFERTA']
+        indices = [r["indice"] for r in recomendaciones]
+        return pd.DataFrame(
+            [[r[c] for c in columnas] for r in recomendaciones],
+            columns=columnas,
+            index=pd.Index(indices, dtype=np.int64) if isinstance(df_cursos, CourseCatalog) else df_cursos.index[indices]
+        )
+
+    @staticmethod
+    def _top_tfidf_lote(sims_tfidf, k: int) -> np.ndarray:
+        """
+        Los k cursos más afines por TF-IDF de cada fila de una matriz CSR de similitudes,
+        con el mismo conjunto que top_k_indices sobre la fila densa: si hay menos de k
+        coincidencias se completan con los cursos de similitud 0 de índice más alto.
+        """
+        n = sims_tfidf.shape[1]
+        top = np.empty((sims_tfidf.shape[0], k), dtype=np.int64)
+        for i in range(sims_tfidf.shape[0]):
+            inicio, fin = sims_tfidf.indptr[i], sims_tfidf.indptr[i + 1]
+            columnas = sims_tfidf.indices[inicio:fin]
+            if len(columnas) >= k:
+                top[i] = columnas[top_k_indices(sims_tfidf.data[inicio:fin], k)]
+            else:
+                ceros = np.setdiff1d(np.arange(n - 1, max(-1, n - 1 - k - len(columnas)), -1), columnas)
+                top[i] = np.concatenate([columnas, ceros[::-1][:k - len(columnas)]])
+        return top
+
+    @staticmethod
+    def obtener_recomendaciones_lote(
+        textos: list[str],
+        num_recomendaciones=5,
+        peso_embed=RECOMMENDATION_PESO_EMBED,
+        peso_tfidf=RECOMMENDATION_PESO_TFIDF,
+        modalidad=None,
+        duracion=None,
+        snapshot: ModelSnapshot | None = None,
+        df_final=None,
+        X_embeddings=None,
+        memoria_mb: int = RECOMMENDATION_BATCH_MEMORY_MB
+    ) -> list[list[dict]]:
+        """
+        Recomendaciones híbridas para muchas consultas a la vez (evaluación offline,
+        precalentar caches). Por cada bloque de consultas, con RECOMMENDATION_PIPELINE:
+        - "dos_etapas": candidatos de cada consulta y un producto denso consultas × unión
+          de sus candidatos.
+        - "exhaustivo": un producto disperso (TF-IDF) y uno denso (embeddings) consultas × catálogo.
+        El tamaño del bloque se ajusta para que sus matrices no pasen de `memoria_mb`.
+        Con el índice vectorial exacto, el resultado de cada consulta coincide con
+        obtener_recomendaciones_inteligentes (más la posición y el puntaje); con el
+        codificador de consultas listo, las consultas pasan por el encoder en una sola llamada.
+        Con RECOMMENDATION_PROCESS_WORKERS el ranking se calcula en el pool de procesos.
+        """
+        snapshot = snapshot or ModelService.snapshot()
+        df_final = snapshot.models["cursos_info"] if df_final is None else df_final
+        X_embeddings = snapshot.models["embeddings"] if X_embeddings is None else X_embeddings
+        if df_final is None or X_embeddings is None:
+            raise HTTPException(status_code=400, detail="❌ Modelos 'cursos_info' y 'embeddings' deben estar cargados.")
+
+        textos = [RecommendationCache.normalizar(t) for t in textos]
+        del_snapshot = df_final is snapshot.models["cursos_info"] and X_embeddings is snapshot.models["embeddings"]
+        encoder = query_encoder_service.obtener(snapshot) if X_embeddings is snapshot.models["embeddings"] else None
+        Q = encoder.codificar_lote(textos) if encoder is not None and textos else None
+
+        if del_snapshot and recommendation_process_pool.habilitado and recommendation_process_pool.admite(snapshot):
+            # El cálculo numérico va a un proceso del pool; aquí solo se arma la respuesta
+            ranking = recommendation_process_pool.rankear(
+                snapshot, textos,
+                (num_recomendaciones, peso_embed, peso_tfidf, modalidad, duracion, memoria_mb, RECOMMENDATION_PIPELINE), Q
+            )
+        else:
+            ranking = RecommenderService._rankear_lote(
+                textos,
+                num_recomendaciones,
+                peso_embed,
+                peso_tfidf,
+                RecommenderService._indice_tfidf(df_final, snapshot),
+                RecommenderService._indice_embeddings(X_embeddings, snapshot),
+                RecommenderService._indice_filtros(df_final, snapshot),
+                modalidad=modalidad,
+                duracion=duracion,
+                Q=Q,
+                memoria_mb=memoria_mb,
+                pipeline=RECOMMENDATION_PIPELINE
+            )
+
+        catalogo = RecommenderService._catalogo(df_final)
+        return [
+            [{"indice": int(i), **catalogo.fila(i), "score": float(score)} for i, score in zip(indices, scores)]
+            for indices, scores in ranking
+        ]
+
+    @staticmethod
+    def _rankear_lote(
+        textos: list[str],
+        num_recomendaciones: int,
+        peso_embed: float,
+        peso_tfidf: float,
+        indice_tfidf: CourseTextIndex,
+        indice_embeddings: CourseEmbeddingIndex,
+        indice_filtros: CourseFilterIndex,
+        modalidad=None,
+        duracion=None,
+        Q: np.ndarray | None = None,
+        memoria_mb: int = RECOMMENDATION_BATCH_MEMORY_MB,
+        pipeline: str = RECOMMENDATION_PIPELINE,
+        registrar=recommendation_stage_stats.registrar
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        Núcleo numérico de obtener_recomendaciones_lote: por cada consulta (ya normalizada),
+        los índices de sus recomendaciones (sin nombres repetidos) y sus puntajes.
+        `Q` son los vectores de consulta ya calculados (m, dim); si es None se usa el promedio
+        de los vecinos TF-IDF. Solo usa los índices, así que también corre en los procesos
+        del pool de recomendación. `registrar` recibe los tiempos por etapa de cada consulta
+        (los procesos del pool los juntan para devolverlos al proceso de la API).
+        Con `pipeline` "dos_etapas" cada consulta junta sus candidatos como en la ruta de una
+        consulta (RecommendationPipeline) y el reranking de cada bloque de consultas es un solo
+        producto contra la unión de sus candidatos; con "exhaustivo", por bloques de consultas
+        contra todo el catálogo filtrado. Con embeddings cuantizados, una a una.
+        """
+        filas = indice_filtros.filas(modalidad, duracion)
+        nombres = indice_filtros.nombres
+        k = num_recomendaciones * 3
+
+        def sin_repetidos(indices, scores):
+            # Primera aparición de cada nombre, como drop_duplicates(subset='NOMBRE_OFERTA'), con la clave del catálogo
+            _, primeros = np.unique(nombres[indices], return_index=True)
+            primeros = np.sort(primeros)[:num_recomendaciones]
+            return indices[primeros], scores[primeros]
+
+        if pipeline == "dos_etapas" and (len(textos) == 1 or indice_embeddings.normalizadas is None):
+            resultados = []
+            for i, texto in enumerate(textos):
+                indices, scores, tiempos = RecommendationPipeline.rankear(
+                    texto, indice_tfidf, indice_embeddings, k, peso_embed, peso_tfidf,
+                    filas=filas, q_vec_embed=Q[i] if Q is not None else None
+                )
+                registrar(tiempos)
+                resultados.append(sin_repetidos(indices, scores))
+            return resultados
+
+        if indice_embeddings.normalizadas is None:
+            return [
+                sin_repetidos(*RecommenderService._ranking_hibrido(
+                    indice_tfidf.similitudes(texto), indice_embeddings, k, peso_embed, peso_tfidf,
+                    filas=filas, q_vec_embed=Q[i] if Q is not None else None, con_scores=True
+                ))
+                for i, texto in enumerate(textos)
+            ]
+
+        normalizadas = indice_embeddings.normalizadas if filas is None else indice_embeddings.normalizadas[filas]
+
+        # Bytes por consulta: TF-IDF densa (float64) + embeddings (float32) + puntaje final (float64)
+        bloque = max(1, (memoria_mb * 1024 * 1024) // (20 * max(1, normalizadas.shape[0])))
+        resultados = []
+
+        if pipeline == "dos_etapas":
+            for inicio in range(0, len(textos), bloque):
+                ranking = RecommenderService._rankear_bloque_dos_etapas(
+                    textos[inicio:inicio + bloque], Q[inicio:inicio + bloque] if Q is not None else None,
+                    indice_tfidf, indice_embeddings, k, peso_embed, peso_tfidf, filas, registrar
+                )
+                resultados.extend(sin_repetidos(indices, scores) for indices, scores in ranking)
+            return resultados
+
+        for inicio in range(0, len(textos), bloque):
+            sims_tfidf = indice_tfidf.similitudes_lote(textos[inicio:inicio + bloque])
+
+            # Vector de consulta: el del autoencoder o el promedio de los embeddings de los 10 cursos más afines
+            # por TF-IDF; las consultas sin términos del vocabulario no tienen recomendaciones
+            sin_terminos = np.zeros(sims_tfidf.shape[0], dtype=bool)
+            if Q is not None:
+                Q_bloque = np.array(Q[inicio:inicio + bloque], dtype=np.float32)
+            else:
+                sin_terminos = np.diff(sims_tfidf.indptr) == 0
+                top_tfidf = RecommenderService._top_tfidf_lote(sims_tfidf, 10)
+                Q_bloque = indice_embeddings.X_embeddings[top_tfidf].mean(axis=1).astype(np.float32)
+            normas = np.linalg.norm(Q_bloque, axis=1, keepdims=True)
+            Q_bloque = np.divide(Q_bloque, normas, out=Q_bloque, where=normas > 0)
+
+            # peso_embed · embeddings (float32) + peso_tfidf · TF-IDF (float64), como en la ruta de una
+            # consulta; la parte TF-IDF solo se suma en las celdas no nulas de la matriz dispersa
+            sims_embed = Q_bloque @ normalizadas.T
+            sims_embed *= peso_embed
+            similitud_final = sims_embed.astype(np.float64)
+            if filas is not None:
+                sims_tfidf = sims_tfidf[:, filas].tocsr()
+            filas_nnz = np.repeat(np.arange(sims_tfidf.shape[0]), np.diff(sims_tfidf.indptr))
+            similitud_final[filas_nnz, sims_tfidf.indices] += peso_tfidf * sims_tfidf.data
+            top = top_k_filas(similitud_final, k)
+            top_scores = np.take_along_axis(similitud_final, top, axis=1)
+            if filas is not None:
+                top = filas[top]
+
+            resultados.extend(
+                sin_repetidos(indices[:0], scores[:0]) if vacia else sin_repetidos(indices, scores)
+                for indices, scores, vacia in zip(top, top_scores, sin_terminos)
+            )
+
+        return resultados
+
+    @staticmethod
+    def _rankear_bloque_dos_etapas(
+        textos: list[str],
+        Q: np.ndarray | None,
+        indice_tfidf: CourseTextIndex,
+        indice_embeddings: CourseEmbeddingIndex,
+        k: int,
+        peso_embed: float,
+        peso_tfidf: float,
+        filas: np.ndarray | None,
+        registrar=recommendation_stage_stats.registrar
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        Un bloque de _rankear_lote con el pipeline en dos etapas: candidatos por consulta
+        (índice invertido, como RecommendationPipeline.rankear) y un único reranking del bloque
+        (RecommendationPipeline.rerankear_lote). Pasa a `registrar` los tiempos de cada consulta.
+        """
+        candidatos, tfidf, tiempos = [], [], []
+        Q_unit = np.empty((len(textos), indice_embeddings.dim), dtype=np.float32)
+        for i, texto in enumerate(textos):
+            t0 = time.perf_counter()
+            filas_lexicas, scores_lexicos = indice_tfidf.candidatos(texto)
+            t1 = time.perf_counter()
+            tiempos_consulta = {}
+            if Q is None:
+                q_vec_embed = RecommendationPipeline.vector_consulta(filas_lexicas, scores_lexicos, indice_embeddings)
+                tiempos_consulta["vector_consulta"] = (time.perf_counter() - t1) * 1000
+            else:
+                q_vec_embed = Q[i]
+            if q_vec_embed is None:
+                # Sin términos del vocabulario: sin candidatos (ver RecommendationPipeline.rankear)
+                Q_unit[i] = 0
+                candidatos.append(np.empty(0, dtype=np.int64))
+                tfidf.append(np.empty(0))
+                tiempos.append({**tiempos_consulta, "candidatos": (t1 - t0) * 1000, "n_candidatos": 0,
+                                "exhaustivo": False})
+                continue
+            Q_unit[i] = indice_embeddings.unitario(q_vec_embed)
+
+            t2 = time.perf_counter()
+            cands, tfidf_cands, exhaustivo = RecommendationPipeline.candidatos(
+                filas_lexicas, scores_lexicos, indice_embeddings, Q_unit[i], k, filas
+            )
+            tiempos_consulta.update({"candidatos": (t1 - t0 + time.perf_counter() - t2) * 1000,
+                                     "n_candidatos": len(cands), "exhaustivo": exhaustivo})
+            candidatos.append(cands)
+            tfidf.append(tfidf_cands)
+            tiempos.append(tiempos_consulta)
+
+        rerank = time.perf_counter()
+        ranking = RecommendationPipeline.rerankear_lote(candidatos, tfidf, Q_unit, indice_embeddings, k,
+                                                        peso_embed, peso_tfidf)
+        # El reranking del bloque se reparte entre sus consultas
+        reranking_ms = (time.perf_counter() - rerank) * 1000 / len(textos)
+        for tiempos_consulta in tiempos:
+            registrar({**tiempos_consulta, "reranking": reranking_ms})
+        return ranking
+
     @staticmethod
     def obtener_recomendaciones(query: str, num_recomendaciones: int = 5):
         """
@@ -58,7 +580,8 @@ class RecommenderService:
         Combina similitud TF-IDF + similitud de embeddings.
         """
 
-        modelos = ModelService._models_cache
+        snapshot = ModelService.snapshot()
+        modelos = snapshot.models
 
         # --------------------------------------------------------
         # 1. Verificar que los modelos estén cargados
@@ -85,45 +608,60 @@ class RecommenderService:
                     status_code=500,
                     detail=f"❌ No se pudo cargar información descriptiva de cursos ({info_path}). Error: {e}"
                 )
-        elif isinstance(cursos_data, pd.DataFrame):
+        elif isinstance(cursos_data, (CourseCatalog, pd.DataFrame)):
             df_cursos = cursos_data
         else:
             raise HTTPException(
                 status_code=400,
-                detail="❌ El tipo de datos de 'cursos' no es válido (debe ser np.ndarray o DataFrame)."
+                detail="❌ El tipo de datos de 'cursos' no es válido (debe ser np.ndarray, CourseCatalog o DataFrame)."
             )
 
         # --------------------------------------------------------
-        # 3. Calcular similitud TF-IDF sobre nombres de cursos
+        # 3. Similitud TF-IDF sobre nombres de cursos,
+        # 4. similitud en espacio de embeddings,
+        # 5. combinar resultados (pesos de config) y
+        # 6. seleccionar top recomendaciones (ver _rankear_consulta)
         # --------------------------------------------------------
-        corpus = df_cursos['NOMBRE_OFERTA'].fillna('').astype(str).tolist()
-        vect = TfidfVectorizer(max_features=5000)
-        tfidf_matrix = vect.fit_transform(corpus)
-        query_vec = vect.transform([query])
-
-        sims_tfidf = cosine_similarity(query_vec, tfidf_matrix)[0]
+        encoder = query_encoder_service.obtener(snapshot)
+        top_indices, _, _ = RecommenderService._rankear_consulta(
+            query,
+            RecommenderService._indice_tfidf(df_cursos, snapshot),
+            RecommenderService._indice_embeddings(X_embeddings, snapshot),
+            num_recomendaciones,
+            RECOMMENDATION_PESO_EMBED,
+            RECOMMENDATION_PESO_TFIDF,
+            q_vec_embed=encoder.codificar(query) if encoder is not None else None
+        )
+        # Filas sin repetir (las tres columnas iguales), en orden de ranking
+        catalogo = RecommenderService._catalogo(df_cursos)
+        resultados = {}
+        for i in top_indices:
+            fila = catalogo.fila(i)
+            resultados.setdefault(tuple(fila.values()), fila)
 
-        # --------------------------------------------------------
-        # 4. Calcular similitud en espacio de embeddings
-        # --------------------------------------------------------
-        top_indices = np.argsort(sims_tfidf)[::-1][:10]
-        q_vec_embed = X_embeddings[top_indices].mean(axis=0).reshape(1, -1)
-        sims_embed = cosine_similarity(q_vec_embed, X_embeddings)[0]
-
-        # --------------------------------------------------------
-        # 5. Combinar resultados (ajustable)
-        # --------------------------------------------------------
-        similitud_final = 0.6 * sims_embed + 0.4 * sims_tfidf
+        return list(resultados.values())
+    
+    @staticmethod
+    def obtener_cursos_similares(indice_curso: int, num_recomendaciones: int = 5):
+        """
+        Retorna los cursos más parecidos a un curso del catálogo ("más como este"),
+        leyendo sus vecinos precalculados de la matriz de similitud en O(k).
+        """
+        snapshot = ModelService.snapshot()
+        vecinos = snapshot.models["matriz"]
+        df_cursos = snapshot.models["cursos_info"]
+        if vecinos is None or df_cursos is None:
+            raise HTTPException(status_code=400, detail="❌ Modelos 'matriz' y 'cursos_info' deben estar cargados.")
+        if not 0 <= indice_curso < vecinos.n_docs:
+            raise HTTPException(status_code=404, detail=f"❌ Curso {indice_curso} fuera del catálogo.")
 
-        # --------------------------------------------------------
-        # 6. Seleccionar top recomendaciones
-        # --------------------------------------------------------
-        top_indices = np.argsort(similitud_final)[::-1][:num_recomendaciones]
-        resultados = df_cursos.iloc[top_indices][['NOMBRE_OFERTA', 'MODALIDAD', 'TIPO_OFERTA']].drop_duplicates()
+        indices, scores = vecinos.vecinos(indice_curso, num_recomendaciones)
+        catalogo = RecommenderService._catalogo(df_cursos)
+        return [{"indice": int(i), **catalogo.fila(i), "SIMILITUD": float(score)} for i, score in zip(indices, scores)]
 
-        return resultados.to_dict(orient="records")
-    
 # ============================================================
 # SINGLETON INSTANCE
 # ============================================================
 recommender_service = RecommenderService()
+recommendation_coalescer = RecommendationCoalescer(RecommenderService.obtener_recomendaciones_lote,
+                                                   executor=recommendation_executor)
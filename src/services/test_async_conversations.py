@@ -0,0 +1,10 @@
+def test_rutas_asincronas(servicios_temporales, cliente_conversaciones):
+    service, _ = servicios_temporales
+    conv_id = service.iniciar_conversacion(["hola"])
+    service.registrar_turno(conv_id, [("user", "salud"), ("bot", "¿virtual o presencial?")])
+
+    client = cliente_conversaciones
+    assert [c["id_conversation"] for c in client.get("/api/conversations?limit=5").json()] == [conv_id]
+    assert [m["sender"] for m in client.get(f"/api/conversations/{conv_id}").json()] == ["bot", "user", "bot"]
+    assert client.delete(f"/api/conversations/{conv_id}").status_code == 200
+    assert client.get(f"/api/conversations/{conv_id}").json() == []
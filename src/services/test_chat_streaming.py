@@ -0,0 +1,74 @@
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.api import chatbotRouter
+from src.services.chatbotLogicService import CIERRE_RECOMENDACION, ENCABEZADO_RECOMENDACION, ChatbotLogicService
+from src.services.conversationService import ConversationService
+from src.services.conversationStateService import MemoryStateStore
+
+
+@pytest.fixture
+def bot(snapshot_sintetico, session_factory) -> ChatbotLogicService:
+    snapshot = snapshot_sintetico
+    bot = ChatbotLogicService(df_final=snapshot.models["cursos_info"], X_embeddings=snapshot.models["embeddings"],
+                              state_store=MemoryStateStore())
+    bot.conversation_service = ConversationService(session_factory=session_factory)
+    return bot
+
+
+def app_chatbot() -> FastAPI:
+    app = FastAPI()
+    app.include_router(chatbotRouter.router, prefix="/api/chatbot")
+    return app
+
+
+def eventos_sse(texto: str) -> list[dict]:
+    return [json.loads(linea[6:]) for linea in texto.splitlines() if linea.startswith("data: ")]
+
+
+@pytest.mark.parametrize("snapshot_sintetico", [{"n_cursos": 300}], indirect=True)
+def test_websocket_y_sse_entregan_la_recomendacion_por_partes(monkeypatch, bot):
+    monkeypatch.setattr(chatbotRouter, "chatbot_service", bot)
+
+    with TestClient(app_chatbot()) as client:
+        with client.websocket_connect("/api/chatbot/ws") as ws:
+            ws.send_json({"message": ""})
+            eventos = [ws.receive_json() for _ in range(3)]
+            conv_id = eventos[0]["id_conversation"]
+            assert [e["evento"] for e in eventos] == ["inicio", "texto", "fin"]
+
+            for mensaje in ["salud", "virtual"]:
+                ws.send_json({"message": mensaje, "id_conversation": str(conv_id)})
+                assert [ws.receive_json()["evento"] for _ in range(3)] == ["inicio", "texto", "fin"]
+
+            ws.send_json({"message": "algo corto", "id_conversation": str(conv_id)})
+            eventos = []
+            while not eventos or eventos[-1]["evento"] != "fin":
+                eventos.append(ws.receive_json())
+
+            # Mensaje inválido: error sin cerrar el canal
+            ws.send_json({"sin_mensaje": True})
+            assert ws.receive_json()["evento"] == "error"
+
+        # El acuse sale primero, luego una línea por curso y el cierre; "fin" trae la respuesta completa
+        textos = [e["texto"] for e in eventos if e["evento"] == "texto"]
+        assert textos[0] == ENCABEZADO_RECOMENDACION and textos[-1] == CIERRE_RECOMENDACION
+        assert len(textos) > 3 and all(t.startswith(f"{i}. ") for i, t in enumerate(textos[1:-1], 1))
+        assert eventos[-1]["reply"] == "".join(textos)
+
+        # El mismo diálogo por SSE; el turno del paso 3 se persiste en segundo plano
+        respuesta = client.post("/api/chatbot/message/stream", json={"message": ""})
+        assert respuesta.headers["content-type"].startswith("text/event-stream")
+        conv_sse = eventos_sse(respuesta.text)[0]["id_conversation"]
+        for mensaje in ["salud", "virtual", "algo corto"]:
+            sse = eventos_sse(client.post("/api/chatbot/message/stream",
+                                          json={"message": mensaje, "id_conversation": str(conv_sse)}).text)
+        assert sse[-1]["evento"] == "fin" and sse[-1]["reply"] == "".join(e["texto"] for e in sse if e["evento"] == "texto")
+
+        client.portal.call(bot.esperar_guardados)
+
+    for conv, reply in [(conv_id, eventos[-1]["reply"]), (conv_sse, sse[-1]["reply"])]:
+        mensajes = bot.conversation_service.get_messages(conv)
+        assert [m["text"] for m in mensajes[-2:]] == ["algo corto", reply]
+        assert bot.state_store.obtener(conv) is None
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, insert, inspect, text
+from src.core.database import Base
+from src.core.migrations import crear_indices_faltantes
+from src.models.conversationModel import Conversation, Message
+
+
+def poblar(service, conversaciones: int, mensajes: int) -> int:
+    """Inserta conversaciones con fechas repetidas (para probar desempates) y una conversación larga."""
+    inicio = datetime(2025, 1, 1)
+    with service.session_factory() as db:
+        db.execute(insert(Conversation), [
+            {"id_conversation": i, "start_time": inicio + timedelta(minutes=i // 3)} for i in range(1, conversaciones + 1)
+        ])
+        db.execute(insert(Message), [
+            {"id_conversation": 1, "sender": "user" if i % 2 else "bot", "content": f"mensaje {i}",
+             "created_at": inicio + timedelta(seconds=i // 2)}
+            for i in range(mensajes)
+        ])
+        db.commit()
+    return 1
+
+
+def recorrer(client, url: str, limit: int) -> tuple[list, int]:
+    """Sigue X-Next-Cursor hasta el final. Retorna (elementos, páginas)."""
+    elementos, paginas, cursor = [], 0, None
+    while True:
+        params = {"limit": limit} | ({"cursor": cursor} if cursor else {})
+        r = client.get(url, params=params)
+        assert r.status_code == 200
+        elementos += r.json()
+        paginas += 1
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            return elementos, paginas
+
+
+def test_paginacion_por_cursor(servicios_temporales, cliente_conversaciones):
+    service, _ = servicios_temporales
+    conv_id = poblar(service, conversaciones=95, mensajes=230)
+
+    client = cliente_conversaciones
+    conversaciones, paginas = recorrer(client, "/api/conversations", limit=10)
+    assert paginas == 10
+    assert [c["id_conversation"] for c in conversaciones] == list(range(95, 0, -1))
+
+    mensajes, paginas = recorrer(client, f"/api/conversations/{conv_id}", limit=50)
+    assert paginas == 5
+    assert [m["content"] for m in mensajes] == [f"mensaje {i}" for i in range(230)]
+
+    assert client.get("/api/conversations", params={"cursor": "no-es-un-cursor"}).status_code == 400
+
+
+def test_migracion_crea_indices_y_las_consultas_los_usan(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'vieja.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # Base creada antes de declarar los índices compuestos
+        conn.execute(text("DROP INDEX ix_conversations_start_time_id"))
+        conn.execute(text("DROP INDEX ix_messages_conversation_created_id"))
+
+    assert set(crear_indices_faltantes(engine)) == {"ix_conversations_start_time_id", "ix_messages_conversation_created_id"}
+    assert crear_indices_faltantes(engine) == []
+    assert "ix_messages_conversation_created_id" in {i["name"] for i in inspect(engine).get_indexes("messages")}
+
+    with engine.connect() as conn:
+        plan = " ".join(str(fila) for fila in conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM messages WHERE id_conversation = 1 "
+            "AND (created_at, id_message) > ('2025-01-01', 10) ORDER BY created_at, id_message LIMIT 51"
+        )))
+        assert "ix_messages_conversation_created_id" in plan and "TEMP B-TREE" not in plan
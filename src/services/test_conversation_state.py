@@ -0,0 +1,97 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.services.chatbotLogicService import ChatbotLogicService
+from src.services.conversationService import ConversationService
+from src.services.conversationStateService import DatabaseStateStore, MemoryStateStore, RedisStateStore
+
+
+class FakeRedis:
+    """Cliente compatible con el subconjunto de Redis que usa RedisStateStore (get/set con ex/delete)."""
+
+    def __init__(self):
+        self.datos = {}
+
+    def get(self, clave):
+        valor, expira = self.datos.get(clave, (None, None))
+        if expira is not None and expira < time.monotonic():
+            self.datos.pop(clave, None)
+            return None
+        return valor
+
+    def set(self, clave, valor, ex=None):
+        self.datos[clave] = (valor.encode() if isinstance(valor, str) else valor,
+                             time.monotonic() + ex if ex is not None else None)
+
+    def delete(self, clave):
+        self.datos.pop(clave, None)
+
+
+def crear_store(backend: str, session_factory, ttl_s: float = 60):
+    if backend == "memory":
+        return MemoryStateStore(ttl_s=ttl_s)
+    if backend == "database":
+        return DatabaseStateStore(session_factory, ttl_s=ttl_s)
+    return RedisStateStore(client=FakeRedis(), ttl_s=ttl_s)
+
+
+@pytest.mark.parametrize("backend", ["memory", "database", "redis"])
+def test_contrato_del_backend(backend, session_factory):
+    store = crear_store(backend, session_factory)
+    assert store.obtener(1) is None
+
+    store.guardar(1, {"step": 2, "tema": "salud", "modalidad": None, "duracion": None})
+    assert store.obtener(1) == {"step": 2, "tema": "salud", "modalidad": None, "duracion": None}
+
+    store.guardar(1, {"step": 3, "tema": "salud", "modalidad": "Virtual", "duracion": None})
+    assert store.obtener(1)["step"] == 3
+
+    store.eliminar(1)
+    assert store.obtener(1) is None
+
+    # Expiración de conversaciones abandonadas
+    expira = crear_store(backend, session_factory, ttl_s=0.05)
+    expira.guardar(2, {"step": 2})
+    time.sleep(0.1)
+    assert expira.obtener(2) is None
+
+
+def test_lru_acotado():
+    store = MemoryStateStore(max_entries=3)
+    for i in range(5):
+        store.guardar(i, {"step": 2})
+    store.obtener(2)
+    store.guardar(5, {"step": 2})
+    assert len(store) == 3
+    assert [i for i in range(6) if store.obtener(i)] == [2, 4, 5]
+
+
+def test_escrituras_concurrentes_purgan_a_intervalos(session_factory, monkeypatch):
+    store = DatabaseStateStore(session_factory, purga_cada=10)
+    purgas = []
+    monkeypatch.setattr(store, "purgar", lambda: purgas.append(1))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: store.guardar(i, {"step": 2}), range(200)))
+    assert store._escrituras == 200 and len(purgas) == 20
+
+
+@pytest.mark.parametrize("catalogo_sintetico", [{"n_cursos": 300}], indirect=True)
+def test_dialogo_entre_workers(catalogo_sintetico, session_factory):
+    """Cada turno lo atiende un worker distinto; el estado compartido mantiene el diálogo."""
+    df, X_embeddings = catalogo_sintetico
+    store = DatabaseStateStore(session_factory)
+    conversaciones = ConversationService(session_factory=session_factory)
+
+    workers = []
+    for _ in range(2):
+        worker = ChatbotLogicService(df_final=df, X_embeddings=X_embeddings, state_store=store)
+        worker.conversation_service = conversaciones
+        workers.append(worker)
+
+    conv_id = workers[0].procesar_mensaje("")["id_conversation"]
+    conv_id = str(conv_id)
+    assert "virtuales o presenciales" in workers[1].procesar_mensaje("salud", conv_id)["reply"]
+    assert "programa/diplomado" in workers[0].procesar_mensaje("virtual", conv_id)["reply"]
+    assert "podrían interesarte" in workers[1].procesar_mensaje("corto", conv_id)["reply"]
+    assert store.obtener(int(conv_id)) is None
@@ -0,0 +1,21 @@
+from src.models.conversationModel import Conversation, Message
+
+
+def test_un_commit_por_turno(servicio_temporal):
+    service, commits = servicio_temporal
+
+    conv_id = service.iniciar_conversacion(["hola", "¿en qué tema estás interesado?"])
+    assert len(commits) == 1
+
+    service.registrar_turno(conv_id, [("user", "salud"), ("bot", "¿virtual o presencial?")])
+    assert len(commits) == 2
+
+    # Conversación inexistente: se crea con ese id dentro del mismo commit
+    service.registrar_turno(999, [("user", "hola"), ("bot", "hola")])
+    assert len(commits) == 3
+
+    with service.session_factory() as db:
+        assert [m.sender for m in db.query(Message).filter_by(id_conversation=conv_id).order_by(Message.id_message)] == \
+            ["bot", "bot", "user", "bot"]
+        assert db.get(Conversation, conv_id).end_time is not None
+        assert db.get(Conversation, 999).end_time is not None
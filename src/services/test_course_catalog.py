@@ -0,0 +1,64 @@
+import io
+import numpy as np
+import pandas as pd
+import pytest
+from src.services.catalogStoreService import CourseCatalog
+from src.services.modelService import ModelService
+from src.services.recommendationCacheService import recommendation_cache
+from src.services.recommenderService import RecommenderService
+
+COLUMNAS = ["NOMBRE_OFERTA", "MODALIDAD", "TIPO_OFERTA"]
+
+
+def test_catalogo_compilado_equivale_al_dataframe(tmp_path):
+    df = pd.DataFrame({
+        "NOMBRE_OFERTA": ["Gestión en salud", None, "Programación", "Gestión en salud", "Ñandú 🐦"],
+        "MODALIDAD": ["Virtual", "Presencial", None, "Virtual", "Virtual"],
+        "TIPO_OFERTA": ["Curso corto", "Programa", "Diplomado", "Curso corto", "Programa"],
+        "OTRA": [1, 2, 3, 4, 5],
+    })
+    CourseCatalog.desde_dataframe(df).guardar(tmp_path / "cursos.catalog")
+
+    for mmap in [True, False]:
+        catalogo = CourseCatalog.cargar(tmp_path / "cursos.catalog", mmap=mmap)
+        assert len(catalogo) == 5 and catalogo.mapeado == mmap
+        assert [catalogo.fila(i) for i in range(5)] == [
+            {c: (None if pd.isna(v) else v) for c, v in fila.items()} for fila in df[COLUMNAS].to_dict("records")
+        ]
+
+        # Misma deduplicación que drop_duplicates(subset='NOMBRE_OFERTA')
+        indices = np.array([3, 0, 1, 4, 2, 1])
+        esperado = df.iloc[indices].drop_duplicates(subset="NOMBRE_OFERTA").index
+        assert list(indices[catalogo.primeros_por_nombre(indices)]) == list(esperado)
+        assert list(indices[catalogo.primeros_por_nombre(indices, 2)]) == list(esperado[:2])
+
+
+@pytest.mark.parametrize("catalogo_sintetico", [{"n_cursos": 500}], indirect=True)
+def test_subida_compila_el_catalogo_y_la_carga_no_lee_el_csv(tmp_path, monkeypatch, cliente, catalogo_sintetico):
+    client = cliente
+    monkeypatch.setattr(ModelService, "_snapshot", ModelService._snapshot.derivar({}, {}, {}))
+    monkeypatch.setattr(recommendation_cache, "max_entries", 0)
+
+    df, X_embeddings = catalogo_sintetico
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False)
+    r = client.post("/api/models/", data={"tipo": "cursos_info"}, files={"file": ("c.csv", buffer.getvalue().encode())})
+    assert r.status_code == 200
+    assert (tmp_path / "cursos_info.catalog").exists()
+
+    def sin_csv(*args, **kwargs):
+        raise AssertionError("la carga no debería parsear el CSV")
+    monkeypatch.setattr(pd, "read_csv", sin_csv)
+    ModelService.load("cursos_info")
+    catalogo = ModelService.snapshot().models["cursos_info"]
+    assert isinstance(catalogo, CourseCatalog) and catalogo.mapeado
+    assert ModelService.memory_report()["cursos_info"]["bytes_mapeados"] == catalogo.nbytes
+
+    # Recomendaciones sobre el catálogo = recomendaciones sobre el DataFrame original
+    snapshot = ModelService.snapshot()
+    for consulta, filtros in [("salud", {}), ("programacion liderazgo", {"modalidad": "Virtual", "duracion": "Programa"})]:
+        obtenido = RecommenderService.obtener_recomendaciones_inteligentes(
+            consulta, catalogo, X_embeddings, 6, snapshot=snapshot, **filtros)
+        esperado = RecommenderService.obtener_recomendaciones_inteligentes(
+            consulta, df, X_embeddings, 6, snapshot=snapshot, **filtros)
+        assert obtenido.equals(esperado)
@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+from src.services.catalogStoreService import CourseCatalog
+from src.services.chatbotLogicService import ChatbotLogicService
+from src.services.conversationService import ConversationService
+from src.services.conversationStateService import MemoryStateStore
+from src.services.indexService import CourseFilterIndex
+from src.services.recommenderService import RecommenderService
+
+
+def test_filtro_por_palabras_de_categorias():
+    df = pd.DataFrame({
+        "NOMBRE_OFERTA": [f"curso {i}" for i in range(7)],
+        "MODALIDAD": ["Virtual", "Semivirtual", " virtual", "Presencial", None, "Semipresencial", "Virtual"],
+        "TIPO_OFERTA": ["Curso corto", "Programa", "Curso corto", "Programa de extensión", "Curso corto", "Programa", None],
+    })
+    for indice in [CourseFilterIndex(df), CourseFilterIndex(CourseCatalog.desde_dataframe(df))]:
+        assert indice.filas() is None
+        assert list(indice.filas("Virtual")) == list(indice.filas("VIRTUAL ")) == [0, 2, 6]
+        assert list(indice.filas("presencial")) == [3]
+        assert list(indice.filas(duracion="Programa")) == [1, 3, 5]
+        assert list(indice.filas(duracion="programa de extension")) == [3]
+        assert list(indice.filas("Virtual", "Curso corto")) == list(indice.filas("virt", "corto")) == [0, 2]
+        assert list(indice.filas(duracion="corto")) == [0, 2, 4]
+        # Palabras completas o su comienzo: "tual" no es una palabra de "Virtual"
+        assert len(indice.filas("tual")) == 0 and len(indice.filas(duracion="corto extension")) == 0
+        assert len(indice.filas(" ")) == 0
+
+
+@pytest.mark.parametrize("catalogo_sintetico", [{"n_cursos": 3000}], indirect=True)
+def test_recomendaciones_prefiltradas(catalogo_sintetico):
+    df, X_embeddings = catalogo_sintetico
+    df.loc[::3, "MODALIDAD"] = "Semivirtual"
+
+    recomendaciones = RecommenderService.recomendar_cursos("salud", df, X_embeddings, 6, modalidad="Virtual",
+                                                           duracion="Curso corto")
+    assert len(recomendaciones) == 6
+    assert all((r["MODALIDAD"], r["TIPO_OFERTA"]) == ("Virtual", "Curso corto") for r in recomendaciones)
+    assert RecommenderService.recomendar_cursos("salud", df, X_embeddings, 6, modalidad="Híbrida") == []
+
+
+@pytest.mark.parametrize("catalogo_sintetico", [{"n_cursos": 600}], indirect=True)
+def test_chat_filtra_y_sin_coincidencias_recomienda_sin_filtrar(catalogo_sintetico, session_factory):
+    df, X_embeddings = catalogo_sintetico
+    # Ningún curso presencial es corto
+    df.loc[df["MODALIDAD"] == "Presencial", "TIPO_OFERTA"] = "Programa"
+    bot = ChatbotLogicService(df_final=df, X_embeddings=X_embeddings, state_store=MemoryStateStore())
+    bot.conversation_service = ConversationService(session_factory=session_factory)
+
+    def recomendar(modalidad: str, duracion: str) -> list[str]:
+        conv_id = str(bot.procesar_mensaje("")["id_conversation"])
+        for mensaje in ["salud", modalidad, duracion]:
+            reply = bot.procesar_mensaje(mensaje, conv_id)["reply"]
+        return [linea for linea in reply.splitlines() if linea[:1].isdigit()]
+
+    lineas = recomendar("virtual", "algo corto")
+    assert len(lineas) == 6 and all(linea.endswith("(Virtual, Curso corto)") for linea in lineas)
+
+    conv_id = str(bot.procesar_mensaje("")["id_conversation"])
+    for mensaje in ["xyzzy", "virtual", "algo corto"]:
+        reply = bot.procesar_mensaje(mensaje, conv_id)["reply"]
+    assert "No encontré cursos sobre ese tema" in reply
+
+    lineas = recomendar("presencial", "algo corto")
+    assert len(lineas) == 6
+    esperado = RecommenderService.recomendar_cursos("salud", df, X_embeddings, 6)
+    assert [linea.split(". ", 1)[1] for linea in lineas] == \
+        [f"{r['NOMBRE_OFERTA']} ({r['MODALIDAD']}, {r['TIPO_OFERTA']})" for r in esperado]
+
+
+@pytest.mark.parametrize("catalogo_sintetico", [{"n_cursos": 600}], indirect=True)
+def test_chat_filtra_catalogo_con_otras_etiquetas(catalogo_sintetico, session_factory):
+    df, X_embeddings = catalogo_sintetico
+    df["MODALIDAD"] = df["MODALIDAD"].map({"Virtual": "VIRTUAL 100%", "Presencial": "Presencial"})
+    df["TIPO_OFERTA"] = df["TIPO_OFERTA"].map({"Curso corto": "Cursos Cortos", "Programa": "Programa de formación",
+                                               "Diplomado": "Diplomado"})
+    indice = CourseFilterIndex(df)
+    assert len(indice.filas("Virtual", "Corto")) == ((df["MODALIDAD"] == "VIRTUAL 100%")
+                                                     & (df["TIPO_OFERTA"] == "Cursos Cortos")).sum() > 0
+    bot = ChatbotLogicService(df_final=df, X_embeddings=X_embeddings, state_store=MemoryStateStore())
+    bot.conversation_service = ConversationService(session_factory=session_factory)
+
+    for duracion, etiqueta in [("algo corto", "Cursos Cortos"), ("un programa", "Programa de formación")]:
+        conv_id = str(bot.procesar_mensaje("")["id_conversation"])
+        for mensaje in ["salud", "virtual", duracion]:
+            reply = bot.procesar_mensaje(mensaje, conv_id)["reply"]
+        lineas = [linea for linea in reply.splitlines() if linea[:1].isdigit()]
+        assert len(lineas) == 6 and all(linea.endswith(f"(VIRTUAL 100%, {etiqueta})") for linea in lineas)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.api.recommendationsRouter import router
+from src.services.indexService import CourseNeighbors
+from src.services.modelRegistryService import ModelSnapshot
+from src.services.modelService import ModelService
+
+
+def test_vecinos_coinciden_con_argsort():
+    rng = np.random.default_rng(0)
+    # Valores con un decimal: muchos empates, también en el límite del top-k
+    matriz = np.round(rng.uniform(0, 1, size=(300, 300)), 1).astype(np.float32)
+    np.fill_diagonal(matriz, 1.0)
+
+    for k in [1, 7, 40, 299, 500]:
+        vecinos = CourseNeighbors.desde_densa(matriz, k, bloque=64)
+        assert vecinos.k == min(k, 299)
+        for i in range(len(matriz)):
+            fila = matriz[i].copy()
+            fila[i] = -np.inf
+            esperado = np.argsort(-fila, kind="stable")[:vecinos.k]
+            indices, scores = vecinos.vecinos(i)
+            assert i not in indices
+            np.testing.assert_array_equal(indices, esperado)
+            np.testing.assert_array_equal(scores, fila[esperado])
+
+
+def test_vecinos_se_guardan_y_cargan(tmp_path):
+    vecinos = CourseNeighbors.desde_densa(np.random.default_rng(1).normal(size=(50, 50)), 5)
+    vecinos.guardar(tmp_path / "matriz_topk.npz")
+    cargados = CourseNeighbors.cargar(tmp_path / "matriz_topk.npz")
+
+    assert (cargados.n_docs, cargados.k) == (50, 5)
+    assert cargados.indices.dtype == np.int32 and cargados.scores.dtype == np.float32
+    np.testing.assert_array_equal(cargados.indices, vecinos.indices)
+    np.testing.assert_array_equal(cargados.scores, vecinos.scores)
+
+
+@pytest.mark.parametrize("snapshot_sintetico", [{"n_cursos": 200}], indirect=True)
+def test_endpoint_cursos_similares(monkeypatch, snapshot_sintetico):
+    base = snapshot_sintetico
+    vecinos = CourseNeighbors.desde_densa(np.random.default_rng(2).uniform(size=(200, 200)), 10)
+    monkeypatch.setattr(ModelService, "_snapshot", ModelSnapshot(
+        version=base.version + 1, models={**base.models, "matriz": vecinos}, indexes=base.indexes
+    ))
+    app = FastAPI()
+    app.include_router(router, prefix="/api/recommendations")
+    client = TestClient(app)
+
+    r = client.get("/api/recommendations/similares/3", params={"k": 4})
+    assert r.status_code == 200
+    similares = r.json()["similares"]
+    indices, scores = vecinos.vecinos(3, 4)
+    assert [s["indice"] for s in similares] == list(indices)
+    np.testing.assert_allclose([s["SIMILITUD"] for s in similares], scores)
+    assert similares[0]["NOMBRE_OFERTA"] == base.models["cursos_info"].nombre(int(indices[0]))
+
+    assert client.get("/api/recommendations/similares/200").status_code == 404
+    assert client.get("/api/recommendations/similares/3", params={"k": 0}).status_code == 422
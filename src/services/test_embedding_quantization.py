@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from src.services import recommenderService
+from src.services.embeddingQuantizationService import EMBEDDING_QUANTIZERS, PQVectors, cuantizar
+from src.services.indexService import CourseEmbeddingIndex, normalizar_filas
+from src.services.modelRegistryService import ModelSnapshot
+from src.services.modelService import ModelService
+from src.services.recommendationCacheService import recommendation_cache
+from src.services.recommenderService import RecommenderService
+
+
+def test_modos_aproximan_la_similitud_exacta(tmp_path):
+    rng = np.random.default_rng(0)
+    X_embeddings = rng.normal(size=(3000, 40))
+    normalizadas = normalizar_filas(X_embeddings)
+    q_unit = normalizadas[7]
+    exactas = normalizadas @ q_unit
+    indices = np.array([5, 7, 2999, 0])
+
+    for modo, tolerancia in [("float32", 0), ("float16", 1e-3), ("int8", 2e-2)]:
+        vectores = cuantizar(modo, X_embeddings)
+        sims = vectores.similitudes(q_unit)
+        np.testing.assert_allclose(sims, exactas, atol=tolerancia + 1e-6)
+        np.testing.assert_array_equal(vectores.similitudes(q_unit, indices), sims[indices])
+
+    # PQ: 16 bytes por curso (40 dimensiones en 16 subvectores, con relleno); se guarda y se recupera
+    pq = cuantizar("pq", X_embeddings, path=tmp_path / "pq.npz", subvectores=16)
+    assert pq.codigos.shape == (16, 3000) and pq.codigos.dtype == np.uint8
+    assert np.corrcoef(pq.similitudes(q_unit), exactas)[0, 1] > 0.8
+    recuperada = cuantizar("pq", X_embeddings, path=tmp_path / "pq.npz", subvectores=16)
+    np.testing.assert_array_equal(recuperada.codigos, pq.codigos)
+    assert PQVectors.cargar(tmp_path / "pq.npz", X_embeddings[:-1], 16) is None
+
+
+@pytest.mark.parametrize("snapshot_sintetico", [{"n_cursos": 5000}], indirect=True)
+def test_recomendaciones_cuantizadas_con_rerank_coinciden_con_float32(monkeypatch, snapshot_sintetico, consultas):
+    monkeypatch.setattr(recommendation_cache, "max_entries", 0)
+    base = snapshot_sintetico
+    X_embeddings = base.models["embeddings"]
+    textos = consultas + ["sin coincidencias", "salud"]
+
+    for pipeline in ["dos_etapas", "exhaustivo"]:
+        monkeypatch.setattr(recommenderService, "RECOMMENDATION_PIPELINE", pipeline)
+        esperado = RecommenderService.obtener_recomendaciones_lote(textos, 6, modalidad="Virtual", snapshot=base)
+
+        snapshot = ModelSnapshot(version=base.version + 1, models=base.models, indexes={
+            **base.indexes, "embeddings": CourseEmbeddingIndex(X_embeddings, vectores=cuantizar("int8", X_embeddings))
+        })
+        assert snapshot.indexes["embeddings"].normalizadas is None
+        lote = RecommenderService.obtener_recomendaciones_lote(textos, 6, modalidad="Virtual", snapshot=snapshot)
+        for texto, obtenido, referencia in zip(textos, lote, esperado):
+            una = RecommenderService.recomendar_cursos(texto, snapshot.models["cursos_info"], X_embeddings, 6,
+                                                       modalidad="Virtual", snapshot=snapshot)
+            assert [r["indice"] for r in una] == [r["indice"] for r in obtenido] == [r["indice"] for r in referencia]
+
+
+@pytest.mark.parametrize("snapshot_sintetico", [{"n_cursos": 3000}], indirect=True)
+def test_reporte_por_modo(monkeypatch, snapshot_sintetico):
+    snapshot = snapshot_sintetico
+    monkeypatch.setattr(ModelService, "_snapshot", snapshot)
+    reporte = ModelService.evaluar_cuantizacion_embeddings(k=10, n_consultas=20, rerank=50)
+
+    assert reporte["activo"] == "float32"
+    modos = {r["modo"]: r for r in reporte["modos"]}
+    assert list(modos) == list(EMBEDDING_QUANTIZERS)
+    assert modos["float32"]["recall_at_k"] == 1.0 and modos["float32"]["compresion_vs_float32"] == 1.0
+    assert modos["int8"]["recall_at_k_rerank"] == 1.0 and modos["int8"]["compresion_vs_float32"] > 3.5
+    # 16 bytes de códigos por curso más la tabla de centroides (64 KB), que aquí aún no se amortiza
+    assert modos["pq"]["bytes"] == 16 * 3000 + 16 * 256 * 4 * 4
+    assert modos["pq"]["recall_at_k_rerank"] >= modos["pq"]["recall_at_k"]
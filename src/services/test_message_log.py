@@ -0,0 +1,70 @@
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from src.core.database import Base
+from src.models.conversationModel import Conversation, Message
+from src.services.conversationService import ConversationService
+from src.services.messageLogService import MessageLog
+
+
+def servicio_diferido(engine, **opciones) -> tuple[ConversationService, MessageLog, list]:
+    """ConversationService en modo write-behind sobre `engine`; retorna también un contador de commits."""
+    Base.metadata.create_all(bind=engine)
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    session_factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    log = MessageLog(session_factory=session_factory, **opciones)
+    return ConversationService(session_factory=session_factory, message_log=log), log, commits
+
+
+def test_historial_incluye_pendientes_y_apagado_vacia_la_cola(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}", connect_args={"check_same_thread": False})
+    service, log, commits = servicio_diferido(engine, batch_size=10_000, flush_ms=60_000)
+    conv_id = service.iniciar_conversacion(["hola"])
+    commits.clear()
+
+    for i in range(50):
+        service.registrar_turno(conv_id, [("user", f"pregunta {i}"), ("bot", f"respuesta {i}")])
+
+    # Aún sin guardar: el historial los incluye igual
+    historial = service.get_conversation_history(conv_id)
+    assert len(historial) == 101 and historial[-1]["content"] == "respuesta 49"
+    assert not commits
+
+    # El apagado vacía la cola en un solo lote
+    log.detener()
+    assert len(commits) == 1
+    assert log.estado()["mensajes_pendientes"] == 0
+    with service.session_factory() as db:
+        assert db.query(Message).filter_by(id_conversation=conv_id).count() == 101
+        assert db.get(Conversation, conv_id).end_time is not None
+    assert len(service.get_conversation_history(conv_id)) == 101
+
+
+def test_detener_no_se_bloquea_con_la_cola_llena(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    sesiones = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    liberar = threading.Event()
+
+    def session_factory():
+        # El escritor se queda esperando a la base
+        liberar.wait()
+        return sesiones()
+
+    log = MessageLog(session_factory=session_factory, batch_size=1, flush_ms=1, max_queue=1)
+    log.encolar(1, [("user", "hola")])
+    time.sleep(0.2)
+    log.encolar(1, [("bot", "¿en qué tema?")])  # ocupa el único lugar de la cola
+
+    inicio = time.perf_counter()
+    log.detener(timeout=0.3)
+    assert time.perf_counter() - inicio < 1
+
+    # Al liberarse la base el escritor guarda todo y las listas de pendientes quedan vacías
+    liberar.set()
+    assert log.vaciar(timeout=5)
+    assert log.estado()["mensajes_guardados"] == 2
+    log.detener()
+    assert not log.estado()["activo"]
@@ -0,0 +1,111 @@
+import io
+import stat
+import numpy as np
+import pytest
+from src.services import modelRegistryService
+from src.services.indexService import CourseEmbeddingIndex
+from src.services.modelRegistryService import EscrituraAtomica, ModelRegistry, escribir_atomico
+from src.services.modelService import ModelService
+from src.services.recommendationCacheService import recommendation_cache
+from src.services.recommenderService import RecommenderService
+
+
+def npy_bytes(arr: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, arr)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def servicio_aislado(monkeypatch):
+    """Aísla el snapshot publicado y el estado de carga de ModelService durante el test."""
+    monkeypatch.setattr(ModelService, "_snapshot", ModelService._snapshot.derivar({}, {}, {}))
+    monkeypatch.setattr(ModelService, "_load_state", dict(ModelService._load_state))
+    monkeypatch.setattr(ModelService, "_load_errors", {})
+
+
+def test_peticion_en_curso_conserva_su_snapshot(monkeypatch, servicio_aislado, snapshot_sintetico):
+    monkeypatch.setattr(recommendation_cache, "max_entries", 0)
+    base = snapshot_sintetico
+    monkeypatch.setattr(ModelService, "_snapshot", base)
+    catalogo, X_embeddings = base.models["cursos_info"], base.models["embeddings"]
+    esperado = RecommenderService.recomendar_cursos("salud", catalogo, X_embeddings, 6)
+
+    # A mitad de la petición (ya con el snapshot tomado) se publican embeddings nuevos
+    X_nuevos = np.random.default_rng(9).normal(size=X_embeddings.shape)
+    indice_embeddings = RecommenderService._indice_embeddings
+    publicados = []
+
+    def publicar_durante(X, snapshot):
+        if not publicados:
+            publicados.append(ModelService._publicar({"embeddings": X_nuevos},
+                                                     {"embeddings": CourseEmbeddingIndex(X_nuevos)}, {}))
+        return indice_embeddings(X, snapshot)
+
+    monkeypatch.setattr(RecommenderService, "_indice_embeddings", staticmethod(publicar_durante))
+    en_curso = RecommenderService.recomendar_cursos("salud", catalogo, X_embeddings, 6)
+
+    assert ModelService.snapshot() is publicados[0] and publicados[0].version == base.version + 1
+    assert en_curso == esperado
+    # La siguiente petición ya usa el snapshot nuevo
+    siguiente = RecommenderService.recomendar_cursos("salud", catalogo, X_nuevos, 6)
+    assert siguiente == RecommenderService.recomendar_cursos("salud", catalogo, X_nuevos, 6, snapshot=publicados[0])
+    assert siguiente != esperado
+
+
+def test_cada_publicacion_incrementa_la_version(tmp_path, servicio_aislado, cliente):
+    inicial = ModelService.snapshot().version
+    versiones = []
+    for i in range(3):
+        r = cliente.post("/api/models/", data={"tipo": "cursos"}, files={"file": ("c.npy", npy_bytes(np.full((20, 8), i)))})
+        assert r.status_code == 200 and r.json()["version"] == i + 1
+        r = cliente.post("/api/models/cursos/load")
+        assert r.status_code == 200
+        versiones.append(r.json()["snapshot"])
+        assert (ModelService.snapshot().models["cursos"] == i).all()
+
+    assert versiones == [inicial + 1, inicial + 2, inicial + 3]
+    assert ModelService.snapshot().version == inicial + 3
+
+
+def test_escritura_fallida_no_toca_el_archivo_ni_el_manifiesto(tmp_path, monkeypatch, cliente):
+    dest = tmp_path / "artefacto.bin"
+    registro = ModelRegistry(tmp_path / "registro.json")
+    registro.registrar("cursos", dest, *escribir_atomico(dest, b"version 1"))
+    manifiesto = registro.manifest_path.read_bytes()
+
+    # Excepción a mitad de la escritura
+    with pytest.raises(RuntimeError):
+        with EscrituraAtomica(dest) as escritura:
+            escritura.escribir(b"version 2 a medias")
+            raise RuntimeError("conexión cortada")
+    assert dest.read_bytes() == b"version 1" and registro.manifest_path.read_bytes() == manifiesto
+    assert not list(tmp_path.glob("*.tmp"))
+
+    # Falla el rename al publicar una subida: sigue el archivo vigente y su manifiesto
+    valido = npy_bytes(np.ones((10, 4)))
+    assert cliente.post("/api/models/", data={"tipo": "embeddings"}, files={"file": ("e.npy", valido)}).status_code == 200
+    manifiesto = (tmp_path / "manifest.json").read_bytes()
+
+    def replace_fallido(src, dst):
+        raise OSError("disco lleno")
+    monkeypatch.setattr(modelRegistryService.os, "replace", replace_fallido)
+    r = cliente.post("/api/models/", data={"tipo": "embeddings"}, files={"file": ("e.npy", npy_bytes(np.zeros((10, 4))))})
+
+    assert r.status_code == 500
+    assert (tmp_path / "embeddings.npy").read_bytes() == valido
+    assert (tmp_path / "manifest.json").read_bytes() == manifiesto
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_archivo_publicado_conserva_los_permisos(tmp_path, monkeypatch):
+    monkeypatch.setattr(modelRegistryService, "_UMASK", 0o022)
+    nuevo = tmp_path / "nuevo.bin"
+    escribir_atomico(nuevo, b"a")
+    assert stat.S_IMODE(nuevo.stat().st_mode) == 0o644
+
+    existente = tmp_path / "existente.bin"
+    existente.write_bytes(b"version 1")
+    existente.chmod(0o640)
+    escribir_atomico(existente, b"version 2")
+    assert existente.read_bytes() == b"version 2" and stat.S_IMODE(existente.stat().st_mode) == 0o640
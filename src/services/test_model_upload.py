@@ -0,0 +1,88 @@
+import hashlib
+import io
+import numpy as np
+from src.services import modelService
+from src.services.indexService import normalizar_filas
+from src.services.modelService import ModelService
+
+
+def npy_bytes(arr: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, arr)
+    return buffer.getvalue()
+
+
+def test_subida_por_bloques_y_descarga_por_rangos(tmp_path, cliente):
+    client = cliente
+    contenido = npy_bytes(np.random.default_rng(0).normal(size=(500, 16)))
+
+    r = client.post("/api/models/", data={"tipo": "embeddings"}, files={"file": ("e.npy", contenido)})
+    assert r.status_code == 200
+    assert r.json()["sha256"] == hashlib.sha256(contenido).hexdigest()
+    assert (tmp_path / "embeddings.npy").read_bytes() == contenido
+
+    r = client.get("/api/models/embeddings/download", headers={"Range": "bytes=100-199"})
+    assert r.status_code == 206
+    assert r.content == contenido[100:200]
+    assert r.headers["x-checksum-sha256"] == hashlib.sha256(contenido).hexdigest()
+
+
+def test_subida_invalida_no_reemplaza_el_artefacto(tmp_path, cliente):
+    client = cliente
+    valido = npy_bytes(np.ones((10, 4)))
+    client.post("/api/models/", data={"tipo": "embeddings"}, files={"file": ("e.npy", valido)})
+
+    truncado = npy_bytes(np.ones((1000, 4)))[:-8]
+    r = client.post("/api/models/", data={"tipo": "embeddings"}, files={"file": ("e.npy", truncado)})
+    assert r.status_code == 422
+
+    vector = npy_bytes(np.ones(10))
+    r = client.post("/api/models/", data={"tipo": "embeddings"}, files={"file": ("e.npy", vector)})
+    assert r.status_code == 422
+
+    csv = b"NOMBRE_OFERTA,MODALIDAD\nCurso,Virtual\n"
+    r = client.post("/api/models/", data={"tipo": "cursos_info"}, files={"file": ("c.csv", csv)})
+    assert r.status_code == 422
+
+    assert (tmp_path / "embeddings.npy").read_bytes() == valido
+    assert not (tmp_path / "cursos_info.csv").exists()
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_subida_que_no_compila_no_reemplaza_el_catalogo(tmp_path, cliente):
+    valido = b"NOMBRE_OFERTA,MODALIDAD,TIPO_OFERTA\nCurso de salud,Virtual,Curso corto\n"
+    r = cliente.post("/api/models/", data={"tipo": "cursos_info"}, files={"file": ("c.csv", valido)})
+    assert r.status_code == 200
+    compilado = (tmp_path / "cursos_info.catalog").read_bytes()
+    manifiesto = (tmp_path / "manifest.json").read_bytes()
+
+    # Cabecera válida, pero el cuerpo no se puede leer (comillas sin cerrar)
+    roto = b'NOMBRE_OFERTA,MODALIDAD,TIPO_OFERTA\n"Curso sin cerrar,Virtual,Programa\nOtro,Virtual,Programa\n'
+    r = cliente.post("/api/models/", data={"tipo": "cursos_info"}, files={"file": ("c.csv", roto)})
+    assert r.status_code == 422
+
+    assert (tmp_path / "cursos_info.csv").read_bytes() == valido
+    assert (tmp_path / "cursos_info.catalog").read_bytes() == compilado
+    assert (tmp_path / "manifest.json").read_bytes() == manifiesto
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_subida_normaliza_los_embeddings_y_la_carga_los_mapea(tmp_path, monkeypatch, cliente):
+    monkeypatch.setattr(ModelService, "_snapshot", ModelService._snapshot.derivar({}, {}, {}))
+    X_embeddings = np.random.default_rng(0).normal(size=(400, 16))
+    r = cliente.post("/api/models/", data={"tipo": "embeddings"}, files={"file": ("e.npy", npy_bytes(X_embeddings))})
+    assert r.status_code == 200
+    normalizadas = np.load(tmp_path / "embeddings_normalizados.npy")
+    np.testing.assert_array_equal(normalizadas, normalizar_filas(X_embeddings))
+
+    # La carga mapea el archivo normalizado en lugar de normalizar (y copiar) los embeddings
+    def sin_normalizar(X):
+        raise AssertionError("la carga no debería normalizar los embeddings")
+    monkeypatch.setattr(modelService, "normalizar_filas", sin_normalizar)
+    assert cliente.post("/api/models/embeddings/load").status_code == 200
+    indice = ModelService.snapshot().indexes["embeddings"]
+    np.testing.assert_array_equal(indice.normalizadas, normalizadas)
+
+    reporte = ModelService.memory_report()
+    assert reporte["embeddings"] == {"bytes_residentes": 0, "bytes_mapeados": X_embeddings.nbytes}
+    assert reporte["indices"]["embeddings_normalizados"] == {"bytes_residentes": 0, "bytes_mapeados": normalizadas.nbytes}
@@ -0,0 +1,138 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from src.core.config import RECOMMENDATION_PESO_EMBED, RECOMMENDATION_PESO_TFIDF
+from src.services import recommenderService
+from src.services.catalogStoreService import CourseCatalog
+from src.services.indexService import CourseEmbeddingIndex, CourseFilterIndex, CourseTextIndex
+from src.services.modelRegistryService import ModelSnapshot
+from src.services.modelService import ModelService
+from src.services.queryEncoderService import KerasEncoder, NumpyEncoder, QueryEncoderService, extraer_encoder
+from src.services.recommendationCacheService import recommendation_cache
+from src.services.recommenderService import RecommenderService
+
+keras = pytest.importorskip("keras")
+
+
+def autoencoder_sintetico(dim_entrada: int = 48, dim: int = 16, seed: int = 0):
+    """Autoencoder denso sin entrenar (con BatchNormalization de estadísticas no triviales)."""
+    keras.utils.set_random_seed(seed)
+    entrada = keras.Input(shape=(dim_entrada,))
+    x = keras.layers.Dense(32, activation="relu")(entrada)
+    x = keras.layers.Dropout(0.2)(x)
+    x = keras.layers.Dense(24)(x)
+    normalizacion = keras.layers.BatchNormalization()
+    x = keras.layers.Activation("tanh")(normalizacion(x))
+    codigo = keras.layers.Dense(dim, name="codigo")(x)
+    x = keras.layers.Dense(32, activation="relu")(codigo)
+    salida = keras.layers.Dense(dim_entrada)(x)
+
+    rng = np.random.default_rng(seed)
+    normalizacion.set_weights([rng.uniform(0.5, 2, 24), rng.normal(size=24), rng.normal(size=24), rng.uniform(0.5, 2, 24)])
+    return keras.Model(entrada, salida)
+
+
+@pytest.fixture
+def snapshot_con_autoencoder(catalogo_sintetico) -> ModelSnapshot:
+    dim = 16
+    df, _ = catalogo_sintetico
+    catalogo = CourseCatalog.desde_dataframe(df)
+    indice_tfidf = CourseTextIndex(catalogo, analizador="simple")
+    # Características de `cursos`: proyección del TF-IDF (bolsa de palabras) de cada nombre más ruido
+    rng = np.random.default_rng(1)
+    X_cursos = (indice_tfidf.matrix @ rng.normal(size=(indice_tfidf.matrix.shape[1], 48))).astype(np.float32)
+    X_cursos += rng.normal(scale=0.01, size=X_cursos.shape).astype(np.float32)
+
+    autoencoder = autoencoder_sintetico(dim=dim)
+    X_embeddings = KerasEncoder(extraer_encoder(autoencoder, dim))(X_cursos)
+    return ModelSnapshot(
+        version=2000,
+        models={"cursos_info": catalogo, "embeddings": X_embeddings, "cursos": X_cursos, "autoencoder": autoencoder},
+        indexes={"tfidf": indice_tfidf, "embeddings": CourseEmbeddingIndex(X_embeddings),
+                 "filtros": CourseFilterIndex(catalogo)}
+    )
+
+
+def test_exportacion_numpy_equivale_a_keras(tmp_path):
+    autoencoder = autoencoder_sintetico()
+    encoder = extraer_encoder(autoencoder, 16)
+    X = np.random.default_rng(2).normal(size=(50, 48)).astype(np.float32)
+
+    exportado = NumpyEncoder.desde_keras(encoder)
+    np.testing.assert_allclose(exportado(X), KerasEncoder(encoder)(X), atol=1e-4)
+
+    exportado.guardar(tmp_path / "encoder.npz")
+    np.testing.assert_allclose(NumpyEncoder.cargar(tmp_path / "encoder.npz")(X), exportado(X))
+
+
+@pytest.mark.parametrize("catalogo_sintetico", [{"n_cursos": 2000}], indirect=True)
+def test_consultas_codificadas_por_el_autoencoder(monkeypatch, tmp_path, snapshot_con_autoencoder):
+    snapshot = snapshot_con_autoencoder
+    monkeypatch.setattr(ModelService, "_snapshot", snapshot)
+    servicio = QueryEncoderService(habilitado=True, path=tmp_path / "query_encoder.npz")
+    encoder = servicio.obtener(snapshot, esperar=True)
+    assert servicio.estado()["estado"] == "listo" and encoder.runtime.nombre == "numpy"
+
+    # Un curso del catálogo consultado por su nombre queda cerca de su propio embedding
+    nombre = snapshot.models["cursos_info"].nombre(7)
+    indice_embeddings = snapshot.indexes["embeddings"]
+    assert indice_embeddings.similitudes(encoder.codificar(nombre))[7] > 0.9
+    assert not encoder.codificar("palabras desconocidas").any()
+
+    # Peticiones concurrentes: mismo resultado que codificarlas juntas
+    textos = ["salud", "programacion liderazgo", "tema12 tema873", "liderazgo"] * 8
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        concurrentes = np.stack(list(pool.map(encoder.codificar, textos)))
+    np.testing.assert_allclose(concurrentes, encoder.codificar_lote(textos), atol=1e-5)
+
+    # El recomendador usa el vector del autoencoder
+    monkeypatch.setattr(recommenderService, "query_encoder_service", servicio)
+    monkeypatch.setattr(recommendation_cache, "max_entries", 0)
+    catalogo = snapshot.models["cursos_info"]
+    obtenido = RecommenderService.obtener_recomendaciones_inteligentes("salud", catalogo, snapshot.models["embeddings"],
+                                                                       6, snapshot=snapshot)
+    esperado, _, _ = RecommenderService._rankear_consulta(
+        "salud", snapshot.indexes["tfidf"], indice_embeddings, 18, RECOMMENDATION_PESO_EMBED, RECOMMENDATION_PESO_TFIDF,
+        q_vec_embed=encoder.codificar_lote(["salud"])[0]
+    )
+    assert list(obtenido.index) == list(esperado[catalogo.primeros_por_nombre(esperado, 6)])
+    servicio.detener()
+
+    # Otro worker carga el encoder exportado sin tocar el autoencoder
+    def sin_keras(tipo):
+        raise AssertionError("no debería cargar el autoencoder")
+    monkeypatch.setattr(ModelService, "get_model", sin_keras)
+    otro = QueryEncoderService(habilitado=True, path=tmp_path / "query_encoder.npz")
+    sin_autoencoder = ModelSnapshot(version=2001, models={**snapshot.models, "autoencoder": None},
+                                    indexes=dict(snapshot.indexes))
+    np.testing.assert_allclose(otro.obtener(sin_autoencoder, esperar=True).codificar("salud"),
+                               encoder.codificar_lote(["salud"])[0], atol=1e-6)
+    otro.detener()
+
+
+@pytest.mark.parametrize("catalogo_sintetico", [{"n_cursos": 2000}], indirect=True)
+def test_calidad_del_ranking_con_el_codificador(monkeypatch, tmp_path, snapshot_con_autoencoder):
+    """Consultas con parte del nombre de un curso: el curso aparece en el top-6 al menos tan seguido como sin codificador."""
+    snapshot = snapshot_con_autoencoder
+    monkeypatch.setattr(ModelService, "_snapshot", snapshot)
+    monkeypatch.setattr(recommendation_cache, "max_entries", 0)
+    catalogo = snapshot.models["cursos_info"]
+    rng = np.random.default_rng(5)
+    objetivos = rng.choice(len(catalogo), 200, replace=False)
+    consultas = [" ".join(catalogo.nombre(int(i)).split()[:2]) for i in objetivos]
+
+    def aciertos(servicio) -> float:
+        monkeypatch.setattr(recommenderService, "query_encoder_service", servicio)
+        servicio.obtener(snapshot, esperar=True)
+        lote = [RecommenderService.recomendar_cursos(c, catalogo, snapshot.models["embeddings"], 6, snapshot=snapshot)
+                for c in consultas]
+        return np.mean([int(i) in {r["indice"] for r in recs} for i, recs in zip(objetivos, lote)])
+
+    deshabilitado = QueryEncoderService(habilitado=False)
+    sin_codificador = aciertos(deshabilitado)
+    assert deshabilitado.obtener(snapshot) is None and deshabilitado.estado()["estado"] == "deshabilitado"
+
+    servicio = QueryEncoderService(habilitado=True, path=tmp_path / "query_encoder.npz")
+    con_codificador = aciertos(servicio)
+    servicio.detener()
+    assert con_codificador >= max(sin_codificador, 0.95)
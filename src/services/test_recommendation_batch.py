@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from src.api.recommendationsRouter import router
+from src.services.modelService import ModelService
+from src.services.recommendationPipelineService import RecommendationPipeline
+from src.services.recommendationCacheService import recommendation_cache
+from src.services.recommenderService import RecommenderService
+
+
+@pytest.mark.parametrize("snapshot_sintetico", [{"n_cursos": 5000}], indirect=True)
+@pytest.mark.parametrize("consultas", [120], indirect=True)
+def test_lote_coincide_con_una_consulta(monkeypatch, snapshot_sintetico, consultas):
+    monkeypatch.setattr(recommendation_cache, "max_entries", 0)
+    snapshot = snapshot_sintetico
+    df, X_embeddings = snapshot.models["cursos_info"], snapshot.models["embeddings"]
+    textos = consultas + ["sin coincidencias", "salud"]
+
+    for filtros in [{}, {"modalidad": "Virtual", "duracion": "Programa"}]:
+        # memoria_mb=1 obliga a procesar varios bloques
+        lote = RecommenderService.obtener_recomendaciones_lote(textos, 6, snapshot=snapshot, memoria_mb=1, **filtros)
+        assert len(lote) == len(textos)
+        for texto, recomendaciones in zip(textos, lote):
+            esperado = RecommenderService.obtener_recomendaciones_inteligentes(
+                texto, df, X_embeddings, 6, snapshot=snapshot, **filtros
+            )
+            assert [r["indice"] for r in recomendaciones] == list(esperado.index), texto
+            assert [r["NOMBRE_OFERTA"] for r in recomendaciones] == list(esperado["NOMBRE_OFERTA"])
+
+        # Misma forma (con "score") y mismos puntajes que la ruta de una consulta
+        for texto, recomendaciones in zip(textos[:10], lote):
+            una = RecommenderService.recomendar_cursos(texto, df, X_embeddings, 6, snapshot=snapshot, **filtros)
+            assert [list(r) for r in una] == [list(r) for r in recomendaciones]
+            np.testing.assert_allclose([r["score"] for r in una], [r["score"] for r in recomendaciones], rtol=1e-6)
+
+
+@pytest.mark.parametrize("snapshot_sintetico", [{"n_cursos": 500}], indirect=True)
+def test_endpoint_batch(monkeypatch, snapshot_sintetico):
+    snapshot = snapshot_sintetico
+    monkeypatch.setattr(ModelService, "_snapshot", snapshot)
+    app = FastAPI()
+    app.include_router(router, prefix="/api/recommendations")
+
+    # Palabras de nombres del catálogo (una consulta sin términos conocidos no tiene recomendaciones)
+    queries = [snapshot.models["cursos_info"].nombre(i).split()[0] for i in range(2)]
+    r = TestClient(app).post("/api/recommendations/batch", json={"queries": queries, "k": 3})
+    assert r.status_code == 200
+    resultados = r.json()["resultados"]
+    assert [x["query"] for x in resultados] == queries
+    assert all(len(x["recomendaciones"]) == 3 for x in resultados)
+
+    assert TestClient(app).post("/api/recommendations/batch", json={"queries": []}).status_code == 422
+
+
+@pytest.mark.parametrize("snapshot_sintetico", [{"n_cursos": 5000}], indirect=True)
+def test_batch_rerankea_con_un_producto_por_bloque(monkeypatch, snapshot_sintetico, consultas):
+    """Con la configuración por defecto (dos etapas) cada bloque de consultas se rerankea con un solo producto."""
+    monkeypatch.setattr(recommendation_cache, "max_entries", 0)
+    snapshot = snapshot_sintetico
+    monkeypatch.setattr(ModelService, "_snapshot", snapshot)
+    bloques = []
+    rerankear_lote = RecommendationPipeline.rerankear_lote
+
+    def contar(candidatos, *args):
+        bloques.append(len(candidatos))
+        return rerankear_lote(candidatos, *args)
+
+    def por_consulta(*args, **kwargs):
+        raise AssertionError("el lote no debería rankear consulta por consulta")
+
+    monkeypatch.setattr(RecommendationPipeline, "rerankear_lote", staticmethod(contar))
+    monkeypatch.setattr(RecommendationPipeline, "rankear", staticmethod(por_consulta))
+    app = FastAPI()
+    app.include_router(router, prefix="/api/recommendations")
+
+    textos = consultas
+    r = TestClient(app).post("/api/recommendations/batch", json={"queries": textos, "k": 5})
+    assert r.status_code == 200 and len(r.json()["resultados"]) == 40
+    assert bloques == [40]
+
+    # Bloques de 10 consultas (1 MB / (20 bytes · 5000 cursos))
+    bloques.clear()
+    RecommenderService.obtener_recomendaciones_lote(textos + ["salud"], 5, snapshot=snapshot, memoria_mb=1)
+    assert bloques == [10, 10, 10, 10, 1]
@@ -0,0 +1,62 @@
+import pytest
+from src.services import recommenderService
+from src.services.modelRegistryService import ModelSnapshot
+from src.services.recommendationCacheService import RecommendationCache
+from src.services.recommenderService import RecommenderService
+
+
+def recomendar(snapshot, texto, **filtros):
+    return RecommenderService.obtener_recomendaciones_inteligentes(
+        texto_usuario=texto,
+        df_final=snapshot.models["cursos_info"],
+        X_embeddings=snapshot.models["embeddings"],
+        num_recomendaciones=6,
+        snapshot=snapshot,
+        **filtros
+    )
+
+
+@pytest.mark.parametrize("catalogo_sintetico", [{"n_cursos": 2000}], indirect=True)
+def test_hits_misses_e_invalidacion_por_version(catalogo_sintetico, monkeypatch):
+    df, X_embeddings = catalogo_sintetico
+    snapshot = ModelSnapshot(version=101, models={"cursos_info": df, "embeddings": X_embeddings})
+    recommendation_cache = RecommendationCache()
+    monkeypatch.setattr(recommenderService, "recommendation_cache", recommendation_cache)
+    inicial = recommendation_cache.estadisticas()
+
+    primero = recomendar(snapshot, "Salud ", modalidad="Virtual")
+    segundo = recomendar(snapshot, "  salud", modalidad="Virtual")
+    assert segundo.equals(primero)
+    assert recomendar(snapshot, "salud", modalidad="Presencial") is not None
+
+    stats = recommendation_cache.estadisticas()
+    assert stats["hits"] - inicial["hits"] == 1
+    assert stats["misses"] - inicial["misses"] == 2
+
+    # Un snapshot nuevo (recarga de modelos) vacía la cache
+    nuevo = snapshot.derivar({}, {}, {})
+    recomendar(nuevo, "salud", modalidad="Virtual")
+    stats = recommendation_cache.estadisticas()
+    assert stats["version"] == nuevo.version and stats["entradas"] == 1
+    assert stats["misses"] - inicial["misses"] == 3
+
+    # Una petición que aún usa el snapshot anterior no vacía la cache ni hace retroceder la versión
+    assert recomendar(snapshot, "salud", modalidad="Virtual").equals(primero)
+    stats = recommendation_cache.estadisticas()
+    assert stats["version"] == nuevo.version and stats["entradas"] == 1 and stats["invalidaciones"] == 1
+    recomendar(nuevo, "salud", modalidad="Virtual")
+    assert recommendation_cache.estadisticas()["hits"] - inicial["hits"] == 2
+
+    # Datos que no son los del snapshot no se cachean
+    otro_df = df.copy()
+    RecommenderService.obtener_recomendaciones_inteligentes("salud", otro_df, X_embeddings, snapshot=nuevo)
+    assert recommendation_cache.estadisticas()["entradas"] == 1
+
+
+def test_lru_acotado():
+    cache = RecommendationCache(max_entries=2)
+    for clave in ["a", "b", "c"]:
+        cache.guardar(1, (clave,), clave)
+    assert cache.obtener(1, ("a",)) is None
+    assert cache.obtener(1, ("c",)) == "c"
+    assert cache.estadisticas()["evictions"] == 1
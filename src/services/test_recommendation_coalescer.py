@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from src.core.config import RECOMMENDATION_WORKERS
+from src.services import recommenderService
+from src.services.chatbotLogicService import CIERRE_RECOMENDACION, ENCABEZADO_RECOMENDACION, ChatbotLogicService
+from src.services.conversationService import ConversationService
+from src.services.conversationStateService import MemoryStateStore
+from src.services.modelService import ModelService
+from src.services.recommendationCacheService import recommendation_cache
+from src.services.recommendationCoalescerService import RecommendationCoalescer
+from src.services.recommendationPoolService import RecommendationExecutor
+from src.services.recommenderService import RecommenderService
+
+
+def recomendar(snapshot, texto, filtros):
+    return RecommenderService.obtener_recomendaciones_inteligentes(
+        texto, snapshot.models["cursos_info"], snapshot.models["embeddings"], 6, snapshot=snapshot, **filtros
+    )
+
+
+@pytest.mark.parametrize("snapshot_sintetico", [{"n_cursos": 3000, "version": 3000}], indirect=True)
+@pytest.mark.parametrize("consultas", [96], indirect=True)
+def test_consultas_concurrentes_se_agrupan_sin_cambiar_resultados(monkeypatch, snapshot_sintetico, consultas):
+    monkeypatch.setattr(recommendation_cache, "max_entries", 0)
+    snapshot = snapshot_sintetico
+    peticiones = [(texto, [{}, {"modalidad": "Virtual", "duracion": "Programa"}][i % 2])
+                  for i, texto in enumerate(consultas + ["sin coincidencias", "salud"])]
+    esperados = [list(recomendar(snapshot, texto, filtros).index) for texto, filtros in peticiones]
+
+    coalescer = RecommendationCoalescer(RecommenderService.obtener_recomendaciones_lote, habilitado=True,
+                                        max_lote=32, ventana_ms=20)
+    monkeypatch.setattr(recommenderService, "recommendation_coalescer", coalescer)
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        obtenidos = list(pool.map(lambda p: recomendar(snapshot, *p), peticiones))
+
+    assert [list(r.index) for r in obtenidos] == esperados
+    assert list(obtenidos[0].columns) == ["NOMBRE_OFERTA", "MODALIDAD", "TIPO_OFERTA"]
+    stats = coalescer.estadisticas()
+    assert stats["peticiones"] == len(peticiones)
+    assert stats["lotes"] < len(peticiones) and stats["lote_max"] <= 32
+    assert stats["espera_ms_p99"] is not None
+    coalescer.detener()
+
+
+@pytest.mark.parametrize("snapshot_sintetico", [{"n_cursos": 2000, "version": 3100}], indirect=True)
+def test_turnos_async_concurrentes_llenan_un_lote(monkeypatch, snapshot_sintetico, session_factory):
+    monkeypatch.setattr(recommendation_cache, "max_entries", 0)
+    snapshot = snapshot_sintetico
+    monkeypatch.setattr(ModelService, "_snapshot", snapshot)
+    executor = RecommendationExecutor(workers=RECOMMENDATION_WORKERS)
+    coalescer = RecommendationCoalescer(RecommenderService.obtener_recomendaciones_lote, habilitado=True,
+                                        max_lote=64, ventana_ms=500, executor=executor)
+    monkeypatch.setattr(recommenderService, "recommendation_coalescer", coalescer)
+    monkeypatch.setattr(recommenderService, "recommendation_executor", executor)
+
+    bot = ChatbotLogicService(state_store=MemoryStateStore())
+    bot.conversation_service = ConversationService(session_factory=session_factory)
+    n_turnos = 3 * RECOMMENDATION_WORKERS
+    ids = []
+    for _ in range(n_turnos):
+        conv_id = str(bot.procesar_mensaje("")["id_conversation"])
+        bot.procesar_mensaje("salud", conv_id)
+        bot.procesar_mensaje("virtual", conv_id)
+        ids.append(conv_id)
+
+    async def paso_3():
+        return await asyncio.gather(*[bot.procesar_mensaje_async("algo corto", conv_id) for conv_id in ids])
+
+    respuestas = asyncio.run(paso_3())
+    esperado = bot._lineas_recomendacion({"state": {"tema": "salud", "modalidad": "Virtual", "duracion": "Corto"},
+                                          "df_final": snapshot.models["cursos_info"],
+                                          "X_embeddings": snapshot.models["embeddings"], "snapshot": snapshot})
+    assert all(r["reply"] == ENCABEZADO_RECOMENDACION + "".join(esperado) + CIERRE_RECOMENDACION for r in respuestas)
+    # Todos los turnos en un solo lote, aunque son más que los hilos de recomendación
+    stats = coalescer.estadisticas()
+    assert stats["lote_max"] == n_turnos > executor.workers
+    assert executor.estadisticas()["enviadas"] == stats["lotes"]
+    coalescer.detener()
+    executor.detener()
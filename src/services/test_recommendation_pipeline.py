@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from src.services import recommenderService
+from src.services.catalogStoreService import CourseCatalog
+from src.services.indexService import CourseEmbeddingIndex, CourseFilterIndex, CourseTextIndex
+from src.services.recommendationPipelineService import RecommendationPipeline, recommendation_stage_stats
+from src.services.recommenderService import RecommenderService
+from src.services.vectorIndexService import IVFIndex
+
+
+@pytest.fixture
+def indices_sinteticos(catalogo_sintetico):
+    """Catálogo compilado e índices de `catalogo_sintetico` (tamaño por parametrización indirecta)."""
+    df, X_embeddings = catalogo_sintetico
+    catalogo = CourseCatalog.desde_dataframe(df)
+    return catalogo, CourseTextIndex(catalogo), CourseEmbeddingIndex(X_embeddings), CourseFilterIndex(catalogo)
+
+
+def ranking_exhaustivo(texto, tfidf, embeddings, k, filas=None):
+    """_ranking_hibrido sobre todo el catálogo, con el mismo vector de consulta que las dos etapas."""
+    filas_lexicas, scores_lexicos = tfidf.candidatos(texto)
+    q_vec = RecommendationPipeline.vector_consulta(filas_lexicas, scores_lexicos, embeddings)
+    exacto = CourseEmbeddingIndex.desde_normalizadas(embeddings.X_embeddings, embeddings.normalizadas)
+    return RecommenderService._ranking_hibrido(tfidf.similitudes(texto), exacto, k, 0.6, 0.4, filas=filas, q_vec_embed=q_vec)
+
+
+@pytest.mark.parametrize("catalogo_sintetico", [{"n_cursos": 20_000}], indirect=True)
+def test_dos_etapas_acotan_los_candidatos_y_recuperan_el_top_exhaustivo(indices_sinteticos):
+    catalogo, tfidf, embeddings, filtros = indices_sinteticos
+    embeddings.vectorial = IVFIndex(embeddings.normalizadas, n_probe=32)
+    rng = np.random.default_rng(3)
+    consultas = [" ".join(catalogo.nombre(int(i)).split()[:2]) for i in rng.choice(len(catalogo), 50)]
+
+    recall = []
+    for consulta in consultas:
+        indices, scores, tiempos = RecommendationPipeline.rankear(consulta, tfidf, embeddings, 18, 0.6, 0.4,
+                                                                  presupuesto=300)
+        assert not tiempos["exhaustivo"] and tiempos["n_candidatos"] <= 600
+        assert np.all(np.diff(scores) <= 0)
+        recall.append(len(set(indices) & set(ranking_exhaustivo(consulta, tfidf, embeddings, 18))) / 18)
+    assert np.mean(recall) >= 0.85
+
+    # El filtro de metadatos se aplica a los candidatos
+    filas = filtros.filas("Virtual", "Programa")
+    indices, _, _ = RecommendationPipeline.rankear("salud liderazgo", tfidf, embeddings, 18, 0.6, 0.4, filas=filas)
+    assert np.isin(indices, filas).all()
+
+
+@pytest.mark.parametrize("catalogo_sintetico", [{"n_cursos": 2000}], indirect=True)
+def test_sin_candidatos_suficientes_se_puntua_todo_el_catalogo_filtrado(indices_sinteticos):
+    _, tfidf, embeddings, filtros = indices_sinteticos
+    # Un término que aparece en menos de k cursos
+    assert 0 < len(tfidf.candidatos("salud")[0]) < 18
+    for filas in [None, filtros.filas("Presencial", "Diplomado")]:
+        indices, _, tiempos = RecommendationPipeline.rankear("salud", tfidf, embeddings, 18, 0.6, 0.4, filas=filas)
+        assert tiempos["exhaustivo"]
+        assert list(indices) == list(ranking_exhaustivo("salud", tfidf, embeddings, 18, filas))
+
+
+@pytest.mark.parametrize("catalogo_sintetico", [{"n_cursos": 2000}], indirect=True)
+def test_consulta_sin_terminos_conocidos_no_recomienda(monkeypatch, indices_sinteticos):
+    catalogo, tfidf, embeddings, _ = indices_sinteticos
+    indices, scores, tiempos = RecommendationPipeline.rankear("palabras desconocidas", tfidf, embeddings, 18, 0.6, 0.4)
+    assert len(indices) == len(scores) == 0 and tiempos["n_candidatos"] == 0
+
+    X_embeddings = embeddings.X_embeddings
+    for pipeline in ["dos_etapas", "exhaustivo"]:
+        monkeypatch.setattr(recommenderService, "RECOMMENDATION_PIPELINE", pipeline)
+        assert RecommenderService.recomendar_cursos("palabras desconocidas", catalogo, X_embeddings, 6) == []
+        lote = RecommenderService.obtener_recomendaciones_lote(["palabras desconocidas", "salud"], 6,
+                                                               df_final=catalogo, X_embeddings=X_embeddings)
+        assert lote[0] == [] and len(lote[1]) == 6, pipeline
+
+
+@pytest.mark.parametrize("catalogo_sintetico", [{"n_cursos": 5000}], indirect=True)
+def test_consulta_y_lote_coinciden_y_registran_tiempos(monkeypatch, catalogo_sintetico):
+    monkeypatch.setattr(recommenderService, "RECOMMENDATION_PIPELINE", "dos_etapas")
+    df, X_embeddings = catalogo_sintetico
+    catalogo = CourseCatalog.desde_dataframe(df)
+    consultas_previas = recommendation_stage_stats.estadisticas()["consultas"]
+
+    consultas = ["salud", "programacion liderazgo", "tema12 tema873", "sin coincidencias"]
+    lote = RecommenderService.obtener_recomendaciones_lote(consultas, 6, modalidad="Virtual",
+                                                           df_final=catalogo, X_embeddings=X_embeddings)
+    for consulta, esperado in zip(consultas, lote):
+        obtenido = RecommenderService.recomendar_cursos(consulta, catalogo, X_embeddings, 6, modalidad="Virtual")
+        assert [r["indice"] for r in obtenido] == [r["indice"] for r in esperado], consulta
+
+    estadisticas = recommendation_stage_stats.estadisticas()
+    assert estadisticas["consultas"] == consultas_previas + 2 * len(consultas)
+    assert estadisticas["exhaustivas"] >= 2 and estadisticas["materializacion_ms_p50"] is not None
@@ -0,0 +1,114 @@
+import asyncio
+import time
+import pytest
+from multiprocessing import shared_memory
+from src.services import recommendationPoolService, recommenderService
+from src.services.chatbotLogicService import ChatbotLogicService
+from src.services.conversationService import ConversationService
+from src.services.conversationStateService import MemoryStateStore
+from src.services.recommendationCacheService import recommendation_cache
+from src.services.recommendationPipelineService import RecommendationStageStats
+from src.services.recommendationPoolService import RecommendationExecutor, RecommendationProcessPool
+from src.services.recommenderService import RecommenderService
+
+
+@pytest.mark.parametrize("snapshot_sintetico", [{"n_cursos": 3000, "version": 4000}], indirect=True)
+def test_pool_de_procesos_coincide_con_el_calculo_local(monkeypatch, snapshot_sintetico, consultas):
+    monkeypatch.setattr(recommendation_cache, "max_entries", 0)
+    snapshot = snapshot_sintetico
+    textos = consultas + ["sin coincidencias", "salud"]
+    filtros = {"modalidad": "Virtual", "duracion": "Programa"}
+    esperado = [RecommenderService.obtener_recomendaciones_lote(textos, 6, snapshot=snapshot, **f) for f in ({}, filtros)]
+    uno = RecommenderService.obtener_recomendaciones_inteligentes(
+        "salud", snapshot.models["cursos_info"], snapshot.models["embeddings"], 6, snapshot=snapshot, **filtros
+    )
+
+    pool = RecommendationProcessPool(workers=2)
+    monkeypatch.setattr(recommenderService, "recommendation_process_pool", pool)
+    estadisticas = RecommendationStageStats()
+    monkeypatch.setattr(recommendationPoolService, "recommendation_stage_stats", estadisticas)
+    try:
+        for f, lote in zip(({}, filtros), esperado):
+            assert RecommenderService.obtener_recomendaciones_lote(textos, 6, snapshot=snapshot, **f) == lote
+        obtenido = RecommenderService.obtener_recomendaciones_inteligentes(
+            "salud", snapshot.models["cursos_info"], snapshot.models["embeddings"], 6, snapshot=snapshot, **filtros
+        )
+        assert obtenido.equals(uno)
+        # Los tiempos por etapa medidos en los procesos se registran en el proceso de la API
+        resumen = estadisticas.estadisticas()
+        assert resumen["consultas"] == 2 * len(textos) + 1 and resumen["reranking_ms_p50"] is not None
+        segmentos = [nombre for nombre, _, _ in pool._catalogos[pool._clave(snapshot)].descriptor["arreglos"].values()]
+        assert pool.estadisticas()["catalogos"] == 1
+    finally:
+        pool.detener()
+
+    # Al detener el pool se liberan los segmentos de memoria compartida
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=segmentos[0])
+
+
+def test_catalogo_en_uso_no_se_libera_al_publicar_otro(snapshots_sinteticos):
+    def existe(catalogo) -> bool:
+        try:
+            shared_memory.SharedMemory(name=next(iter(catalogo.descriptor["arreglos"].values()))[0]).close()
+            return True
+        except FileNotFoundError:
+            return False
+
+    pool = RecommendationProcessPool(workers=1, catalogos_retenidos=1)
+    viejo, nuevo = snapshots_sinteticos(300, version=1), snapshots_sinteticos(400, version=2)
+    try:
+        # Un snapshot derivado con los mismos índices (p. ej. al cargar el autoencoder) reutiliza el catálogo
+        en_curso = pool._adquirir(viejo)
+        assert pool._adquirir(viejo.derivar({"autoencoder": None}, {}, {})) is en_curso
+        pool._soltar(en_curso)
+
+        # Publicar otro catálogo retira el anterior, pero sus segmentos viven hasta que termina su tarea
+        pool._soltar(pool._adquirir(nuevo))
+        assert pool.estadisticas()["catalogos"] == 1 and en_curso.retirado
+        assert existe(en_curso)
+        pool._soltar(en_curso)
+        assert not existe(en_curso)
+
+        # Una tarea del catálogo vigente tampoco pierde sus segmentos al detener el pool
+        vigente = pool._adquirir(nuevo)
+        pool.detener()
+        assert existe(vigente)
+        pool._soltar(vigente)
+        assert not existe(vigente)
+    finally:
+        pool.detener()
+
+@pytest.mark.parametrize("snapshot_sintetico", [{"n_cursos": 300}], indirect=True)
+def test_pasos_1_y_2_no_esperan_detras_del_paso_3(monkeypatch, snapshot_sintetico, session_factory):
+    snapshot = snapshot_sintetico
+    bot = ChatbotLogicService(df_final=snapshot.models["cursos_info"], X_embeddings=snapshot.models["embeddings"],
+                              state_store=MemoryStateStore())
+    bot.conversation_service = ConversationService(session_factory=session_factory)
+
+    def recomendar_lento(*args, **kwargs):
+        time.sleep(0.5)
+        return [{"NOMBRE_OFERTA": "curso", "MODALIDAD": "Virtual", "TIPO_OFERTA": "Corto"}]
+
+    monkeypatch.setattr(RecommenderService, "recomendar_cursos", staticmethod(recomendar_lento))
+    monkeypatch.setattr(recommenderService, "recommendation_executor", RecommendationExecutor(workers=1))
+
+    async def escenario():
+        ids = [str(bot.procesar_mensaje("")["id_conversation"]) for _ in range(4)]
+        for conv_id in ids[:3]:
+            await bot.procesar_mensaje_async("salud", conv_id)
+            await bot.procesar_mensaje_async("virtual", conv_id)
+
+        # Tres turnos del paso 3 ocupan (y encolan) el único hilo de recomendación
+        paso_3 = [asyncio.create_task(bot.procesar_mensaje_async("corto", conv_id)) for conv_id in ids[:3]]
+        await asyncio.sleep(0.05)
+        inicio = time.perf_counter()
+        respuesta = await bot.procesar_mensaje_async("salud", ids[3])
+        espera = time.perf_counter() - inicio
+        finales = await asyncio.gather(*paso_3)
+        return respuesta, espera, finales
+
+    respuesta, espera, finales = asyncio.run(escenario())
+    assert "virtuales o presenciales" in respuesta["reply"]
+    assert espera < 0.3
+    assert all("1. curso (Virtual, Corto)" in r["reply"] for r in finales)
@@ -0,0 +1,41 @@
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from src.services import indexService, recommenderService
+from src.services.recommenderService import RecommenderService
+
+def ranking_original(texto_usuario, df_final, X_embeddings, num_recomendaciones=5, peso_embed=0.6, peso_tfidf=0.4):
+    """Implementación previa: reajusta TF-IDF y ordena el vector completo (empates resueltos de forma estable)."""
+    corpus = df_final['NOMBRE_OFERTA'].fillna('').astype(str).tolist()
+    vect = TfidfVectorizer(max_features=5000)
+    tfidf_matrix = vect.fit_transform(corpus)
+    sims_tfidf = cosine_similarity(vect.transform([texto_usuario]), tfidf_matrix)[0]
+
+    top_indices = np.argsort(sims_tfidf, kind="stable")[::-1][:10]
+    q_vec_embed = X_embeddings[top_indices].mean(axis=0).reshape(1, -1)
+    sims_embed = cosine_similarity(q_vec_embed, X_embeddings)[0]
+
+    similitud_final = peso_embed * sims_embed + peso_tfidf * sims_tfidf
+    top_indices = np.argsort(similitud_final, kind="stable")[::-1][:num_recomendaciones * 3]
+    resultados = df_final.iloc[top_indices][['NOMBRE_OFERTA', 'MODALIDAD', 'TIPO_OFERTA']]
+    return resultados.drop_duplicates(subset='NOMBRE_OFERTA').head(num_recomendaciones)
+
+
+def test_ranking_coincide_con_implementacion_original(monkeypatch, catalogo_sintetico):
+    # La implementación original usa la tokenización por defecto de scikit-learn y puntúa todo el catálogo
+    monkeypatch.setattr(indexService, "TEXT_ANALYZER", "simple")
+    monkeypatch.setattr(recommenderService, "RECOMMENDATION_PIPELINE", "exhaustivo")
+    df, X_embeddings = catalogo_sintetico
+
+    for consulta in ["salud", "programacion liderazgo", "tema12 tema873"]:
+        esperado = ranking_original(consulta, df, X_embeddings, num_recomendaciones=6)
+        obtenido = RecommenderService.obtener_recomendaciones_inteligentes(
+            texto_usuario=consulta,
+            df_final=df,
+            X_embeddings=X_embeddings,
+            num_recomendaciones=6
+        )
+        assert list(obtenido.index) == list(esperado.index), consulta
+
+    # Sin términos del vocabulario la implementación original promediaba cursos cualesquiera; ahora no recomienda
+    assert RecommenderService.obtener_recomendaciones_inteligentes("sin coincidencias", df, X_embeddings, 6).empty
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.services.indexService import CourseTextIndex
+from src.services.textAnalysisService import AnalizadorEspanol, plegar_acentos, raiz
+
+NOMBRES = [
+    "Programación en Python para análisis de datos",
+    "Liderazgo y gestión de equipos",
+    "Gestión de proyectos ágiles",
+    "Administración en salud pública",
+    "Diplomado en Enseñanza del inglés",
+]
+
+
+def test_analizador_espanol():
+    assert plegar_acentos("Programación ENSEÑANZA Pingüino") == "programacion enseñanza pinguino"
+    assert [raiz(t) for t in ["gestiones", "gestion", "programas", "programa", "redes", "red"]] == \
+        ["gestion", "gestion", "program", "program", "red", "red"]
+    assert AnalizadorEspanol(0)("Cursos de Gestión de los Proyectos") == ["gestion", "proyect"]
+    assert "#<li" in AnalizadorEspanol(3)("liderazgo")
+
+
+@pytest.mark.parametrize("catalogo_sintetico", [{"n_cursos": 2000}], indirect=True)
+def test_tildes_plurales_y_erratas_encuentran_el_curso(catalogo_sintetico):
+    df, _ = catalogo_sintetico
+    df = pd.concat([pd.DataFrame({"NOMBRE_OFERTA": NOMBRES, "MODALIDAD": "Virtual", "TIPO_OFERTA": "Programa"}), df],
+                   ignore_index=True)
+    espanol, simple = CourseTextIndex(df, analizador="espanol"), CourseTextIndex(df, analizador="simple")
+
+    for consulta, esperado in [("programacion", 0), ("liderasgo", 1), ("gestiones de proyecto", 2),
+                               ("Salúd publica", 3), ("ensenanza ingles", 4)]:
+        filas, _ = espanol.candidatos(consulta, k=5)
+        assert esperado in filas, consulta
+    # Con la tokenización por defecto, la errata y las tildes no coinciden con nada
+    assert simple.similitudes("liderasgo").max() == 0 and simple.similitudes("programacion")[0] == 0
+
+    # El índice invertido da las mismas similitudes que el producto contra todo el catálogo
+    for consulta in ["salud", "tema12 programacion", "liderazgo tema873", "nada que ver"]:
+        densas = espanol.similitudes(consulta)
+        filas, scores = espanol.candidatos(consulta)
+        assert list(filas) == list(np.flatnonzero(densas))
+        np.testing.assert_allclose(scores, densas[filas])
+        top, _ = espanol.candidatos(consulta, k=20)
+        np.testing.assert_allclose(densas[top], np.sort(densas)[::-1][:len(top)])
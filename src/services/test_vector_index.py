@@ -0,0 +1,48 @@
+import numpy as np
+from src.core.config import VECTOR_INDEX_NPROBE
+from src.services.indexService import normalizar_filas
+from src.services.vectorIndexService import FlatIndex, IVFIndex, construir_indice, evaluar_recall
+
+
+def embeddings_agrupados(n_docs: int = 20_000, dim: int = 64, n_grupos: int = 60, seed: int = 0) -> np.ndarray:
+    """Embeddings normalizados alrededor de `n_grupos` temas (como los cursos de un mismo área)."""
+    rng = np.random.default_rng(seed)
+    centros = rng.normal(size=(n_grupos, dim))
+    X = centros[rng.integers(n_grupos, size=n_docs)] + rng.normal(scale=1.5, size=(n_docs, dim))
+    return normalizar_filas(X).astype(np.float32)
+
+
+def test_recall_ivf_contra_flat():
+    normalizadas = embeddings_agrupados()
+    rng = np.random.default_rng(1)
+    consultas = normalizar_filas(normalizadas[rng.choice(len(normalizadas), 200, replace=False)]
+                                 + rng.normal(scale=0.05, size=(200, normalizadas.shape[1]))).astype(np.float32)
+
+    ivf = construir_indice("ivf", normalizadas, n_probe=VECTOR_INDEX_NPROBE)
+    assert ivf.n_probe < ivf.n_listas
+    assert evaluar_recall(ivf, FlatIndex(normalizadas), consultas, k=10)["recall_at_k"] >= 0.95
+
+
+def test_indice_guardado_de_otros_embeddings_se_descarta(tmp_path):
+    path = tmp_path / "embeddings_ivf.npz"
+    normalizadas = embeddings_agrupados(n_docs=3000)
+    guardado = construir_indice("ivf", normalizadas, path=path, n_probe=8)
+    assert path.exists()
+
+    # Mismos embeddings: se recupera sin reentrenar
+    recuperado = IVFIndex.cargar(path, normalizadas, n_probe=8)
+    np.testing.assert_array_equal(recuperado.centroides, guardado.centroides)
+    np.testing.assert_array_equal(recuperado.ids, guardado.ids)
+
+    # Una sola fila distinta basta para descartarlo
+    cambiados = normalizadas.copy()
+    cambiados[1] = cambiados[2]
+    assert IVFIndex.cargar(path, cambiados) is None
+
+    # Embeddings nuevos con la misma forma: el archivo viejo no se usa y se reemplaza
+    nuevos = embeddings_agrupados(n_docs=3000, seed=1)
+    assert IVFIndex.cargar(path, nuevos) is None
+    reconstruido = construir_indice("ivf", nuevos, path=path, n_probe=8)
+    assert IVFIndex.cargar(path, nuevos) is not None
+    q_unit = nuevos[17]
+    assert reconstruido.buscar(q_unit, 1)[0][0] == 17
@@ -0,0 +1,66 @@
+import re
+import unicodedata
+
+# Palabras vacías del español (ya sin tildes): no aportan al emparejar temas de cursos
+STOPWORDS_ES = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes como con contra cual cuales cuando de del desde donde
+durante e el ella ellas ellos en entre era es esa esas ese eso esos esta estas este esto estos fue ha hay la las
+le les lo los mas me mi mis muy nada ni no nos o os otra otras otro otros para pero poco por porque que quien
+quienes se sea segun ser si sin sobre su sus tambien tan te tiene todo todos tu tus u un una unas uno unos y ya yo
+curso cursos quiero busco buscar tema temas interesa interesado interesada aprender
+""".split())
+
+_TOKEN = re.compile(r"[a-z0-9ñ]+")
+_VOCALES = "aeiou"
+
+
+def plegar_acentos(texto: str) -> str:
+    """Minúsculas y sin tildes ni diéresis ("Programación" → "programacion"); la ñ se conserva."""
+    texto = texto.lower().replace("ñ", "\0")
+    sin_marcas = "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+    return sin_marcas.replace("\0", "ñ")
+
+
+def raiz(token: str) -> str:
+    """
+    Stemming ligero del español: quita plurales y la vocal final, sin tocar palabras cortas.
+    "gestiones" / "gestion" → "gestion", "programas" / "programa" → "program", "liderazgo" → "liderazg".
+    """
+    if len(token) > 4 and token.endswith("es") and token[-3] not in _VOCALES:
+        token = token[:-2]
+    elif len(token) > 3 and token.endswith("s"):
+        token = token[:-1]
+    if len(token) > 4 and token[-1] in _VOCALES:
+        token = token[:-1]
+    return token
+
+
+# ============================================================
+# ANALIZADOR — AnalizadorEspanol
+# ============================================================
+class AnalizadorEspanol:
+    """
+    Análisis de texto de catálogo y consultas para el índice TF-IDF (analyzer de TfidfVectorizer):
+    - Plegado de tildes y minúsculas, tokens alfanuméricos.
+    - Sin palabras vacías y con stemming ligero (plurales, vocal final).
+    - Cada raíz aporta un término "palabra" más sus n-gramas de caracteres (con bordes),
+      de modo que una errata ("liderasgo") aún comparte la mayoría de términos con el curso.
+    Es una clase (no una función local) para que el vectorizador se pueda serializar
+    hacia los procesos del pool de recomendación.
+    """
+
+    def __init__(self, n_caracteres: int = 3):
+        self.n_caracteres = n_caracteres
+
+    def raices(self, texto: str) -> list[str]:
+        return [raiz(t) for t in _TOKEN.findall(plegar_acentos(texto)) if t not in STOPWORDS_ES]
+
+    def __call__(self, texto: str) -> list[str]:
+        terminos = []
+        n = self.n_caracteres
+        for r in self.raices(texto):
+            terminos.append(r)
+            if n > 0:
+                borde = f"<{r}>"
+                terminos.extend("#" + borde[i:i + n] for i in range(len(borde) - n + 1))
+        return terminos
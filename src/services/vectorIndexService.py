@@ -0,0 +1,213 @@
+import hashlib
+import io
+import logging
+import time
+import numpy as np
+from pathlib import Path
+from src.services.indexService import top_k_indices
+from src.services.modelRegistryService import escribir_atomico
+
+logger = logging.getLogger(__name__)
+
+
+def firma_embeddings(normalizadas: np.ndarray) -> np.ndarray:
+    """
+    Huella (forma + sha256 del contenido) para validar índices guardados: cualquier fila
+    distinta invalida el índice. Leer los embeddings una vez es mucho más barato que reentrenarlo.
+    """
+    n_docs, dim = normalizadas.shape
+    return np.array([f"{n_docs}x{dim}", hashlib.sha256(np.ascontiguousarray(normalizadas, dtype=np.float32)).hexdigest()])
+
+
+# ============================================================
+# BACKEND EXACTO — FlatIndex
+# ============================================================
+class FlatIndex:
+    """
+    Búsqueda exacta por fuerza bruta sobre embeddings normalizados.
+    Sirve como referencia para medir el recall de los backends aproximados.
+    """
+
+    nombre = "flat"
+    exacto = True
+
+    def __init__(self, normalizadas: np.ndarray):
+        self.normalizadas = normalizadas
+        self.n_docs, self.dim = normalizadas.shape
+
+    def buscar(self, q_unit: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Retorna (índices, similitudes) de los k vecinos más cercanos."""
+        scores = self.normalizadas @ q_unit
+        indices = top_k_indices(scores, k)
+        return indices, scores[indices]
+
+    def guardar(self, path: Path):
+        """El índice exacto no tiene estructura propia que persistir."""
+        return None
+
+
+# ============================================================
+# BACKEND APROXIMADO — IVFIndex
+# ============================================================
+class IVFIndex:
+    """
+    Índice de archivo invertido (IVF) con cuantización gruesa por k-means esférico:
+    - Los embeddings se agrupan en `n_listas` centroides.
+    - Cada lista guarda sus vectores contiguos en memoria.
+    - Una consulta solo puntúa los vectores de las `n_probe` listas más cercanas.
+    """
+
+    nombre = "ivf"
+    exacto = False
+
+    def __init__(self, normalizadas: np.ndarray, n_listas: int | None = None, n_probe: int = 16,
+                 iteraciones: int = 10, seed: int = 0, centroides: np.ndarray | None = None,
+                 listas: tuple[np.ndarray, np.ndarray] | None = None):
+        self.n_docs, self.dim = normalizadas.shape
+        self.n_listas = n_listas or max(1, int(np.sqrt(self.n_docs)))
+        self.n_probe = n_probe
+
+        if centroides is None:
+            centroides = self._entrenar(normalizadas, iteraciones, seed)
+        self.centroides = np.ascontiguousarray(centroides, dtype=np.float32)
+        self.n_listas = self.centroides.shape[0]
+
+        # Listas invertidas: ids ordenados por lista + desplazamientos
+        if listas is None:
+            asignacion = self._asignar(normalizadas, self.centroides)
+            listas = (
+                np.argsort(asignacion, kind="stable"),
+                np.concatenate([[0], np.cumsum(np.bincount(asignacion, minlength=self.n_listas))]),
+            )
+        self.ids, self.offsets = listas
+        self.vectores = np.ascontiguousarray(normalizadas[self.ids])
+        self.firma = firma_embeddings(normalizadas)
+
+        logger.info(f"Índice IVF construido: {self.n_docs} vectores en {self.n_listas} listas (n_probe={self.n_probe})")
+
+    # --------------------------------------------------------
+    # Entrenamiento
+    # --------------------------------------------------------
+    @staticmethod
+    def _asignar(X: np.ndarray, centroides: np.ndarray, bloque: int = 65536) -> np.ndarray:
+        """Centroide más cercano (máximo producto punto) de cada fila, por bloques."""
+        asignacion = np.empty(X.shape[0], dtype=np.int64)
+        for inicio in range(0, X.shape[0], bloque):
+            asignacion[inicio:inicio + bloque] = np.argmax(X[inicio:inicio + bloque] @ centroides.T, axis=1)
+        return asignacion
+
+    def _entrenar(self, normalizadas: np.ndarray, iteraciones: int, seed: int) -> np.ndarray:
+        """K-means esférico sobre una muestra del catálogo."""
+        from scipy import sparse
+
+        rng = np.random.default_rng(seed)
+        n_muestra = min(self.n_docs, max(self.n_listas * 32, 10_000))
+        muestra = normalizadas[rng.choice(self.n_docs, n_muestra, replace=False)]
+        centroides = muestra[rng.choice(n_muestra, self.n_listas, replace=False)].copy()
+
+        for _ in range(iteraciones):
+            asignacion = self._asignar(muestra, centroides)
+            pertenencia = sparse.csr_matrix(
+                (np.ones(n_muestra, dtype=np.float32), (asignacion, np.arange(n_muestra))),
+                shape=(self.n_listas, n_muestra)
+            )
+            sumas = np.asarray(pertenencia @ muestra)
+
+            # Listas vacías: se reinician con puntos aleatorios de la muestra
+            vacias = np.flatnonzero(np.bincount(asignacion, minlength=self.n_listas) == 0)
+            sumas[vacias] = muestra[rng.choice(n_muestra, len(vacias), replace=False)]
+
+            normas = np.linalg.norm(sumas, axis=1, keepdims=True)
+            normas[normas == 0] = 1.0
+            centroides = sumas / normas
+
+        return centroides
+
+    # --------------------------------------------------------
+    # Consulta
+    # --------------------------------------------------------
+    def buscar(self, q_unit: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Retorna (índices, similitudes) aproximados de los k vecinos más cercanos."""
+        listas = top_k_indices(self.centroides @ q_unit, self.n_probe)
+
+        tramos = [(self.offsets[l], self.offsets[l + 1]) for l in listas]
+        scores = np.concatenate([self.vectores[a:b] @ q_unit for a, b in tramos])
+        posiciones = np.concatenate([np.arange(a, b) for a, b in tramos])
+
+        mejores = top_k_indices(scores, k)
+        return self.ids[posiciones[mejores]], scores[mejores]
+
+    # --------------------------------------------------------
+    # Persistencia
+    # --------------------------------------------------------
+    def guardar(self, path: Path):
+        """Guarda centroides y listas junto a los embeddings para no reentrenar en cada carga."""
+        buffer = io.BytesIO()
+        np.savez(buffer, centroides=self.centroides, ids=self.ids, offsets=self.offsets, firma=self.firma)
+        escribir_atomico(path, buffer.getvalue())
+        logger.info(f"Índice IVF guardado en {path}")
+
+    @classmethod
+    def cargar(cls, path: Path, normalizadas: np.ndarray, n_probe: int = 16):
+        """Reconstruye el índice guardado; None si no corresponde a los embeddings actuales."""
+        if not Path(path).exists():
+            return None
+        with np.load(path) as data:
+            if not np.array_equal(data["firma"], firma_embeddings(normalizadas)):
+                logger.warning(f"Índice IVF en {path} no corresponde a los embeddings actuales. Se reconstruirá.")
+                return None
+            return cls(
+                normalizadas,
+                n_probe=n_probe,
+                centroides=data["centroides"],
+                listas=(data["ids"], data["offsets"])
+            )
+
+
+VECTOR_INDEX_BACKENDS = {
+    FlatIndex.nombre: FlatIndex,
+    IVFIndex.nombre: IVFIndex,
+}
+
+
+# ============================================================
+# CONSTRUCCIÓN Y EVALUACIÓN
+# ============================================================
+def construir_indice(backend: str, normalizadas: np.ndarray, path: Path | None = None, n_probe: int = 16):
+    """Construye (o recupera de disco) el índice vectorial del backend indicado."""
+    if backend not in VECTOR_INDEX_BACKENDS:
+        raise ValueError(f"Backend de índice vectorial no válido: {backend}")
+
+    if backend == FlatIndex.nombre:
+        return FlatIndex(normalizadas)
+
+    indice = IVFIndex.cargar(path, normalizadas, n_probe=n_probe) if path else None
+    if indice is None:
+        indice = IVFIndex(normalizadas, n_probe=n_probe)
+        if path:
+            indice.guardar(path)
+    return indice
+
+
+def evaluar_recall(indice, referencia: FlatIndex, consultas: np.ndarray, k: int = 10) -> dict:
+    """
+    Mide recall@k del índice contra el backend exacto y su latencia por consulta.
+    Las consultas deben venir normalizadas (una por fila).
+    """
+    aciertos = 0
+    latencias = []
+    for q_unit in consultas:
+        esperados, _ = referencia.buscar(q_unit, k)
+        inicio = time.perf_counter()
+        obtenidos, _ = indice.buscar(q_unit, k)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        aciertos += len(np.intersect1d(esperados, obtenidos))
+
+    return {
+        "backend": indice.nombre,
+        "k": k,
+        "consultas": len(consultas),
+        "recall_at_k": aciertos / (k * len(consultas)) if len(consultas) else None,
+        "latencia_ms_p50": float(np.percentile(latencias, 50)) if latencias else None,
+        "latencia_ms_p99": float(np.percentile(latencias, 99)) if latencias else None,
+    }
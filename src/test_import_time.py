@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+from src.core.config import BASE_DIR
+
+# Presupuesto de tiempo para `import src.main` (segundos)
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", "5"))
+
+# Módulos pesados que no deben importarse al arrancar la API
+MODULOS_DIFERIDOS = ["tensorflow", "keras", "sklearn"]
+
+CODIGO = """
+import sys, time
+inicio = time.perf_counter()
+import src.main
+print("segundos=" + str(time.perf_counter() - inicio))
+print("pesados=" + ",".join(m for m in {diferidos!r} if m in sys.modules))
+"""
+
+
+def medir_import() -> tuple[float, list[str], list[tuple[int, str]]]:
+    """
+    Importa src.main en un proceso limpio con -X importtime.
+    Retorna (segundos, módulos pesados importados, top de módulos más lentos en µs).
+    """
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CODIGO.format(diferidos=MODULOS_DIFERIDOS)],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True
+    )
+    salida = dict(linea.split("=", 1) for linea in resultado.stdout.splitlines() if "=" in linea)
+    segundos = float(salida["segundos"])
+    pesados = [m for m in salida["pesados"].split(",") if m]
+
+    tiempos = []
+    for linea in resultado.stderr.splitlines():
+        if linea.startswith("import time:") and "|" in linea:
+            _, acumulado, modulo = linea.split("|")
+            if acumulado.strip().isdigit():
+                tiempos.append((int(acumulado), modulo.strip()))
+    tiempos.sort(reverse=True)
+    return segundos, pesados, tiempos[:10]
+
+
+def test_import_time():
+    segundos, pesados, _ = medir_import()
+    assert not pesados, f"Módulos pesados importados al arrancar: {pesados}"
+    assert segundos < IMPORT_TIME_BUDGET, f"import src.main tardó {segundos:.2f}s (presupuesto {IMPORT_TIME_BUDGET}s)"
@@ -2,6 +2,105 @@ const form = document.getElementById("chat-form");
 const input = document.getElementById("user-input");
 const chatBox = document.getElementById("chat-box");
 
+// Canal persistente con el backend: un WebSocket por pestaña; si no está disponible
+// se usa el stream SSE (POST /message/stream) y, como último recurso, POST /message.
+let socket = null;
+let pendiente = null; // { resolve, reject, onTexto } del turno en curso
+
+function conectarSocket() {
+  if (socket && socket.readyState <= WebSocket.OPEN) return socket;
+  const protocolo = location.protocol === "https:" ? "wss" : "ws";
+  socket = new WebSocket(`${protocolo}://${location.host}/api/chatbot/ws`);
+  socket.onmessage = (e) => manejarEvento(JSON.parse(e.data));
+  socket.onclose = () => {
+    socket = null;
+    if (pendiente) pendiente.reject(new Error("WebSocket cerrado"));
+  };
+  return socket;
+}
+
+function manejarEvento(evento) {
+  if (!pendiente) return;
+  if (evento.evento === "inicio" && evento.id_conversation) {
+    // Guardar ID de conversación en cuanto el backend lo devuelve
+    sessionStorage.setItem("id_conversation", evento.id_conversation);
+  } else if (evento.evento === "texto") {
+    pendiente.onTexto(evento.texto);
+  } else if (evento.evento === "fin") {
+    pendiente.resolve(evento);
+  } else if (evento.evento === "error") {
+    pendiente.reject(new Error(evento.detalle));
+  }
+}
+
+// Envía el turno por el WebSocket; resuelve con el evento "fin"
+function enviarPorSocket(payload, onTexto) {
+  return new Promise((resolve, reject) => {
+    const ws = conectarSocket();
+    const limpiar = (f) => (valor) => { pendiente = null; f(valor); };
+    pendiente = { resolve: limpiar(resolve), reject: limpiar(reject), onTexto };
+    if (ws.readyState === WebSocket.OPEN) {
+      ws.send(JSON.stringify(payload));
+    } else {
+      ws.addEventListener("open", () => ws.send(JSON.stringify(payload)), { once: true });
+      ws.addEventListener("error", () => pendiente && pendiente.reject(new Error("WebSocket no disponible")), { once: true });
+    }
+  });
+}
+
+// Lee el stream SSE de POST /message/stream; resuelve con el evento "fin"
+async function enviarPorSSE(payload, onTexto) {
+  const response = await fetch("/api/chatbot/message/stream", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload),
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Error del servidor: ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let fin = null;
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const bloques = buffer.split("\n\n");
+    buffer = bloques.pop();
+    for (const bloque of bloques) {
+      const linea = bloque.split("\n").find((l) => l.startsWith("data: "));
+      if (!linea) continue;
+      const evento = JSON.parse(linea.slice(6));
+      if (evento.evento === "inicio" && evento.id_conversation) {
+        sessionStorage.setItem("id_conversation", evento.id_conversation);
+      } else if (evento.evento === "texto") {
+        onTexto(evento.texto);
+      } else if (evento.evento === "fin") {
+        fin = evento;
+      } else if (evento.evento === "error") {
+        throw new Error(evento.detalle);
+      }
+    }
+  }
+  if (!fin) throw new Error("Stream incompleto");
+  return fin;
+}
+
+// Ruta original sin streaming
+async function enviarPorPost(payload) {
+  const response = await fetch("/api/chatbot/message", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload),
+  });
+  if (!response.ok) {
+    throw new Error(`Error del servidor: ${response.status}`);
+  }
+  return response.json();
+}
+
 // Si no hay id_conversacion en sessionStorage, se genera y guarda después del primer mensaje
 form.addEventListener("submit", async (e) => {
   e.preventDefault();
@@ -10,34 +109,40 @@ form.addEventListener("submit", async (e) => {
 
   appendMessage("user", message);
   input.value = "";
-  const id_conversation_ = sessionStorage.getItem("id_conversation");
-  try {
-    const response = await fetch("/api/chatbot/message", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({
-        message: message,
-        id_conversation: id_conversation_ || null,
-      }),
-    });
-    
-
-    // Si hay un problema con la respuesta HTTP
-    if (!response.ok) {
-      throw new Error(`Error del servidor: ${response.status}`);
-    }
+  const payload = {
+    message: message,
+    id_conversation: sessionStorage.getItem("id_conversation") || null,
+  };
 
-    // Convertir respuesta a JSON (solo aquí)
-    const data = await response.json();
+  // El mensaje del bot se va llenando con cada fragmento recibido
+  const botMsg = appendMessage("bot", "");
+  const onTexto = (texto) => {
+    botMsg.textContent += texto;
+    chatBox.scrollTop = chatBox.scrollHeight;
+  };
+
+  let data = null;
+  for (const enviar of [enviarPorSocket, enviarPorSSE]) {
+    try {
+      data = await enviar(payload, onTexto);
+      break;
+    } catch (error) {
+      // Solo se reintenta por otro canal si aún no llegó ningún fragmento
+      if (botMsg.textContent) break;
+      console.warn("Canal de streaming no disponible:", error);
+    }
+  }
+  try {
+    if (!data && !botMsg.textContent) data = await enviarPorPost(payload);
+    if (!data) throw new Error("Respuesta incompleta");
 
     // Guardar ID de conversación si el backend lo devuelve
     if (data.id_conversation) {
       sessionStorage.setItem("id_conversation", data.id_conversation);
     }
-
-    appendMessage("bot", data.reply);
+    botMsg.textContent = data.reply;
   } catch (error) {
-    appendMessage("bot", "⚠️ Hubo un problema al procesar tu mensaje.");
+    botMsg.textContent = "⚠️ Hubo un problema al procesar tu mensaje.";
   }
 });
 
@@ -48,6 +153,7 @@ function appendMessage(sender, text) {
   msg.textContent = text;
   chatBox.appendChild(msg);
   chatBox.scrollTop = chatBox.scrollHeight;
+  return msg;
 }
 
 // Cargar historial de conversación al iniciar (si existe)
@@ -75,8 +181,3 @@ resetBtn.addEventListener("click", () => {
     document.getElementById("chat-box").innerHTML = "";
   }
 });
-
-data.messages.forEach((msg) => {
-  console.log("Mensaje del historial:", msg);
-  appendMessage(msg.sender, msg.text )
-});
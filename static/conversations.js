@@ -8,19 +8,43 @@ const historyContent = document.getElementById("history-content");
 const reloadBtn = document.getElementById("reload-btn");
 const closeHistoryBtn = document.getElementById("close-history");
 
+// Paginación por cursor: el backend envía el de la página siguiente en X-Next-Cursor
+const PAGE_SIZE = 20;
+const HISTORY_PAGE_SIZE = 50;
+let nextConversationsCursor = null;
+
+function pageUrl(url, limit, cursor) {
+  const params = new URLSearchParams({ limit });
+  if (cursor) params.set("cursor", cursor);
+  return `${url}?${params}`;
+}
+
+function moreButton(label, onClick) {
+  const btn = document.createElement("button");
+  btn.className = "action-btn btn-more";
+  btn.textContent = label;
+  btn.addEventListener("click", () => {
+    btn.remove();
+    onClick();
+  });
+  return btn;
+}
+
 // ====== CARGAR LISTA DE CONVERSACIONES ======
-async function loadConversations() {
+async function loadConversations(cursor = null) {
   try {
-    const res = await fetch(`${BASE_URL}?limit=20`);
+    const res = await fetch(pageUrl(BASE_URL, PAGE_SIZE, cursor));
     if (!res.ok) throw new Error("Error al cargar conversaciones");
 
     const conversations = await res.json();
-    if (!conversations || conversations.length === 0) {
+    nextConversationsCursor = res.headers.get("X-Next-Cursor");
+    if (!cursor && (!conversations || conversations.length === 0)) {
       listContainer.innerHTML = "<p>No hay conversaciones registradas.</p>";
       return;
     }
 
-    listContainer.innerHTML = "";
+    // Primera página: reemplaza la lista; las siguientes se agregan al final
+    if (!cursor) listContainer.innerHTML = "";
 
     conversations.forEach(conv => {
       const card = document.createElement("div");
@@ -38,14 +62,22 @@ async function loadConversations() {
       listContainer.appendChild(card);
     });
 
-    // Asignar eventos a botones dinámicos
-    document.querySelectorAll(".btn-view").forEach(btn => {
+    // Asignar eventos a botones dinámicos (solo a los de esta página)
+    listContainer.querySelectorAll(".btn-view:not([data-bound])").forEach(btn => {
+      btn.dataset.bound = "1";
       btn.addEventListener("click", () => viewConversation(btn.dataset.id));
     });
-    document.querySelectorAll(".btn-delete").forEach(btn => {
+    listContainer.querySelectorAll(".btn-delete:not([data-bound])").forEach(btn => {
+      btn.dataset.bound = "1";
       btn.addEventListener("click", () => deleteConversation(btn.dataset.id));
     });
 
+    if (nextConversationsCursor) {
+      listContainer.appendChild(
+        moreButton("Cargar más", () => loadConversations(nextConversationsCursor))
+      );
+    }
+
   } catch (err) {
     console.error("❌ Error:", err);
     listContainer.innerHTML = `<p style="color:red;">❌ ${err.message}</p>`;
@@ -53,21 +85,30 @@ async function loadConversations() {
 }
 
 // ====== VER HISTORIAL ======
-async function viewConversation(id) {
+async function viewConversation(id, cursor = null) {
   try {
-    const res = await fetch(`${BASE_URL}/${id}`);
+    const res = await fetch(pageUrl(`${BASE_URL}/${id}`, HISTORY_PAGE_SIZE, cursor));
     if (!res.ok) throw new Error("Error al obtener historial");
 
     const history = await res.json();
+    const nextCursor = res.headers.get("X-Next-Cursor");
 
-    // Mostrar el historial de forma legible
-    historyContent.innerHTML = `
-      <h3>Historial de conversación ${id}</h3>
-      <pre>${JSON.stringify(history, null, 2)}</pre>
-    `;
+    // Mostrar el historial de forma legible (las páginas siguientes se agregan debajo)
+    if (!cursor) {
+      historyContent.innerHTML = `<h3>Historial de conversación ${id}</h3>`;
+    }
+    const page = document.createElement("pre");
+    page.textContent = JSON.stringify(history, null, 2);
+    historyContent.appendChild(page);
+
+    if (nextCursor) {
+      historyContent.appendChild(
+        moreButton("Cargar más mensajes", () => viewConversation(id, nextCursor))
+      );
+    }
     historySection.hidden = false;
 
-    window.scrollTo({ top: historySection.offsetTop, behavior: "smooth" });
+    if (!cursor) window.scrollTo({ top: historySection.offsetTop, behavior: "smooth" });
   } catch (err) {
     console.error("❌ Error:", err);
     alert("❌ No se pudo obtener el historial de la conversación.");
@@ -91,10 +132,10 @@ async function deleteConversation(id) {
 }
 
 // ====== EVENTOS ======
-if (reloadBtn) reloadBtn.addEventListener("click", loadConversations);
+if (reloadBtn) reloadBtn.addEventListener("click", () => loadConversations());
 if (closeHistoryBtn) closeHistoryBtn.addEventListener("click", () => {
   historySection.hidden = true;
 });
 
 // ====== INICIAL ======
-document.addEventListener("DOMContentLoaded", loadConversations);
+document.addEventListener("DOMContentLoaded", () => loadConversations());